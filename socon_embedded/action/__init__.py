@@ -1,8 +1,11 @@
-from typing import Union
+from __future__ import annotations
+
+from typing import Optional
 
 from socon.core.manager import Hook
 from pydantic import BaseModel, ConfigDict
 
+from socon_embedded.builder.environment import BuildEnvironment
 from socon_embedded.schema.task import Task
 
 
@@ -11,18 +14,57 @@ class ActionSchema(BaseModel):
 
 
 class ActionBase(Hook, abstract=True):
-
     manager = "ActionManager"
     schema = None
 
+    # Environment of the project given by the task executor. The actions
+    # starting a process must use get_environment() instead of os.environ
+    environment: Optional[BuildEnvironment] = None
+
     def __init__(self, task: Task) -> None:
         self._task = task
         self.args = self.schema(**self._task.args)
 
+    def get_environment(self) -> BuildEnvironment:
+        """Return the environment of the processes started by the action"""
+        if self.environment is None:
+            return BuildEnvironment.from_os()
+        return self.environment
+
     def run(self, tasks_vars=None):
         """Run the task"""
         return {"failed": False}
 
+    @classmethod
+    def run_batch(cls, actions: list[ActionBase], tasks_vars=None) -> list[dict]:
+        """Run several actions of this type at once, in declaration order
+
+        Action plugins may override this to share the setup cost between
+        consecutive tasks using the same action. The batch stops at the first
+        failed action: the results of the actions that did not run are not
+        returned.
+        """
+        results = []
+        for action in actions:
+            results.append(action.run(tasks_vars))
+            if results[-1].get("failed"):
+                break
+        return results
+
+    def can_batch_with(self, actions: list[ActionBase]) -> bool:
+        """Return True if the action does not depend on the previous actions
+
+        Action plugins overriding run_batch may override this so that the
+        actions using the result of a previous one are run alone.
+        """
+        return True
+
+    @classmethod
+    def supports_batch(cls) -> bool:
+        """Return True if the action plugin overrides run_batch"""
+        subclasses = cls.__mro__[: cls.__mro__.index(ActionBase)]
+        return any("run_batch" in vars(klass) for klass in subclasses)
+
     def cleanup(self, force: bool = False):
         """Method to perform a clean up at the end of an action plugin execution
 
@@ -1,8 +1,9 @@
-import os
-import tempfile
+from __future__ import annotations
+
 import json
 import shutil
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
@@ -11,6 +12,16 @@ from socon_embedded.action import ActionBase, ActionSchema
 from pydantic import model_validator
 
 from socon_embedded.utils.converter import to_bytes
+from socon_embedded.utils.files import CopyStats, copy_file, copy_tree, write_atomic
+from socon_embedded.utils.jinja import jinja_render
+
+# Source files smaller than this are read only once when copied in batch
+BATCH_READ_LIMIT = 16 * 1024 * 1024
+
+
+def _overlap(path: Path, other: Path) -> bool:
+    """Check if a path is the same as, inside or a parent of the other one"""
+    return path == other or path in other.parents or other in path.parents
 
 
 class CopySchema(ActionSchema):
@@ -18,6 +29,12 @@ class CopySchema(ActionSchema):
     src: Optional[str] = None
     content: Optional[str] = None
 
+    # Compare the files digest instead of their size and modification time
+    checksum: bool = False
+
+    # Number of threads used to copy a directory. None let python decide
+    workers: Optional[int] = None
+
     @model_validator(mode="after")
     def basic_validation(self):
         """If src is a directory, dest must be a directory too."""
@@ -41,46 +58,156 @@ class CopyAction(ActionBase):
         # Result of the task stored in a dictionary
         result = super().run(tasks_vars)
 
-        source = self.args.src
-        content = self.args.content
+        if self.args.content is not None:
+            try:
+                stats = self._write_content(self.args.content, tasks_vars)
+            except Exception as err:
+                result["failed"] = True
+                result["msg"] = f"could not write content: {err}"
+                return result
+        else:
+            stats = self._copy(self.args.src)
+
+        return self._set_stats(result, stats)
 
-        # Define content_tempfile in case we set it after finding content populated.
-        content_tempfile = None
+    @classmethod
+    def run_batch(cls, actions: list[CopyAction], tasks_vars=None) -> list[dict]:
+        """
+        Run several copies at once. Each content and each small source file
+        is read only once, in parallel, then the copies are done in
+        declaration order until one fails.
+        """
+        if tasks_vars is None:
+            tasks_vars = dict()
+
+        # Read the sources that can be shared between the actions. The
+        # batched copies never read what another one writes.
+        def read(action: CopyAction):
+            try:
+                return action._read_source(tasks_vars)
+            except Exception as err:
+                return err
+
+        readers = {}
+        for action in actions:
+            readers.setdefault(action._get_source_key(), action)
+        with ThreadPoolExecutor() as pool:
+            sources = dict(zip(readers, pool.map(read, readers.values())))
 
-        if content is not None:
+        def run(action: CopyAction) -> dict:
+            data = sources[action._get_source_key()]
+            if data is None:
+                return action.run(tasks_vars)
+
+            result = super(CopyAction, action).run(tasks_vars)
             try:
-                # If content comes to us as a dict it should be decoded json.
-                # We need to encode it back into a string to write it out.
-                if isinstance(content, dict) or isinstance(content, list):
-                    content_tempfile = self._create_content_tempfile(
-                        json.dumps(content)
-                    )
-                else:
-                    content_tempfile = self._create_content_tempfile(content)
-                source = content_tempfile
+                if isinstance(data, Exception):
+                    raise data
+                stats = action._write_source(data)
             except Exception as err:
                 result["failed"] = True
-                result["msg"] = f"could not write content temp file: {err}"
+                result["msg"] = f"could not write to '{action.args.dest}': {err}"
                 return result
+            return action._set_stats(result, stats)
+
+        results = []
+        for action in actions:
+            results.append(run(action))
+            if results[-1]["failed"]:
+                break
+        return results
+
+    def can_batch_with(self, actions: list[CopyAction]) -> bool:
+        """
+        Batch the copies whose destinations are disjoint from the sources
+        and destinations of the other ones. Sources may be shared.
+        """
+        dest = self._get_path(self.args.dest)
+        src = self._get_path(self.args.src) if self.args.src is not None else None
+        for action in actions:
+            paths = [self._get_path(action.args.dest)]
+            if action.args.src is not None:
+                paths.append(self._get_path(action.args.src))
+            if any(_overlap(dest, path) for path in paths):
+                return False
+            if src is not None and _overlap(src, paths[0]):
+                return False
+        return True
+
+    @staticmethod
+    def _get_path(path: str) -> Path:
+        return Path(path).expanduser().absolute()
+
+    def _get_source_key(self) -> tuple:
+        if self.args.content is not None:
+            return ("content", self.args.content)
+        return ("src", str(Path(self.args.src).expanduser().absolute()))
+
+    def _read_source(self, tasks_vars: dict) -> Optional[bytes]:
+        """
+        Return the content that will be written in dest. Return None if the
+        source is a directory or a file too big to be kept in memory.
+        """
+        if self.args.content is not None:
+            return to_bytes(self._render_content(self.args.content, tasks_vars))
+        source = Path(self.args.src).expanduser().absolute()
+        if source.is_dir() or source.stat().st_size > BATCH_READ_LIMIT:
+            return None
+        return source.read_bytes()
+
+    def _write_source(self, data: bytes) -> CopyStats:
+        """Write data read by _read_source in dest"""
+        stats = CopyStats()
+        if self.args.content is not None:
+            dest = Path(self.args.dest).expanduser().absolute()
+            stats.add(write_atomic(dest, data))
+            return stats
+
+        source = Path(self.args.src).expanduser().absolute()
+        dest = Path(self.args.dest)
+        if dest.is_dir():
+            dest = dest / source.name
+        copied = write_atomic(dest, data)
+        if copied is not None:
+            shutil.copystat(source, dest)
+        stats.add(copied)
+        return stats
+
+    @staticmethod
+    def _set_stats(result: dict, stats: CopyStats) -> dict:
+        result["changed"] = stats.changed
+        result["files_copied"] = stats.files_copied
+        result["files_skipped"] = stats.files_skipped
+        result["bytes_copied"] = stats.bytes_copied
+        return result
 
+    def _copy(self, source: str) -> CopyStats:
+        """Copy a file or a directory to the destination"""
         source = Path(source).expanduser().absolute()
         if source.is_dir():
-            shutil.copytree(source, self.args.dest, dirs_exist_ok=True)
-        else:
-            shutil.copy2(source, self.args.dest)
-
-        return result
-
-    def _create_content_tempfile(self, content):
-        """Create a tempfile containing defined content"""
-        fd, content_tempfile = tempfile.mkstemp(prefix=".")
-        f = os.fdopen(fd, "wb")
-        content = to_bytes(content)
-        try:
-            f.write(content)
-        except Exception as err:
-            os.remove(content_tempfile)
-            raise Exception(err)
-        finally:
-            f.close()
-        return content_tempfile
+            return copy_tree(
+                source, self.args.dest, self.args.checksum, self.args.workers
+            )
+
+        dest = Path(self.args.dest)
+        if dest.is_dir():
+            dest = dest / source.name
+        stats = CopyStats()
+        stats.add(copy_file(source, dest, self.args.checksum))
+        return stats
+
+    def _write_content(self, content, tasks_vars: dict) -> CopyStats:
+        """Render the content with the task variables and write it to dest"""
+        content = self._render_content(content, tasks_vars)
+        dest = Path(self.args.dest).expanduser().absolute()
+        stats = CopyStats()
+        stats.add(write_atomic(dest, to_bytes(content)))
+        return stats
+
+    @staticmethod
+    def _render_content(content, tasks_vars: dict) -> str:
+        # If content comes to us as a dict it should be decoded json.
+        # We need to encode it back into a string to write it out.
+        if isinstance(content, dict) or isinstance(content, list):
+            return json.dumps(content)
+        return jinja_render(content, tasks_vars)
@@ -1,13 +1,41 @@
+from pathlib import Path
+from typing import Optional
+
 from socon_embedded.action import ActionBase, ActionSchema
+from socon_embedded.utils.files import move
+
 
+class MoveSchema(ActionSchema):
+    src: str
+    dest: str
 
-class MoveActionShema(ActionSchema):
-    pass
+    # Number of threads used to copy a directory to another filesystem
+    workers: Optional[int] = None
 
 
 class MoveAction(ActionBase):
     name = "move"
-    action_schema = MoveActionShema
+    schema = MoveSchema
 
     def run(self, tasks_vars=None):
-        pass
+        result = super().run(tasks_vars)
+
+        source = Path(self.args.src).expanduser().absolute()
+        dest = Path(self.args.dest).expanduser().absolute()
+
+        if not source.exists():
+            result["failed"] = True
+            result["msg"] = f"Source '{source}' does not exist"
+            return result
+
+        # Like the mv command, moving into a directory keeps the source name
+        if dest.is_dir():
+            dest = dest / source.name
+            if dest.exists() and source.is_dir():
+                result["failed"] = True
+                result["msg"] = f"Destination path '{dest}' already exists"
+                return result
+
+        result["bytes_moved"] = move(source, dest, self.args.workers)
+        result["changed"] = True
+        return result
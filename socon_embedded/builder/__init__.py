@@ -1,25 +1,52 @@
 from __future__ import annotations
 
+import gzip
 import logging
 import os
-from pathlib import Path
 import subprocess
 import sys
 import time
 
 from abc import abstractmethod
 from dataclasses import dataclass, field
-from typing import Any, Mapping, Optional, Sequence, Tuple, Union
-
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from socon_embedded.builder.environment import BuildEnvironment
+from socon_embedded.builder.excerpt import ERROR_PATTERN, FailureExcerpt
 from socon_embedded.builder.parser import DefaultParser
-from socon_embedded.builder.result import Result, Status
+from socon_embedded.builder.process import (
+    OutputExpired,
+    iter_lines,
+    kill_process_group,
+    new_process_group_kwargs,
+    start_reader,
+)
+from socon_embedded.builder.result import (
+    DATACLASS_SLOTS,
+    BuildResult,
+    Result,
+    Status,
+    intern_string,
+)
+from socon_embedded.builder.toolchain import Toolchain, resolve_toolchain
+from socon_embedded.builder.worker import BuilderWorker, WorkerError
+from socon_embedded.utils.cancel import CancellationToken
 from socon_embedded.utils.converter import safe_decode
-from socon_embedded.builder.result import BuildResult
 
 from socon.core.manager import Hook
 from socon.utils.terminal import terminal
 
-
 logger = logging.getLogger(__name__)
 
 
@@ -37,9 +64,54 @@ class BuildCommandNotFound(Exception):
         )
 
 
-@dataclass
+class BuildTimeoutError(Exception):
+    """Raised when a build exceeded its timeout or stopped producing output"""
+
+    def __init__(self, command: list[str], reason: str, output: str = "") -> None:
+        self.command = command
+        self.reason = reason
+        self.output = output
+        self._cmdline = " ".join(safe_decode(i) for i in self.command)
+
+    def __str__(self) -> str:
+        return "Build {}. The process group was killed\n  cmdline: {}".format(
+            self.reason, self._cmdline
+        )
+
+
+class BuildCancelledError(Exception):
+    """Raised when a build was cancelled while running"""
+
+    def __init__(self, command: list[str], reason: str, output: str = "") -> None:
+        self.command = command
+        self.reason = reason
+        self.output = output
+        self._cmdline = " ".join(safe_decode(i) for i in self.command)
+
+    def __str__(self) -> str:
+        return "{}. The build was cancelled\n  cmdline: {}".format(
+            self.reason, self._cmdline
+        )
+
+
+class ToolchainError(Exception):
+    """Raised when the builder executable is missing or its version probe fails"""
+
+    def __init__(self, command: list[str], toolchain: Toolchain) -> None:
+        self.command = command
+        self.toolchain = toolchain
+        self._cmdline = " ".join(safe_decode(i) for i in self.command)
+
+    def __str__(self) -> str:
+        return "{}\n  cmdline: {}".format(self.toolchain.error, self._cmdline)
+
+
+@dataclass(eq=True, frozen=False, unsafe_hash=False, **DATACLASS_SLOTS)
 class BuildInfo:
-    """Store building information"""
+    """
+    Store building information. Builders and hooks may update it, e.g. in
+    pre_build: it is mutable and, like its dict fields, not hashable.
+    """
 
     app: str
     builder: str
@@ -47,6 +119,16 @@ class BuildInfo:
     variant_args: dict = field(default_factory=dict)
     cmdline: list = field(default_factory=list)
 
+    def __post_init__(self) -> None:
+        # The same names are repeated by every build of a large registry
+        self.app = intern_string(self.app)
+        self.builder = intern_string(self.builder)
+        self.project_file = intern_string(self.project_file)
+        self.variant_args = {
+            intern_string(key): intern_string(value)
+            for key, value in self.variant_args.items()
+        }
+
     def __str__(self) -> str:
         output = [
             f"Application: {self.app}",
@@ -75,6 +157,30 @@ class Builder(Hook, abstract=True):
     # If True, a shell will be used when executing git commands.
     use_shell = False
 
+    # Maximum time in seconds a build can take. None means no limit
+    timeout: Optional[float] = None
+
+    # Maximum time in seconds a build can run without writing any output.
+    # None means no limit
+    stall_timeout: Optional[float] = None
+
+    # If True, a long-lived worker is started once (see get_worker_command) and
+    # every build is sent to it instead of spawning a new process each time.
+    persistent_worker = False
+
+    # Number of builds after which the worker is restarted. None means never
+    worker_max_builds: Optional[int] = None
+
+    # Environment variables set for every build of this builder
+    environment_variables: Dict[str, str] = {}
+
+    # Arguments used to check that the executable runs and to get its version,
+    # e.g. ["--version"]. None means the executable is only searched in PATH.
+    version_args: Optional[list[str]] = None
+
+    # Lines of output reported in the failure excerpt of a failed build
+    error_pattern: str = ERROR_PATTERN
+
     def __init__(
         self,
         name: Optional[str] = None,
@@ -91,6 +197,52 @@ class Builder(Hook, abstract=True):
         if not hasattr(self, "parser"):
             self.parser = DefaultParser
 
+        self._worker: Optional[BuilderWorker] = None
+
+        # Executable resolved in the environment PATH, on the first build
+        self._toolchain: Optional[Toolchain] = None
+
+        # Environment of the builds. The registry executor replaces it with
+        # an environment that includes the project variables.
+        self.environment = self.get_environment()
+
+    @property
+    def environment(self) -> BuildEnvironment:
+        return self._environment
+
+    @environment.setter
+    def environment(self, environment: BuildEnvironment) -> None:
+        # The executable may be found somewhere else in the new PATH
+        self._environment = environment
+        self._toolchain = None
+
+    def resolve_toolchain(self) -> Optional[Toolchain]:
+        """
+        Find the builder executable and run its version probe. The result is
+        cached so that a missing toolchain fails every build without spawning
+        any process. Return None for builders using a shell, as the
+        executable may be a shell builtin.
+        """
+        if self.use_shell:
+            return None
+        if self._toolchain is None:
+            self._toolchain = resolve_toolchain(
+                self.executable, self.environment, self.version_args
+            )
+            logger.debug("Resolved toolchain: {}".format(self._toolchain))
+        return self._toolchain
+
+    def get_environment(
+        self, base: Optional[BuildEnvironment] = None
+    ) -> BuildEnvironment:
+        """
+        Return the environment of the builds: the base environment, by default
+        the one of the current process, with the builder variables.
+        """
+        if base is None:
+            base = BuildEnvironment.from_os()
+        return base.update(self.environment_variables)
+
     def get_executable(self) -> str:
         """Get the builder executable"""
         return getattr(self, "executable")
@@ -105,40 +257,19 @@ class Builder(Hook, abstract=True):
         output_file: Union[str, os.PathLike] = None,
         clean: bool = False,
         variables: dict = {},
+        timeout: Optional[float] = None,
+        stall_timeout: Optional[float] = None,
         **kwargs: Any,
     ) -> BuildResult:
         """
-        Compile an application using the input path, the specified mode and arguments
+        Compile an application using the input path, the specified mode and arguments.
+        The timeout and stall_timeout arguments override the builder ones.
+        If the build fails, an excerpt of the errors in its output is set as
+        the result text. The log is compressed if output_file ends with .gz.
         """
-        main_args = self.get_main_args(project_file, **variant_args)
-        if isinstance(main_args, str):
-            main_args = main_args.split()
-
-        # Raise an error if main_args is None
-        if main_args is None:
-            raise RuntimeError(
-                "'get_main_args' method must return a list or a string of args"
-            )
-
-        # Add the user options
-        args_list = main_args + raw_args
-
-        # Build the command line arguments
-        cmdline = [self.executable]
-        cmdline.extend(args_list)
-
-        # Add persistent builder options
-        cmdline.extend(self.persistant_options)
-
-        # if warning_as_error is True, we check if the builder has registered
-        # a command line option for that purpose. If it's the case, we check that
-        # this option was not already define
-        if warning_as_error is True:
-            wae_args = self.get_warning_as_error_arg()
-            if isinstance(wae_args, str):
-                wae_args = wae_args.split()
-            if not all(wae_arg in cmdline for wae_arg in wae_args):
-                cmdline.extend(wae_args)
+        cmdline = self.get_cmdline(
+            project_file, variant_args, raw_args, warning_as_error
+        )
 
         # Create the build info object
         buildinfo = BuildInfo(
@@ -153,14 +284,42 @@ class Builder(Hook, abstract=True):
         # Run pre_build method if required
         self.pre_build(buildinfo, **variables)
 
+        # Keep the errors of the output while it is read
+        excerpt = FailureExcerpt(pattern=self.error_pattern)
+        on_output = kwargs.pop("on_output", None)
+
+        def feed_output(text: str) -> None:
+            excerpt.feed(text)
+            if on_output is not None:
+                on_output(text)
+
         # Get an approximation build time execution
         time_started = time.time()
 
         # Build the application. In case the command is not found, we catch
         # the exception and make a result out of it.
         try:
-            status_code, output = self.execute(cmdline, **kwargs)
-        except BuildCommandNotFound as e:
+            toolchain = self.resolve_toolchain()
+            if toolchain is not None and not toolchain.is_available:
+                raise ToolchainError(cmdline, toolchain)
+            status_code, output = self.execute(
+                cmdline,
+                timeout=timeout if timeout is not None else self.timeout,
+                stall_timeout=(
+                    stall_timeout if stall_timeout is not None else self.stall_timeout
+                ),
+                on_output=feed_output,
+                **kwargs,
+            )
+        except (BuildCommandNotFound, ToolchainError) as e:
+            build_result = BuildResult(Result(Status.FAILURE, str(e)), str(e))
+        except BuildTimeoutError as e:
+            build_result = BuildResult(Result(Status.FAILURE, str(e)), e.output)
+            build_result.execution_time = time.time() - time_started
+        except BuildCancelledError as e:
+            build_result = BuildResult(Result(Status.SKIPPED, str(e)), e.output)
+            build_result.execution_time = time.time() - time_started
+        except WorkerError as e:
             build_result = BuildResult(Result(Status.FAILURE, str(e)), str(e))
         else:
             # Get the execution time of the build
@@ -174,13 +333,26 @@ class Builder(Hook, abstract=True):
         # Save the build info for later use
         build_result.build_info = buildinfo
 
+        # Report the errors of a failed build unless the parser did
+        if build_result.is_fail and build_result.result.text is None:
+            if not excerpt.lines and build_result.output:
+                excerpt.feed(build_result.output)
+            text = [excerpt.text()]
+            if output_file:
+                text.append(f"Full log: {output_file}")
+            build_result.result.text = "\n\n".join(part for part in text if part)
+
         # Display the result. Let the user re-define that if wanted
         self.display_result(build_result)
 
         # Save the log into the artifact path
         if output_file:
-            with open(output_file, "w+") as f:
-                f.write(build_result.output)
+            if str(output_file).endswith(".gz"):
+                with gzip.open(output_file, "wt") as f:
+                    f.write(build_result.output)
+            else:
+                with open(output_file, "w+") as f:
+                    f.write(build_result.output)
 
         # call the post_build method
         output_dir = Path(output_file).parent
@@ -188,6 +360,46 @@ class Builder(Hook, abstract=True):
 
         return build_result
 
+    def get_cmdline(
+        self,
+        project_file: Union[str, os.PathLike],
+        variant_args: dict = {},
+        raw_args: list[str] = [],
+        warning_as_error: bool = False,
+    ) -> list[str]:
+        """Return the command line used to build the application"""
+        main_args = self.get_main_args(project_file, **variant_args)
+        if isinstance(main_args, str):
+            main_args = main_args.split()
+
+        # Raise an error if main_args is None
+        if main_args is None:
+            raise RuntimeError(
+                "'get_main_args' method must return a list or a string of args"
+            )
+
+        # Add the user options
+        args_list = main_args + raw_args
+
+        # Build the command line arguments
+        cmdline = [self.executable]
+        cmdline.extend(args_list)
+
+        # Add persistent builder options
+        cmdline.extend(self.persistant_options)
+
+        # if warning_as_error is True, we check if the builder has registered
+        # a command line option for that purpose. If it's the case, we check that
+        # this option was not already define
+        if warning_as_error is True:
+            wae_args = self.get_warning_as_error_arg()
+            if isinstance(wae_args, str):
+                wae_args = wae_args.split()
+            if not all(wae_arg in cmdline for wae_arg in wae_args):
+                cmdline.extend(wae_args)
+
+        return cmdline
+
     @abstractmethod
     def get_main_args(
         self, project_file: Union[str, os.PathLike], **variant_args
@@ -198,8 +410,20 @@ class Builder(Hook, abstract=True):
     def execute(
         self, commands: list[str], **subprocess_args: Any
     ) -> Tuple[int, Union[str, bytes], str]:
+        if self.persistent_worker:
+            return self._execute_in_worker(commands, **subprocess_args)
         return self._execute(commands, **subprocess_args)
 
+    def get_worker_command(self) -> list[str]:
+        """Return the command line that starts the persistent worker"""
+        return [self.executable]
+
+    def close(self) -> None:
+        """Stop the persistent worker if one was started"""
+        if self._worker is not None:
+            self._worker.stop()
+            self._worker = None
+
     def display_result(self, build_result: BuildResult) -> None:
         """Display build result"""
         status_msg = build_result.get_status_message()
@@ -227,23 +451,28 @@ class Builder(Hook, abstract=True):
         silent: bool = True,
         shell: Union[None, bool] = None,
         env: Union[None, Mapping[str, str]] = None,
+        timeout: Optional[float] = None,
+        stall_timeout: Optional[float] = None,
+        on_output: Optional[Callable[[str], None]] = None,
+        cancel_token: Optional[CancellationToken] = None,
         **subprocess_kwargs: Any,
     ) -> Tuple[int, Union[str, bytes], str]:
         """
         Handles executing the command on the shell and consumes and returns
-        the returned information (status_code, stdout/stderr)
+        the returned information (status_code, stdout/stderr).
+        If the timeout or the stall_timeout expires, the whole process group
+        is killed and a BuildTimeoutError is raised. on_output is called with
+        each line of output as soon as it is read. If the cancel_token is
+        cancelled, the process group is killed and a BuildCancelledError is
+        raised.
         """
 
         # Output of the command. Represented as a list to append evert
         # line we read from the subprocess. This allow real-time output
         output = []
 
-        # Don't automatically merge with os.environ for security reasons.
-        # Make this forwarding explicit rather than implicit.
-        inline_env = env
-        env = os.environ.copy()
-        if inline_env is not None:
-            env.update(inline_env)
+        # The per build variables override the builder environment
+        env = self.environment.update(env)
 
         cmd_not_found_exception = FileNotFoundError
         if os.name == "nt":
@@ -256,6 +485,14 @@ class Builder(Hook, abstract=True):
 
         logger.debug("Running following commands: {}\n".format(command))
 
+        if cancel_token is not None and cancel_token.cancelled:
+            raise BuildCancelledError(command, cancel_token.reason)
+
+        # Run the command in its own process group so that every child process
+        # can be killed if a timeout expires or if the build is cancelled.
+        if timeout is not None or stall_timeout is not None or cancel_token:
+            subprocess_kwargs = new_process_group_kwargs() | subprocess_kwargs
+
         try:
             process = subprocess.Popen(
                 command,
@@ -270,19 +507,34 @@ class Builder(Hook, abstract=True):
             if silent is True:
                 print("Building...")
 
+            unregister = None
+            if cancel_token is not None:
+                unregister = cancel_token.register(lambda: kill_process_group(process))
+
             # Display realtime output and save it
             logger.debug("Command generated following output: ")
-            while True:
-                stdout = process.stdout.readline()
-                return_code = process.poll()
-                if not stdout and return_code is not None:
-                    break
-                if stdout:
+            try:
+                for stdout in self._iter_output(process, timeout, stall_timeout):
                     stdout = safe_decode(stdout)
                     if silent is False:
                         sys.stdout.write(stdout)
                         sys.stdout.flush()
+                    if on_output is not None:
+                        on_output(stdout)
                     output.append(stdout)
+                process.wait()
+            except OutputExpired as err:
+                kill_process_group(process)
+                raise BuildTimeoutError(command, str(err), "".join(output)) from None
+            except BaseException:
+                kill_process_group(process)
+                raise
+            finally:
+                if unregister is not None:
+                    unregister()
+
+            if cancel_token is not None and cancel_token.cancelled:
+                raise BuildCancelledError(command, cancel_token.reason, "".join(output))
 
         except cmd_not_found_exception as err:
             raise BuildCommandNotFound(command, err) from err
@@ -290,6 +542,85 @@ class Builder(Hook, abstract=True):
             output = "".join(output)
             return process.returncode, output
 
+    def _execute_in_worker(
+        self,
+        command: Sequence[Any],
+        silent: bool = True,
+        env: Union[None, Mapping[str, str]] = None,
+        timeout: Optional[float] = None,
+        stall_timeout: Optional[float] = None,
+        on_output: Optional[Callable[[str], None]] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        **kwargs: Any,
+    ) -> Tuple[int, str]:
+        """
+        Send the command arguments to the persistent worker. The worker is
+        started on the first build and restarted if it died. Cancelling the
+        cancel_token kills the worker.
+        """
+        if cancel_token is not None and cancel_token.cancelled:
+            raise BuildCancelledError(command, cancel_token.reason)
+
+        if self._worker is None:
+            self._worker = BuilderWorker(
+                self.get_worker_command(),
+                env=self.environment,
+                max_builds=self.worker_max_builds,
+            )
+
+        def write_output(text: str) -> None:
+            if silent is False:
+                sys.stdout.write(text)
+                sys.stdout.flush()
+            if on_output is not None:
+                on_output(text)
+
+        if silent is True:
+            print("Building...")
+
+        cmd_not_found_exception = FileNotFoundError
+        if os.name == "nt":
+            cmd_not_found_exception = OSError
+
+        worker = self._worker
+        unregister = None
+        if cancel_token is not None:
+            unregister = cancel_token.register(worker.kill)
+
+        try:
+            return worker.build(
+                list(command[1:]), env, timeout, stall_timeout, write_output
+            )
+        except Exception as err:
+            # The worker was killed because the build was cancelled
+            if cancel_token is not None and cancel_token.cancelled:
+                raise BuildCancelledError(command, cancel_token.reason) from None
+            if isinstance(err, OutputExpired):
+                raise BuildTimeoutError(command, str(err)) from None
+            if isinstance(err, cmd_not_found_exception):
+                raise BuildCommandNotFound(worker.command, err) from err
+            raise
+        finally:
+            if unregister is not None:
+                unregister()
+
+    @staticmethod
+    def _iter_output(
+        process: subprocess.Popen,
+        timeout: Optional[float] = None,
+        stall_timeout: Optional[float] = None,
+    ) -> Iterator[str]:
+        """
+        Yield each line written by the process. If a timeout is given, the
+        lines are read from a separate thread so that we can stop waiting
+        when the timeout or the stall timeout expires.
+        """
+        if timeout is None and stall_timeout is None:
+            yield from iter(process.stdout.readline, "")
+            return
+        lines = start_reader(process.stdout)
+        yield from iter_lines(lines, timeout, stall_timeout)
+
     def get_warning_as_error_arg(self) -> Union[str, list]:
         """Return the command line argument that enable warning as error"""
         return []
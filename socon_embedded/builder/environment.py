@@ -0,0 +1,101 @@
+"""
+Immutable environment of the builds.
+
+The environment of a build is made of layers: the environment of the
+current process, the BUILD_ENVIRONMENT_VARIABLE entries of the project, the
+variables of the builder and the variables given for one build. Each layer
+returns a new environment, so an environment can be computed once and
+shared by every builder and every build without copying os.environ again.
+"""
+from __future__ import annotations
+
+import os
+
+from typing import TYPE_CHECKING, Iterable, Iterator, Mapping, Optional, Tuple
+
+if TYPE_CHECKING:
+    from socon.core.registry.config import ProjectConfig
+
+# Variables holding a list of paths. Their entries are deduplicated
+PATH_VARIABLES = ["PATH"]
+
+
+def _normalize_key(key: str) -> str:
+    # Environment variable names are case insensitive on Windows
+    return key.upper() if os.name == "nt" else key
+
+
+def join_paths(*values: str) -> str:
+    """Join os.pathsep separated lists of paths, without duplicates"""
+    entries = {}
+    for value in values:
+        for entry in value.split(os.pathsep):
+            if entry:
+                entries.setdefault(entry, None)
+    return os.pathsep.join(entries)
+
+
+class BuildEnvironment(Mapping[str, str]):
+    """Immutable mapping of environment variables"""
+
+    __slots__ = ["_variables"]
+
+    def __init__(self, variables: Optional[Mapping[str, str]] = None) -> None:
+        self._variables = {
+            _normalize_key(key): str(value) for key, value in (variables or {}).items()
+        }
+        for key in PATH_VARIABLES:
+            if key in self._variables:
+                self._variables[key] = join_paths(self._variables[key])
+
+    @classmethod
+    def from_os(cls) -> BuildEnvironment:
+        """Create an environment from the environment of the current process"""
+        return cls(os.environ)
+
+    def __getitem__(self, key: str) -> str:
+        return self._variables[_normalize_key(key)]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._variables)
+
+    def __len__(self) -> int:
+        return len(self._variables)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._variables!r})"
+
+    def update(self, variables: Optional[Mapping[str, str]] = None) -> BuildEnvironment:
+        """Return a new environment where the variables override the current ones"""
+        if not variables:
+            return self
+        return BuildEnvironment({**self._variables, **variables})
+
+    def extend(self, variables: Iterable[Tuple[str, str]]) -> BuildEnvironment:
+        """
+        Return a new environment where each (name, value) entry is appended to
+        the existing variable with os.pathsep. Entries already in the variable
+        are not added twice.
+        """
+        new = dict(self._variables)
+        for key, value in variables:
+            key = _normalize_key(key)
+            new[key] = join_paths(new[key], value) if key in new else value
+        return BuildEnvironment(new)
+
+
+def get_project_environment(
+    project_config: Optional[ProjectConfig] = None,
+) -> BuildEnvironment:
+    """
+    Return the environment of the current process with the entries of the
+    project BUILD_ENVIRONMENT_VARIABLE setting appended to it.
+    """
+    environment = BuildEnvironment.from_os()
+    if project_config is not None:
+        environment = environment.extend(
+            project_config.get_setting(
+                "BUILD_ENVIRONMENT_VARIABLE", skip=True, default=[]
+            )
+        )
+    return environment
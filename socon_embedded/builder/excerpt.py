@@ -0,0 +1,114 @@
+"""
+Compact excerpt of a failed build output.
+
+The output is fed line by line while the build runs. Only a bounded number
+of lines is kept: the lines preceding the current one (ring buffer), the
+first unique error blocks with their context and the last lines of the
+output, used when no error line is recognized.
+"""
+import re
+
+from collections import deque
+from typing import List, Optional, Pattern, Set, Union
+
+# Lines reported as errors by the usual compilers and linkers
+ERROR_PATTERN = r"(?i)\b(error|fatal)\b|undefined reference|\bfailed\b"
+
+
+class FailureExcerpt:
+    """Keep the first max_blocks unique error blocks of an output"""
+
+    def __init__(
+        self,
+        max_blocks: int = 5,
+        context: int = 3,
+        tail: int = 20,
+        max_line_length: int = 500,
+        pattern: Union[str, Pattern[str]] = ERROR_PATTERN,
+    ) -> None:
+        self.max_blocks = max_blocks
+        self.context = context
+        self.max_line_length = max_line_length
+        self.pattern = re.compile(pattern) if isinstance(pattern, str) else pattern
+
+        self.blocks: List[List[str]] = []
+        self.lines = 0
+        self.errors = 0
+        self.duplicates = 0
+
+        self._before: deque = deque(maxlen=context)
+        self._tail: deque = deque(maxlen=tail)
+        self._seen: Set[str] = set()
+
+        # Block receiving the lines after its last error, and their number
+        self._current: Optional[List[str]] = None
+        self._after = 0
+
+    def _truncate(self, line: str) -> str:
+        if len(line) > self.max_line_length:
+            return line[: self.max_line_length] + "..."
+        return line
+
+    @staticmethod
+    def _normalize(line: str) -> str:
+        """Errors that only differ by their numbers are duplicates"""
+        return re.sub(r"\d+", "#", line.strip())
+
+    def feed(self, text: str) -> None:
+        """Add one or more lines of output"""
+        for line in text.splitlines():
+            self.lines += 1
+            self._feed_line(self._truncate(line))
+
+    def _feed_line(self, line: str) -> None:
+        self._tail.append(line)
+
+        if self.pattern.search(line):
+            self.errors += 1
+            key = self._normalize(line)
+            if key in self._seen:
+                self.duplicates += 1
+            elif self._current is not None:
+                # Error in the context of the previous one: same block
+                self._seen.add(key)
+                self._current.append(line)
+                self._after = 0
+                self._close_block()
+                return
+            elif len(self.blocks) < self.max_blocks:
+                self._seen.add(key)
+                self._current = [*self._before, line]
+                self.blocks.append(self._current)
+                self._after = 0
+                self._before.clear()
+                self._close_block()
+                return
+
+        if self._current is not None:
+            self._current.append(line)
+            self._after += 1
+            self._close_block()
+        else:
+            self._before.append(line)
+
+    def _close_block(self) -> None:
+        """Stop adding lines to the block once its context is complete"""
+        if self._after >= self.context:
+            self._current = None
+
+    def text(self) -> str:
+        if not self.blocks:
+            return "\n".join(self._tail)
+        excerpt = "\n...\n".join("\n".join(block) for block in self.blocks)
+        if self.errors > len(self._seen):
+            excerpt += "\n... {} more error line(s) ({} duplicate(s))".format(
+                self.errors - len(self._seen), self.duplicates
+            )
+        return excerpt
+
+
+def extract_excerpt(output: str, **kwargs) -> str:
+    """Return the excerpt of a whole output"""
+    excerpt = FailureExcerpt(**kwargs)
+    excerpt.feed(output)
+    return excerpt.text()
@@ -0,0 +1,105 @@
+import os
+import queue
+import signal
+import subprocess
+import threading
+import time
+
+from typing import Iterator, Optional, TextIO
+
+
+class OutputExpired(Exception):
+    """Raised when a timeout expires while waiting for a process output"""
+
+
+def enqueue_lines(stream: TextIO, lines: queue.Queue) -> None:
+    """Read each line of a stream and put them into the queue"""
+    for line in iter(stream.readline, ""):
+        lines.put(line)
+    lines.put(None)
+
+
+def start_reader(stream: TextIO) -> queue.Queue:
+    """Read the stream from a daemon thread. Return the queue of lines"""
+    lines = queue.Queue()
+    reader = threading.Thread(target=enqueue_lines, args=(stream, lines), daemon=True)
+    reader.start()
+    return lines
+
+
+def iter_lines(
+    lines: queue.Queue,
+    timeout: Optional[float] = None,
+    stall_timeout: Optional[float] = None,
+) -> Iterator[str]:
+    """
+    Yield the lines put in the queue until the None sentinel is received.
+    Raise OutputExpired if the timeout expires or if no line was received
+    during stall_timeout seconds.
+    """
+    started = last_output = time.monotonic()
+    while True:
+        deadlines = []
+        if timeout is not None:
+            deadlines.append((started + timeout, f"timed out after {timeout}s"))
+        if stall_timeout is not None:
+            deadlines.append(
+                (
+                    last_output + stall_timeout,
+                    f"stalled: no output for {stall_timeout}s",
+                )
+            )
+
+        try:
+            if deadlines:
+                deadline, reason = min(deadlines)
+                line = lines.get(timeout=max(0, deadline - time.monotonic()))
+            else:
+                line = lines.get()
+        except queue.Empty:
+            if time.monotonic() >= deadline:
+                raise OutputExpired(reason)
+            continue
+
+        # The reader put None once the process closed its output
+        if line is None:
+            return
+        last_output = time.monotonic()
+        yield line
+
+
+def new_process_group_kwargs() -> dict:
+    """Popen arguments that start the process in its own process group"""
+    if os.name == "nt":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def kill_process_group(process: subprocess.Popen) -> None:
+    """
+    Kill the process and every process started in its group. The group is
+    killed even if the process already exited: a child it left behind may
+    still hold its output.
+    """
+    if os.name == "nt":
+        # The process handle is still open: its pid can not be reused
+        subprocess.run(
+            ["taskkill", "/T", "/F", "/PID", str(process.pid)],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        return
+
+    # The process started a new session: its group id is its pid. The id
+    # is not reused while a process of the group is alive.
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        # The process did not start a new group or the group is empty
+        if process.poll() is None:
+            process.kill()
+    process.wait()
@@ -1,9 +1,20 @@
-from dataclasses import dataclass
-from typing import TYPE_CHECKING, Optional, Union
+import sys
+
+from array import array
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any, Dict, Hashable, Iterable, List, Optional, Union
 
 if TYPE_CHECKING:
     from socon_embedded.builder import BuildInfo
 
+# dataclass(slots=True) is only available from Python 3.10
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+def intern_string(value: Any) -> Any:
+    """Intern the strings repeated by many results, keep the other values"""
+    return sys.intern(value) if isinstance(value, str) else value
+
 
 class Status:
     PASS: int = 0
@@ -11,7 +22,7 @@ class Status:
     SKIPPED: int = -1
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class Result:
     status_code: int = Status.PASS
     message: Optional[str] = None
@@ -21,11 +32,9 @@ class Result:
 class BuildResult:
     """Base class that stores build result"""
 
-    def __init__(
-        self,
-        result: Result,
-        output: Optional[str] = None
-    ) -> None:
+    __slots__ = ("result", "output", "build_info", "execution_time")
+
+    def __init__(self, result: Result, output: Optional[str] = None) -> None:
         self.result = result
         self.output = output
         self.build_info: BuildInfo = None
@@ -43,7 +52,200 @@ class BuildResult:
 
     def get_status_message(self) -> str:
         if self.is_fail:
-            return 'FAIL'
+            return "FAIL"
         elif self.is_skipped:
-            return 'SKIPPED'
-        return 'PASS'
+            return "SKIPPED"
+        return "PASS"
+
+    def to_dict(self) -> dict:
+        """Return a JSON serializable representation of the result"""
+        return {
+            "result": asdict(self.result),
+            "output": self.output,
+            "build_info": asdict(self.build_info) if self.build_info else None,
+            "execution_time": self.execution_time,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BuildResult":
+        from socon_embedded.builder import BuildInfo
+
+        build_result = cls(Result(**data["result"]), data.get("output"))
+        if data.get("build_info") is not None:
+            build_result.build_info = BuildInfo(**data["build_info"])
+        build_result.execution_time = data.get("execution_time", 0)
+        return build_result
+
+
+class StringColumn:
+    """Dictionary encoded column: each distinct value is stored once"""
+
+    __slots__ = ("values", "codes", "_codes")
+
+    def __init__(self, values: Iterable[Hashable] = ()) -> None:
+        self.values: List[Hashable] = []
+        self.codes = array("I")
+        self._codes: Dict[Hashable, int] = {}
+        for value in values:
+            self.append(value)
+
+    def append(self, value: Hashable) -> None:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def code(self, value: Hashable) -> Optional[int]:
+        return self._codes.get(value)
+
+    def __getitem__(self, row: int) -> Hashable:
+        return self.values[self.codes[row]]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def to_dict(self) -> dict:
+        return {"values": list(self.values), "codes": self.codes.tolist()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StringColumn":
+        column = cls()
+        column.values = list(data["values"])
+        column.codes = array("I", data["codes"])
+        column._codes = {value: code for code, value in enumerate(column.values)}
+        return column
+
+
+class ResultTable:
+    """
+    Columnar storage of the results of many builds. The names, variant args
+    and messages repeated by the builds are stored once. The build output
+    is not kept, it is saved in the artifact directory.
+    """
+
+    STRING_COLUMNS = ("app", "builder", "project_file", "variant_args", "message")
+
+    def __init__(self, results: Iterable[BuildResult] = ()) -> None:
+        self.app = StringColumn()
+        self.builder = StringColumn()
+        self.project_file = StringColumn()
+        self.variant_args = StringColumn()
+        self.message = StringColumn()
+        self.cmdline: List[tuple] = []
+        self.status = array("i")
+        self.execution_time = array("d")
+
+        # Only the failed builds have a text, usually
+        self.text: Dict[int, str] = {}
+
+        self.extend(results)
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    def append(self, result: BuildResult) -> None:
+        info = result.build_info
+        row = len(self)
+        self.app.append(info.app)
+        self.builder.append(info.builder)
+        self.project_file.append(str(info.project_file))
+        self.variant_args.append(tuple(info.variant_args.items()))
+        self.message.append(result.result.message)
+        self.cmdline.append(tuple(info.cmdline))
+        self.status.append(result.result.status_code)
+        self.execution_time.append(result.execution_time)
+        if result.result.text is not None:
+            self.text[row] = result.result.text
+
+    def extend(self, results: Iterable[BuildResult]) -> None:
+        for result in results:
+            self.append(result)
+
+    def get(self, row: int) -> BuildResult:
+        """Create the BuildResult of a row, without its output"""
+        from socon_embedded.builder import BuildInfo
+
+        result = BuildResult(
+            Result(self.status[row], self.message[row], self.text.get(row))
+        )
+        result.build_info = BuildInfo(
+            self.app[row],
+            self.builder[row],
+            self.project_file[row],
+            dict(self.variant_args[row]),
+            list(self.cmdline[row]),
+        )
+        result.execution_time = self.execution_time[row]
+        return result
+
+    def where(self, status: Optional[str] = None, **columns: Hashable) -> List[int]:
+        """
+        Return the rows with the given status (PASS, FAIL or SKIPPED) and
+        column values, e.g: where("FAIL", builder="gcc")
+        """
+        rows = range(len(self))
+        if status == "FAIL":
+            rows = [row for row in rows if self.status[row] >= Status.FAILURE]
+        elif status == "SKIPPED":
+            rows = [row for row in rows if self.status[row] <= Status.SKIPPED]
+        elif status == "PASS":
+            rows = [
+                row
+                for row in rows
+                if Status.SKIPPED < self.status[row] < Status.FAILURE
+            ]
+        for name, value in columns.items():
+            column: StringColumn = getattr(self, name)
+            if name == "variant_args" and isinstance(value, dict):
+                value = tuple(value.items())
+            code = column.code(value)
+            codes = column.codes
+            rows = [row for row in rows if codes[row] == code]
+        return list(rows)
+
+    def count_by(self, name: str, status: Optional[str] = None) -> Dict[Hashable, int]:
+        """Number of builds by value of a column, e.g: the failures by builder"""
+        column: StringColumn = getattr(self, name)
+        counts = [0] * len(column.values)
+        for row in self.where(status):
+            counts[column.codes[row]] += 1
+        return {value: count for value, count in zip(column.values, counts) if count}
+
+    def get_status_message(self, row: int) -> str:
+        code = self.status[row]
+        if code >= Status.FAILURE:
+            return "FAIL"
+        elif code <= Status.SKIPPED:
+            return "SKIPPED"
+        return "PASS"
+
+    def to_dict(self) -> dict:
+        """Return a JSON serializable representation of the table"""
+        data = {name: getattr(self, name).to_dict() for name in self.STRING_COLUMNS}
+        data["variant_args"]["values"] = [
+            dict(items) for items in data["variant_args"]["values"]
+        ]
+        data["cmdline"] = [list(cmdline) for cmdline in self.cmdline]
+        data["status"] = self.status.tolist()
+        data["execution_time"] = self.execution_time.tolist()
+        data["text"] = {str(row): text for row, text in self.text.items()}
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ResultTable":
+        table = cls()
+        for name in cls.STRING_COLUMNS:
+            if name != "variant_args":
+                setattr(table, name, StringColumn.from_dict(data[name]))
+        table.variant_args = StringColumn.from_dict(
+            {
+                "values": [tuple(v.items()) for v in data["variant_args"]["values"]],
+                "codes": data["variant_args"]["codes"],
+            }
+        )
+        table.cmdline = [tuple(cmdline) for cmdline in data["cmdline"]]
+        table.status = array("i", data["status"])
+        table.execution_time = array("d", data["execution_time"])
+        table.text = {int(row): text for row, text in data["text"].items()}
+        return table
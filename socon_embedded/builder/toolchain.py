@@ -0,0 +1,87 @@
+import os
+import shutil
+import subprocess
+
+from dataclasses import dataclass
+from typing import Mapping, Optional, Sequence
+
+
+@dataclass(frozen=True)
+class Toolchain:
+    """Result of the resolution of a builder executable"""
+
+    executable: str
+
+    # Absolute path of the executable. None if it was not resolved
+    path: Optional[str] = None
+
+    # First line written by the version probe, if any
+    version: Optional[str] = None
+
+    # Why the toolchain cannot be used. None if it can
+    error: Optional[str] = None
+
+    @property
+    def is_available(self) -> bool:
+        return self.error is None
+
+
+def find_executable(
+    executable: str, env: Optional[Mapping[str, str]] = None
+) -> Optional[str]:
+    """Return the path of an executable using the PATH of env, if given"""
+    path = env.get("PATH") if env is not None else None
+    return shutil.which(executable, path=path)
+
+
+def probe_version(
+    path: str,
+    args: Sequence[str],
+    env: Optional[Mapping[str, str]] = None,
+    timeout: float = 10,
+) -> str:
+    """
+    Run the executable with the version arguments and return the first line
+    of its output. Raise a RuntimeError if it cannot be run or fails.
+    """
+    try:
+        process = subprocess.run(
+            [path, *args],
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+            timeout=timeout,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise RuntimeError(str(e)) from None
+    if process.returncode != 0:
+        raise RuntimeError(f"exited with status code {process.returncode}")
+    lines = [line.strip() for line in process.stdout.splitlines() if line.strip()]
+    return lines[0] if lines else ""
+
+
+def resolve_toolchain(
+    executable: str,
+    env: Optional[Mapping[str, str]] = None,
+    version_args: Optional[Sequence[str]] = None,
+) -> Toolchain:
+    """Find an executable and run its version probe if version_args is given"""
+    executable = os.fspath(executable)
+    path = find_executable(executable, env)
+    if path is None:
+        return Toolchain(
+            executable, error=f"Toolchain executable '{executable}' not found"
+        )
+    version = None
+    if version_args is not None:
+        try:
+            version = probe_version(path, version_args, env)
+        except RuntimeError as e:
+            return Toolchain(
+                executable,
+                path,
+                error=f"Toolchain '{path}' version probe failed: {e}",
+            )
+    return Toolchain(executable, path, version)
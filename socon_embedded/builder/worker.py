@@ -0,0 +1,211 @@
+"""
+Long-lived builder worker processes.
+
+Some toolchains spend seconds starting up before doing any work. A builder
+can start a worker once and send it every build instead of spawning a new
+process for each of them. The worker reads JSON requests on its stdin and
+answers with JSON lines on its stdout, one request at a time:
+
+    -> {"id": 1, "args": ["project.ewp", "-build", "Debug"], "env": {}}
+    <- {"id": 1, "output": "Building project.ewp\\n"}
+    <- {"id": 1, "status_code": 0}
+
+Any number of "output" messages can be sent before the final "status_code"
+one. A ping request {"id": 2, "ping": true} must be answered with
+{"id": 2, "pong": true}. The worker must exit when its stdin is closed.
+Python based workers can use the `serve` function to implement the protocol.
+"""
+import json
+import logging
+import os
+import subprocess
+import sys
+
+from typing import Callable, Iterator, Mapping, Optional, TextIO, Tuple
+
+from socon_embedded.builder.process import (
+    OutputExpired,
+    iter_lines,
+    kill_process_group,
+    new_process_group_kwargs,
+    start_reader,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerError(Exception):
+    """Raised when a builder worker does not respect the protocol or died"""
+
+
+class BuilderWorker:
+    """Handle a long-lived worker process that executes the builds"""
+
+    def __init__(
+        self,
+        command: list[str],
+        env: Optional[Mapping[str, str]] = None,
+        max_builds: Optional[int] = None,
+        startup_timeout: Optional[float] = 30,
+    ) -> None:
+        self.command = command
+        self.env = env
+        self.max_builds = max_builds
+        self.startup_timeout = startup_timeout
+
+        self._process: Optional[subprocess.Popen] = None
+        self._lines = None
+        self._request_id = 0
+        self.builds = 0
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._process.pid if self._process is not None else None
+
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def start(self) -> None:
+        """Start the worker and wait until it answers to a ping"""
+        self._process = subprocess.Popen(
+            self.command,
+            env=self.env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+            **new_process_group_kwargs(),
+        )
+        self._lines = start_reader(self._process.stdout)
+        self.builds = 0
+        try:
+            self.ping(self.startup_timeout)
+        except (WorkerError, OutputExpired) as e:
+            self.kill()
+            raise WorkerError(f"Worker {self.command} did not start: {e}") from None
+
+    def ping(self, timeout: Optional[float] = None) -> None:
+        """Health check of the worker. Raise WorkerError if it does not answer"""
+        request_id = self._send({"ping": True})
+        for message in self._iter_messages(request_id, timeout):
+            if message.get("pong") is True:
+                return
+        raise WorkerError("Worker exited before answering the ping")
+
+    def build(
+        self,
+        args: list[str],
+        env: Optional[Mapping[str, str]] = None,
+        timeout: Optional[float] = None,
+        stall_timeout: Optional[float] = None,
+        on_output: Optional[Callable[[str], None]] = None,
+    ) -> Tuple[int, str]:
+        """
+        Send a build request to the worker. The worker is (re)started if it is
+        not running and recycled once it executed max_builds builds.
+        Return the status code and the output of the build.
+        """
+        if not self.is_alive():
+            self.start()
+
+        output = []
+        request_id = self._send({"args": args, "env": dict(env or {})})
+        try:
+            for message in self._iter_messages(request_id, timeout, stall_timeout):
+                if "output" in message:
+                    output.append(message["output"])
+                    if on_output is not None:
+                        on_output(message["output"])
+                if "status_code" in message:
+                    break
+            else:
+                raise WorkerError("Worker exited while building")
+        except BaseException:
+            # The worker is in an unknown state. The next build restarts it
+            self.kill()
+            raise
+
+        self.builds += 1
+        if self.max_builds is not None and self.builds >= self.max_builds:
+            self.stop()
+
+        return message["status_code"], "".join(output)
+
+    def stop(self, timeout: float = 5) -> None:
+        """Ask the worker to exit by closing its stdin. Kill it if it does not"""
+        if self._process is None:
+            return
+        try:
+            self._process.stdin.close()
+            self._process.wait(timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            kill_process_group(self._process)
+        self._process = None
+
+    def kill(self) -> None:
+        if self._process is None:
+            return
+        kill_process_group(self._process)
+        self._process = None
+
+    def _send(self, request: dict) -> int:
+        self._request_id += 1
+        request["id"] = self._request_id
+        try:
+            self._process.stdin.write(json.dumps(request) + "\n")
+            self._process.stdin.flush()
+        except OSError as e:
+            raise WorkerError(f"Could not send the request to the worker: {e}")
+        return self._request_id
+
+    def _iter_messages(
+        self,
+        request_id: int,
+        timeout: Optional[float] = None,
+        stall_timeout: Optional[float] = None,
+    ) -> Iterator[dict]:
+        """Yield the messages answering the request"""
+        for line in iter_lines(self._lines, timeout, stall_timeout):
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                logger.debug("Ignore worker output: {}".format(line.rstrip()))
+                continue
+            if message.get("id") == request_id:
+                yield message
+
+
+def serve(
+    handler: Callable[[list[str], dict, Callable[[str], None]], int],
+    stdin: TextIO = None,
+    stdout: TextIO = None,
+) -> None:
+    """
+    Implement the worker side of the protocol. The handler is called with
+    the build arguments, the environment and a function to send output. It
+    returns the status code of the build.
+    """
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+
+    def send(message: dict) -> None:
+        stdout.write(json.dumps(message) + "\n")
+        stdout.flush()
+
+    for line in stdin:
+        request = json.loads(line)
+        request_id = request.get("id")
+        if request.get("ping"):
+            send({"id": request_id, "pong": True})
+            continue
+
+        def write(text: str) -> None:
+            send({"id": request_id, "output": text})
+
+        try:
+            status_code = handler(
+                request.get("args", []), request.get("env", {}), write
+            )
+        except Exception as e:
+            write(f"Worker error: {e}{os.linesep}")
+            status_code = 1
+        send({"id": request_id, "status_code": status_code})
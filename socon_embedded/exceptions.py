@@ -19,3 +19,7 @@ class ParserError(Exception):
 
 class TaskExecutionError(Exception):
     """Raised when a task failed for any exception"""
+
+
+class FilterError(Exception):
+    """Raised when a filter lookup is invalid or can not be evaluated"""
@@ -1,29 +1,49 @@
 import os
+from collections import defaultdict
 from pathlib import Path
 import shutil
 
-from typing import Any, Dict, Union
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 
-from socon_embedded.builder.result import BuildResult, Result, Status
+from socon_embedded.builder.result import BuildResult, Result, ResultTable, Status
 from socon_embedded.managers import BuilderManager
-from socon_embedded.schema.apps import AppRegistry, BuildConfig, AppConfig
+from socon_embedded.schema.apps import AppBuilder, AppRegistry, BuildConfig, AppConfig
+from socon_embedded.utils.cancel import CancellationToken
+from socon_embedded.utils.filters import compile_filters
 from socon_embedded.builder import BuildInfo, Builder
+from socon_embedded.builder.environment import BuildEnvironment, get_project_environment
+from socon_embedded.executor.events import (
+    BUILD_FINISHED,
+    BUILD_STARTED,
+    CONFIG_EXPANDED,
+    OUTPUT_CHUNK,
+    REGISTRY_LOADED,
+    REPORT_WRITTEN,
+    RUN_FINISHED,
+    RUN_STARTED,
+    EventBus,
+    OutputChunker,
+)
+from socon_embedded.executor.cache import BuildCache
+from socon_embedded.executor.journal import JOURNAL_FILE, BuildJournal, fingerprint
+from socon_embedded.executor.plan import BuildPlan, PlannedBuild, load_durations
+from socon_embedded.executor.progress import ProgressReporter
 from socon_embedded.executor.task_executor import TaskPlayer
 
 from socon.core.registry import projects
 from socon.core.registry.config import ProjectConfig
 from socon.utils.terminal import terminal
 
-from junitparser import JUnitXml, TestCase, TestSuite, Failure, Skipped
-
 
 class AppRegistryExecutor:
-
     def __init__(
         self,
         app_registry: AppRegistry,
         builder_manager: BuilderManager,
         project_config: ProjectConfig = None,
+        events: Optional[EventBus] = None,
+        cache: Optional[BuildCache] = None,
+        environment: Optional[BuildEnvironment] = None,
     ) -> None:
         self._app_registry = app_registry
         self._builder_manager = builder_manager
@@ -39,10 +59,29 @@ class AppRegistryExecutor:
         # Cache for used builder when building the application in the registry
         self._cached_builders: Dict[str, Builder] = {}
 
+        # Environment shared by every builder and task. The one of the
+        # project is created on the first build if none is given
+        self._environment = environment
+
         # Cache for applications results
         self._build_results: list[BuildResult] = []
 
+        # Replaced at the start of each build
+        self._cancel_token = CancellationToken()
+
+        # Artifacts of the passed builds shared between runs, if any
+        self.cache = cache
+
+        # Structured events of the runs. Sinks can subscribe at any time
+        self.events = events if events is not None else EventBus()
+        self.events.emit(
+            REGISTRY_LOADED,
+            registry=self._app_registry.name,
+            apps=len(self._app_registry.apps),
+        )
+
     def _clear_cache(self):
+        self._close_builders()
         self._cached_builders = {}
         self._build_results = []
 
@@ -60,8 +99,31 @@ class AppRegistryExecutor:
         output_dir: Union[str, os.PathLike] = None,
         exit_on_error: bool = False,
         warning_as_error: bool = False,
+        changed_files: Optional[Iterable[Union[str, os.PathLike]]] = None,
+        progress: Optional[ProgressReporter] = None,
+        resume: bool = False,
+        case_names: Optional[Iterable[str]] = None,
+        compress_logs: bool = False,
+        task_workers: Optional[int] = None,
     ) -> AppRegistry:
-        """Build the application in each registries based on the given filters"""
+        """
+        Build the application in each registries based on the given filters.
+        If changed_files is given, only the build configurations using one of
+        these files are built. If case_names is given, only the build
+        configurations reported with these junit case names are built. The
+        progress reporter, if any, receives the events of this run. If
+        compress_logs is True, the build logs are saved gzip compressed. The
+        parallel tasks of a task list run on at most task_workers threads.
+
+        Each finished build configuration is recorded in a journal in the
+        output directory. With resume, the configurations the journal
+        records with the same fingerprint are not built again and their
+        previous results are part of the report.
+
+        With a build cache, the artifacts of the configurations with inputs
+        are restored from the cache instead of being built when their inputs
+        and their configuration did not change. Their tasks are not run.
+        """
         self._clear_cache()
 
         # Re-define output_dir if not given
@@ -74,9 +136,18 @@ class AppRegistryExecutor:
 
         # Filter the application and return a AppRegistry with only the application
         # that we want to build
-        reg = self._app_registry.filter(filters, excludes)
+        reg, get_build_configs = self._select(
+            filters, excludes, variant_args_filters, changed_files, case_names
+        )
 
-        # Raise a LookupError if we don't find any build configuration
+        # Raise a LookupError if we don't find any build configuration. Changes
+        # that do not affect any application are not an error.
+        if not reg.apps and changed_files is not None:
+            terminal.line("No application is affected by the changed files")
+            return reg
+        if not reg.apps and case_names is not None:
+            terminal.line("None of the builds to run again is in the registry")
+            return reg
         if not reg.apps:
             raise LookupError(
                 "Nothing to build. You should check if you have registered your\n"
@@ -85,42 +156,103 @@ class AppRegistryExecutor:
 
         self.pre_build(reg)
 
-        # Stop building in case exit_on_error is True and an issue was found.
-        # This flag allow to still create a report with the rest of the application
-        # set as skipped
-        stop_building = False
+        if progress is not None:
+            self.events.subscribe(progress)
+        self.events.emit(RUN_STARTED, registry=reg.name, apps=len(reg.apps))
+
+        # Cancelled by cancel() or, if exit_on_error is True, by the first
+        # failure. The running build and tasks are stopped and the remaining
+        # configurations are still reported as skipped.
+        self._cancel_token = CancellationToken()
+
+        # Record the finished configurations to be able to resume the run
+        journal = BuildJournal(Path(output_dir, JOURNAL_FILE))
+        completed = journal.load() if resume else {}
+        journal.open(resume)
 
         # Run the general tasks in priority
-        task_player = TaskPlayer()
+        task_player = TaskPlayer(
+            self._app_registry.vars,
+            max_workers=task_workers,
+            events=self.events,
+            cancel_token=self._cancel_token,
+            environment=self._get_environment(),
+        )
         task_player.run(reg.tasks)
 
         # Build each build configuration
         for app_config in reg.apps:
-
             # Run the Application config tasks
             task_player.run(app_config.tasks)
 
             self.post_process_app_config(app_config)
 
             # Get all build configuration for each application
-            build_configs = app_config.get_build_configs(variant_args_filters)
+            build_configs = get_build_configs(app_config)
+            build_infos = [
+                build_config.create_buildinfo() for build_config in build_configs
+            ]
+            self.events.emit(
+                CONFIG_EXPANDED,
+                app=app_config.name,
+                builds=[build_info.get_case_name() for build_info in build_infos],
+            )
 
-            for build_config in build_configs:
+            for build_config, build_info in zip(build_configs, build_infos):
+                # Reuse the result of the interrupted run if the configuration
+                # did not change
+                build_fingerprint = fingerprint(
+                    build_config, warning_as_error=warning_as_error
+                )
+                previous = completed.get(build_fingerprint)
+                if previous is not None and not self._cancel_token.cancelled:
+                    self._build_results.append(previous)
+                    self._emit_build_finished(previous)
+                    if previous.is_fail and exit_on_error is True:
+                        self.cancel("Skipped due to previous error")
+                    continue
+
+                # Restore the artifacts of the same configuration and inputs
+                cache_key = None
+                if self.cache is not None and not self._cancel_token.cancelled:
+                    inputs = app_config.inputs or []
+                    builder = self._get_builder(build_config.builder.name)
+                    cache_key = self.cache.get_key(
+                        build_config,
+                        [*inputs, *(build_config.builder.inputs or [])],
+                        toolchain=builder.resolve_toolchain(),
+                        warning_as_error=warning_as_error,
+                        compress_logs=compress_logs,
+                        variables=self._app_registry.vars,
+                    )
+                if cache_key is not None:
+                    artifact_path = self._create_artifact_directory(
+                        build_info, output_dir
+                    )
+                    cached = self.cache.fetch(cache_key, artifact_path)
+                    if cached is not None:
+                        cached.build_info = build_info
+                        builder = self._get_builder(build_config.builder.name)
+                        builder.display_build_info(build_info)
+                        terminal.line("Restored from the build cache")
+                        builder.display_result(cached)
+                        self._build_results.append(cached)
+                        self._emit_build_finished(cached)
+                        journal.record(build_fingerprint, cached)
+                        continue
 
                 # Run the build config tasks
                 task_player.run(build_config.tasks)
 
-                # Create a build info object
-                build_info = build_config.create_buildinfo()
-
-                # If stop building is True, we still create result with skipped
+                # If the run is cancelled, we still create result with skipped
                 # status and the build info
-                if stop_building is True:
+                if self._cancel_token.cancelled:
                     result = BuildResult(
-                        Result(Status.SKIPPED, "Skipped due to previous error")
+                        Result(Status.SKIPPED, self._cancel_token.reason)
                     )
                     result.build_info = build_info
                     self._build_results.append(result)
+                    self._emit_build_finished(result)
                     continue
 
                 # Create the artifact directory
@@ -129,33 +261,73 @@ class AppRegistryExecutor:
                 self.pre_build_config(build_config)
 
                 # Build the application
+                case_name = build_info.get_case_name()
+                self.events.emit(
+                    BUILD_STARTED,
+                    build=case_name,
+                    app=build_info.app,
+                    builder=build_info.builder,
+                    variant_args=build_info.variant_args,
+                )
+                build_kwargs = {}
+                if self.events.active:
+                    chunker = OutputChunker(
+                        lambda text: self.events.emit(
+                            OUTPUT_CHUNK, build=case_name, text=text
+                        )
+                    )
+                    build_kwargs["on_output"] = chunker.write
                 builder = self._get_builder(build_config.builder.name)
                 result = builder.build(
                     **build_config.get_buildinfo(),
-                    output_file=Path(artifact_path, f"{build_info.app}.log"),
+                    output_file=Path(
+                        artifact_path,
+                        f"{build_info.app}.log" + (".gz" if compress_logs else ""),
+                    ),
                     warning_as_error=warning_as_error,
                     variables=self._app_registry.vars,
+                    cancel_token=self._cancel_token,
+                    **build_kwargs,
                 )
+                if build_kwargs:
+                    chunker.flush()
 
                 self.post_build_config(build_config, result)
+                self._emit_build_finished(result)
 
                 # Save the fail result of the current apps
                 self._build_results.append(result)
+                if not result.is_skipped:
+                    journal.record(build_fingerprint, result)
 
                 # In case we need to exit on error. We need to stop the build
                 # of all application but still put the next application that
                 # were not build as skipped for the junit report.
                 if result.is_fail and exit_on_error is True:
-                    stop_building = True
+                    self.cancel("Skipped due to previous error")
 
                 # Run the post build configs only if we decided not to stop
                 # building.
                 task_player.run(build_config.post_tasks)
 
+                # Share the artifacts, including the ones of the post tasks
+                if cache_key is not None:
+                    self.cache.store(cache_key, result, artifact_path)
+
             # Run the post application config tasks
             task_player.run(app_config.post_tasks)
 
         task_player.run(reg.post_tasks)
+        journal.close()
+
+        self.events.emit(
+            RUN_FINISHED,
+            registry=reg.name,
+            builds=len(self._build_results),
+            failures=sum(1 for result in self._build_results if result.is_fail),
+        )
+        if progress is not None:
+            self.events.unsubscribe(progress)
 
         # Call the post_build method for the user
         self.post_build(reg, output_dir)
@@ -163,8 +335,36 @@ class AppRegistryExecutor:
         # Clean all the tasks at the end
         task_player.cleanup()
 
+        # Stop the persistent builder workers
+        self._close_builders()
+
+        # Deliver the events of the run before returning
+        self.events.flush()
+
         return reg
 
+    def get_result_table(self) -> ResultTable:
+        """Return the results of the last build in a columnar table"""
+        return ResultTable(self._build_results)
+
+    def cancel(self, reason: str = "Cancelled") -> None:
+        """
+        Cancel the running build. The running builder processes are killed,
+        no task is started anymore and the remaining build configurations
+        are reported as skipped with the reason. Can be called from any
+        thread, e.g. from an event sink.
+        """
+        self._cancel_token.cancel(reason)
+
+    def _emit_build_finished(self, result: BuildResult) -> None:
+        self.events.emit(
+            BUILD_FINISHED,
+            build=result.build_info.get_case_name(),
+            builder=result.build_info.builder,
+            status=result.get_status_message(),
+            duration=result.execution_time,
+        )
+
     def pre_build(self, registry: AppRegistry):
         """Pre build method with the filtered application registry"""
 
@@ -180,18 +380,174 @@ class AppRegistryExecutor:
     def post_process_app_config(self, app_config: AppConfig):
         """Post processing the application config"""
 
+    def _select(
+        self,
+        filters: Dict[str, Any] = {},
+        excludes: Dict[str, Any] = {},
+        variant_args_filters: Dict[str, Any] = {},
+        changed_files: Optional[Iterable[Union[str, os.PathLike]]] = None,
+        case_names: Optional[Iterable[str]] = None,
+    ) -> Tuple[AppRegistry, Callable[[AppConfig], List[BuildConfig]]]:
+        """
+        Return the filtered registry and a function returning the build
+        configurations of one of its applications. If changed_files is given,
+        only the configurations affected by these files are kept. If
+        case_names is given, only the configurations with these junit case
+        names are kept.
+        """
+        reg, get_build_configs = self._filter(filters, excludes, variant_args_filters)
+        index = self._app_registry.get_index()
+
+        # Keep the build configurations affected by the changes
+        if changed_files is not None:
+            affected = index.get_affected(changed_files)
+            reg, get_build_configs = self._restrict(
+                reg,
+                get_build_configs,
+                lambda config: (config.app, config.builder.name) in affected,
+            )
+
+        # Keep the build configurations with the given case names
+        if case_names is not None:
+            keys = set()
+            for name in case_names:
+                entry = index.get_case(name)
+                if entry is None:
+                    terminal.line(f"Unknown build '{name}', it is ignored", fg="yellow")
+                else:
+                    keys.add(entry.key)
+            reg, get_build_configs = self._restrict(
+                reg, get_build_configs, lambda config: config.key in keys
+            )
+
+        return reg, get_build_configs
+
+    def _restrict(
+        self,
+        reg: AppRegistry,
+        get_build_configs: Callable[[AppConfig], List[BuildConfig]],
+        keep: Callable[[Any], bool],
+    ) -> Tuple[AppRegistry, Callable[[AppConfig], List[BuildConfig]]]:
+        """
+        Keep the build configurations for which keep is True. keep receives
+        either an IndexEntry or a BuildConfig, both with the app, builder and
+        key attributes. Applications without configuration left are removed.
+        """
+        index = self._app_registry.get_index()
+        kept_apps = {entry.app_config.name for entry in index.entries if keep(entry)}
+
+        def get_kept_build_configs(app_config: AppConfig) -> List[BuildConfig]:
+            return [
+                build_config
+                for build_config in get_build_configs(app_config)
+                if keep(build_config)
+            ]
+
+        apps = [app for app in reg.apps if app.name in kept_apps]
+        return reg.model_copy(update={"apps": apps}), get_kept_build_configs
+
+    def _filter(
+        self,
+        filters: Dict[str, Any] = {},
+        excludes: Dict[str, Any] = {},
+        variant_args_filters: Dict[str, Any] = {},
+    ) -> Tuple[AppRegistry, Callable[[AppConfig], List[BuildConfig]]]:
+        """
+        Filter the registry with its index when it supports the filters.
+        Otherwise, or if the application configs are post processed, the
+        registry is filtered with the compiled filters.
+        """
+        filters = compile_filters(filters, AppConfig)
+        excludes = compile_filters(excludes, AppConfig)
+        variant_args_filters = compile_filters(variant_args_filters, AppBuilder)
+
+        selection = None
+        if (
+            type(self).post_process_app_config
+            is AppRegistryExecutor.post_process_app_config
+        ):
+            selection = self._app_registry.get_index().query(
+                filters, excludes, variant_args_filters
+            )
+
+        if selection is None:
+            reg = self._app_registry.filter(filters, excludes)
+            return reg, lambda app_config: app_config.get_build_configs(
+                variant_args_filters
+            )
+
+        apps, entries = selection
+        entries_by_app = defaultdict(list)
+        for entry in entries:
+            entries_by_app[id(entry.app_config)].append(entry)
+
+        def get_build_configs(app_config: AppConfig) -> List[BuildConfig]:
+            return [
+                entry.get_build_config() for entry in entries_by_app[id(app_config)]
+            ]
+
+        reg = self._app_registry.model_copy(update={"apps": apps})
+        return reg, get_build_configs
+
     def _get_output_dir(self, output_dir: str = None) -> str:
         output_dir = output_dir if output_dir else os.getcwd()
         return Path(output_dir, self._app_registry.name)
 
-    def _create_artifact_directory(
-        self, build_info: BuildInfo, output_dir: str, clean: bool = False
-    ):
+    def plan(
+        self,
+        filters: Dict[str, Any] = {},
+        excludes: Dict[str, Any] = {},
+        variant_args_filters: Dict[str, Any] = {},
+        output_dir: Union[str, os.PathLike] = None,
+        warning_as_error: bool = False,
+        history: Union[str, os.PathLike] = None,
+        changed_files: Optional[Iterable[Union[str, os.PathLike]]] = None,
+        case_names: Optional[Iterable[str]] = None,
+    ) -> BuildPlan:
         """
-        Save the output in an artifact directory at the current location or
-        inside the specified output directory.
-        If clean = True, the directory will be cleaned
+        Return the builds that the build method would execute with the same
+        arguments, without running any task or builder. The durations are
+        estimated from a previous junit report (history), by default the
+        report of the previous run in the output directory.
         """
+        output_dir = self._get_output_dir(output_dir)
+        if history is None:
+            history = Path(output_dir, "results.xml")
+        durations = load_durations(history) if Path(history).is_file() else {}
+
+        plan = BuildPlan(self._app_registry.name)
+        reg, get_build_configs = self._select(
+            filters, excludes, variant_args_filters, changed_files, case_names
+        )
+        for app_config in reg.apps:
+            self.post_process_app_config(app_config)
+            for build_config in get_build_configs(app_config):
+                build_info = build_config.create_buildinfo()
+                builder = self._get_builder(build_config.builder.name)
+                case_name = build_info.get_case_name()
+                plan.builds.append(
+                    PlannedBuild(
+                        app=build_info.app,
+                        builder=build_info.builder,
+                        project_file=build_info.project_file,
+                        case_name=case_name,
+                        artifact_path=str(
+                            self._get_artifact_path(build_info, output_dir)
+                        ),
+                        variant_args=build_info.variant_args,
+                        cmdline=builder.get_cmdline(
+                            build_info.project_file,
+                            build_info.variant_args,
+                            build_config.builder.raw_args,
+                            warning_as_error,
+                        ),
+                        last_duration=durations.get(case_name),
+                    )
+                )
+        return plan
+
+    def _get_artifact_path(self, build_info: BuildInfo, output_dir: str) -> Path:
+        """Return the artifact directory of a build"""
         artifact_path = list(
             filter(
                 None,
@@ -203,7 +559,17 @@ class AppRegistryExecutor:
                 ],
             )
         )
-        artifact_path = Path().joinpath(*artifact_path)
+        return Path().joinpath(*artifact_path)
+
+    def _create_artifact_directory(
+        self, build_info: BuildInfo, output_dir: str, clean: bool = False
+    ):
+        """
+        Save the output in an artifact directory at the current location or
+        inside the specified output directory.
+        If clean = True, the directory will be cleaned
+        """
+        artifact_path = self._get_artifact_path(build_info, output_dir)
 
         # In case the result folder does not exist, we create it. In case the
         # clean options is set, we remove and recreate the folder.
@@ -217,36 +583,68 @@ class AppRegistryExecutor:
         return artifact_path
 
     def create_report(
-        self, output_file: str, output_dir: str = None, add_skipped_apps: bool = True
+        self,
+        output_file: str,
+        output_dir: str = None,
+        add_skipped_apps: bool = True,
+        previous: Optional[Union[str, os.PathLike]] = None,
     ) -> None:
-        """Create junit report from buidled and skipped apps"""
+        """
+        Create junit report from buidled and skipped apps. If previous is a
+        junit report, its testcases are kept in the new report unless they
+        were built again.
+        """
+        from junitparser import JUnitXml, TestCase, TestSuite, Failure, Skipped
+
         output_dir = self._get_output_dir(output_dir)
         junit_file = Path(output_dir) / output_file
+        junit_file.parent.mkdir(parents=True, exist_ok=True)
 
         # Create the Junit object
         junit = JUnitXml()
 
-        # If there is no builded application, we return an empty junitxml file
-        if not self._build_results:
-            junit.write(str(junit_file), pretty=True)
-            return
-
         # Iterate over all build results
-        testsuite = TestSuite(self._app_registry.name)
+        testcases = []
         for result in self._build_results:
             testcase = TestCase(result.build_info.get_case_name())
             testcase.time = result.execution_time
 
             # Assign a Failure or Skipped result to the testcase
+            # The message is a summary, the text holds the details (e.g: the
+            # excerpt of a failed build output)
             if result.is_fail:
-                testcase.result = [Failure(result.result.text)]
+                testcase.result = [Failure(result.result.message)]
             elif result.is_skipped:
-                testcase.result = [Skipped(result.result.text)]
+                testcase.result = [Skipped(result.result.message)]
+            if result.result.text and testcase.result:
+                testcase.result[0].text = result.result.text
 
             # Do not add testcase that are skipped if add_skipped_apps is False
             if result.is_skipped and add_skipped_apps is False:
                 continue
 
+            testcases.append(testcase)
+
+        # Replace the testcases of the previous report that were built again
+        if previous is not None:
+            rebuilt = {testcase.name: testcase for testcase in testcases}
+            previous_report = JUnitXml.fromfile(str(previous))
+            if isinstance(previous_report, TestSuite):
+                previous_report = [previous_report]
+            merged = []
+            for previous_suite in previous_report:
+                for testcase in previous_suite:
+                    merged.append(rebuilt.pop(testcase.name, testcase))
+            testcases = [*merged, *rebuilt.values()]
+
+        # If there is no builded application, we return an empty junitxml file
+        if not testcases:
+            junit.write(str(junit_file), pretty=True)
+            self.events.emit(REPORT_WRITTEN, path=str(junit_file), tests=0, failures=0)
+            return
+
+        testsuite = TestSuite(self._app_registry.name)
+        for testcase in testcases:
             testsuite.add_testcase(testcase)
 
         # Add the testsuite to the junit collection
@@ -254,10 +652,29 @@ class AppRegistryExecutor:
 
         # Create the report
         junit.write(str(junit_file), pretty=True)
+        self.events.emit(
+            REPORT_WRITTEN,
+            path=str(junit_file),
+            tests=testsuite.tests,
+            failures=testsuite.failures,
+        )
 
         # Return the junit report in case someone needs to use it
         return junit
 
+    def _close_builders(self) -> None:
+        for builder in self._cached_builders.values():
+            builder.close()
+
+    def _get_environment(self) -> BuildEnvironment:
+        """
+        Return the environment of the current process with the variables of
+        the project BUILD_ENVIRONMENT_VARIABLE setting appended to it.
+        """
+        if self._environment is None:
+            self._environment = get_project_environment(self._project_config)
+        return self._environment
+
     def _get_builder(self, name: str) -> Builder:
         """Get the builder in cache or via the manager"""
         if name in self._cached_builders:
@@ -267,6 +684,7 @@ class AppRegistryExecutor:
                 name, self._project_config
             )
             builder = builder_klass()
+            builder.environment = builder.get_environment(self._get_environment())
             self._cached_builders[name] = builder
 
         return builder
@@ -0,0 +1,361 @@
+"""
+Build cache shared between runs and machines.
+
+A build configuration is identified by a key: the fingerprint of the
+configuration, of its builder and its build options, the path and version of
+the toolchain of the builder and the content of its input files.
+Once a configuration passed, the files of its artifact directory are stored
+in the cache, then its result under its key. A later run computing the same
+key downloads them instead of building the configuration again.
+
+The entries follow the layout of the bazel-remote HTTP cache: the results
+are stored in the action cache, under ac/<key>, and the files in the content
+addressable storage, under cas/<sha256 of the content>. The results are JSON
+documents, so a bazel-remote server must be started with
+--disable_http_ac_validation.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from socon_embedded.builder.result import BuildResult
+from socon_embedded.builder.toolchain import Toolchain
+from socon_embedded.executor.journal import fingerprint
+from socon_embedded.schema.apps import BuildConfig
+from socon_embedded.utils.files import file_digest, write_atomic
+from socon_embedded.utils.paths import find_files
+
+logger = logging.getLogger(__name__)
+
+# Action cache (results) and content addressable storage (files)
+AC = "ac"
+CAS = "cas"
+
+KEY_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+class CacheBackend:
+    """Storage of the build cache entries"""
+
+    def get(self, kind: str, key: str) -> Optional[bytes]:
+        """Return the content of an entry or None if it is not in the cache"""
+        raise NotImplementedError("subclasses of CacheBackend must provide a get()")
+
+    def put(self, kind: str, key: str, data: bytes) -> None:
+        raise NotImplementedError("subclasses of CacheBackend must provide a put()")
+
+    def contains(self, kind: str, key: str) -> bool:
+        return self.get(kind, key) is not None
+
+
+class LocalCacheBackend(CacheBackend):
+    """Cache in a directory, e.g: on a disk shared by the runners"""
+
+    def __init__(self, root: Union[str, os.PathLike]) -> None:
+        self.root = Path(root)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {self.root}>"
+
+    def _get_path(self, kind: str, key: str) -> Path:
+        return Path(self.root, kind, key[:2], key)
+
+    def get(self, kind: str, key: str) -> Optional[bytes]:
+        try:
+            return self._get_path(kind, key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, kind: str, key: str, data: bytes) -> None:
+        path = self._get_path(kind, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(path, data)
+
+    def contains(self, kind: str, key: str) -> bool:
+        return self._get_path(kind, key).is_file()
+
+
+class HttpCacheBackend(CacheBackend):
+    """Cache served over HTTP, with GET and PUT on <url>/ac/ and <url>/cas/"""
+
+    def __init__(
+        self,
+        url: str,
+        timeout: float = 30,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.headers = headers or {}
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {self.url}>"
+
+    def _request(self, method: str, kind: str, key: str, data: Optional[bytes] = None):
+        request = urllib.request.Request(
+            f"{self.url}/{kind}/{key}", data=data, headers=self.headers, method=method
+        )
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def get(self, kind: str, key: str) -> Optional[bytes]:
+        try:
+            with self._request("GET", kind, key) as response:
+                return response.read()
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+
+    def put(self, kind: str, key: str, data: bytes) -> None:
+        with self._request("PUT", kind, key, data):
+            pass
+
+    def contains(self, kind: str, key: str) -> bool:
+        try:
+            with self._request("HEAD", kind, key):
+                return True
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return False
+            raise
+
+
+def create_cache_backend(location: Union[str, os.PathLike]) -> CacheBackend:
+    """Return the backend of an http(s) URL or of a directory"""
+    if str(location).startswith(("http://", "https://")):
+        return HttpCacheBackend(str(location))
+    return LocalCacheBackend(location)
+
+
+class BuildCache:
+    """
+    Store and restore the artifacts of the build configurations. The cache
+    never makes a build fail: a backend that can not be reached is reported
+    once and the cache is disabled for the rest of the run. If upload is
+    False, the cache is only read.
+    """
+
+    def __init__(self, backend: CacheBackend, upload: bool = True) -> None:
+        self.backend = backend
+        self.upload = upload
+        self.hits = 0
+        self.misses = 0
+        self.uploads = 0
+        self._disabled = False
+
+        # Digest of the input files, computed once per run
+        self._digests: Dict[str, str] = {}
+        self._files: Dict[Tuple[str, ...], List[str]] = {}
+
+    def _call(self, method: str, *args):
+        if self._disabled:
+            return None
+        try:
+            return getattr(self.backend, method)(*args)
+        except OSError as e:
+            logger.warning(
+                "The build cache {!r} is disabled: {}".format(self.backend, e)
+            )
+            self._disabled = True
+            return None
+
+    def _get_digest(self, path: str) -> str:
+        if path not in self._digests:
+            self._digests[path] = file_digest(path)
+        return self._digests[path]
+
+    def get_key(
+        self,
+        build_config: BuildConfig,
+        inputs: Iterable[str],
+        toolchain: Optional[Toolchain] = None,
+        **options,
+    ) -> Optional[str]:
+        """
+        Return the cache key of a build configuration using the given input
+        patterns. The project file is always an input. The artifacts of two
+        builders, or of two versions of the same toolchain, never share a
+        key. A configuration without inputs can not be cached: None is
+        returned.
+        """
+        patterns = tuple(inputs)
+        if not patterns:
+            return None
+        patterns += (build_config.builder.project_file,)
+        if patterns not in self._files:
+            self._files[patterns] = find_files(patterns)
+        digests = {
+            Path(os.path.relpath(path)).as_posix(): self._get_digest(path)
+            for path in self._files[patterns]
+        }
+        if toolchain is not None:
+            options["toolchain"] = {
+                "path": toolchain.path,
+                "version": toolchain.version,
+            }
+        return fingerprint(build_config, inputs=digests, **options)
+
+    def fetch(
+        self, key: str, artifact_path: Union[str, os.PathLike]
+    ) -> Optional[BuildResult]:
+        """
+        Restore the artifacts of a configuration in its artifact directory
+        and return its result, or None if it is not in the cache.
+        """
+        start = time.perf_counter()
+        entry = self._call("get", AC, key)
+        result = None
+        if entry is not None:
+            try:
+                entry = json.loads(entry)
+                if self._restore(entry["files"], artifact_path):
+                    result = BuildResult.from_dict(entry["result"])
+            except (ValueError, KeyError, TypeError):
+                logger.warning("Ignore the invalid build cache entry {}".format(key))
+
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        result.execution_time = time.perf_counter() - start
+        return result
+
+    def _restore(self, files: Dict[str, str], artifact_path) -> bool:
+        """Write the files once they are all downloaded and checked"""
+        contents = []
+        for name, digest in files.items():
+            relative = PurePosixPath(name)
+            if relative.is_absolute() or ".." in relative.parts:
+                raise ValueError(f"Invalid artifact path '{name}'")
+            data = self._call("get", CAS, digest)
+            if data is None or hashlib.sha256(data).hexdigest() != digest:
+                return False
+            contents.append((Path(artifact_path, *relative.parts), data))
+
+        for path, data in contents:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(path, data)
+        return True
+
+    def store(
+        self, key: str, result: BuildResult, artifact_path: Union[str, os.PathLike]
+    ) -> None:
+        """Store the result and the artifact directory of a passed configuration"""
+        if not self.upload or self._disabled or result.is_fail or result.is_skipped:
+            return
+
+        files = {}
+        for path in find_files([artifact_path]):
+            digest = file_digest(path)
+            files[Path(os.path.relpath(path, artifact_path)).as_posix()] = digest
+            if not self._call("contains", CAS, digest):
+                self._call("put", CAS, digest, Path(path).read_bytes())
+
+        # The build output is already in the artifact directory
+        data = result.to_dict()
+        data.pop("output")
+        entry = json.dumps({"result": data, "files": files}, default=str)
+        self._call("put", AC, key, entry.encode("utf-8"))
+        if not self._disabled:
+            self.uploads += 1
+
+
+class CacheServer:
+    """
+    Minimal HTTP cache server with the bazel-remote API, serving a backend on
+    http://host:port/ac/<key> and /cas/<sha256>. The content of the files is
+    checked against their digest.
+    """
+
+    def __init__(self, backend: CacheBackend, port: int = 0, host: str = "127.0.0.1"):
+        cache = backend
+
+        class Handler(BaseHTTPRequestHandler):
+            def _parse_path(self) -> Optional[Tuple[str, str]]:
+                parts = self.path.split("?")[0].strip("/").split("/")
+                if (
+                    len(parts) != 2
+                    or parts[0] not in [AC, CAS]
+                    or not KEY_PATTERN.fullmatch(parts[1])
+                ):
+                    self.send_error(400)
+                    return None
+                return parts[0], parts[1]
+
+            def do_HEAD(self) -> None:
+                entry = self._parse_path()
+                if entry is None:
+                    return
+                if not cache.contains(*entry):
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.end_headers()
+
+            def do_GET(self) -> None:
+                entry = self._parse_path()
+                if entry is None:
+                    return
+                data = cache.get(*entry)
+                if data is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_PUT(self) -> None:
+                entry = self._parse_path()
+                if entry is None:
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                data = self.rfile.read(length)
+                kind, key = entry
+                if kind == CAS and hashlib.sha256(data).hexdigest() != key:
+                    self.send_error(400, "The content does not match its digest")
+                    return
+                cache.put(kind, key, data)
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="cache-server", daemon=True
+        )
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    @property
+    def url(self) -> str:
+        host, port = self.address
+        return f"http://{host}:{port}"
+
+    def start(self) -> CacheServer:
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
@@ -0,0 +1,240 @@
+"""
+Structured events of a registry run.
+
+The executor emits events on an EventBus instead of requiring subclasses
+of its hook methods. Each event has a type, a monotonic timestamp and some
+data. The bus delivers the events to any number of sinks from a background
+thread: emitting only appends to a bounded queue and never waits for the
+sinks. When there is no sink, emitting does nothing.
+
+    run_started         registry, apps
+    registry_loaded     registry, apps
+    config_expanded     app, builds
+    task_started        task, action
+    task_finished       task, action, failed, changed
+    build_started       build, app, builder, variant_args
+    output_chunk        build, text
+    build_finished      build, builder, status, duration
+    run_finished        registry, builds, failures
+    report_written      path, tests, failures
+"""
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import socket
+import threading
+import time
+
+from dataclasses import dataclass, field
+from typing import IO, Any, Callable, Iterable, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+RUN_STARTED = "run_started"
+REGISTRY_LOADED = "registry_loaded"
+CONFIG_EXPANDED = "config_expanded"
+TASK_STARTED = "task_started"
+TASK_FINISHED = "task_finished"
+BUILD_STARTED = "build_started"
+OUTPUT_CHUNK = "output_chunk"
+BUILD_FINISHED = "build_finished"
+RUN_FINISHED = "run_finished"
+REPORT_WRITTEN = "report_written"
+
+
+@dataclass(frozen=True)
+class Event:
+    type: str
+    data: dict = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.monotonic)
+
+    def to_dict(self) -> dict:
+        return {"type": self.type, "timestamp": self.timestamp, **self.data}
+
+
+class EventSink:
+    """Receive the events of a bus, from the bus thread"""
+
+    def handle(self, event: Event) -> None:
+        raise NotImplementedError(
+            "Subclass of '{}' must implement handle(...) method".format(
+                self.__class__.__name__
+            )
+        )
+
+    def close(self) -> None:
+        """Called when the sink is removed from the bus"""
+
+
+class CallbackSink(EventSink):
+    """Call a function with the events, optionally of some types only"""
+
+    def __init__(
+        self, callback: Callable[[Event], None], types: Iterable[str] = None
+    ) -> None:
+        self.callback = callback
+        self.types = set(types) if types is not None else None
+
+    def handle(self, event: Event) -> None:
+        if self.types is None or event.type in self.types:
+            self.callback(event)
+
+
+class JsonLinesSink(EventSink):
+    """Write each event as a JSON line in a file"""
+
+    def __init__(self, path: Union[str, Any]) -> None:
+        self._file: IO[str] = open(path, "a", encoding="utf-8")
+
+    def handle(self, event: Event) -> None:
+        self._file.write(json.dumps(event.to_dict(), default=str) + "\n")
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class SocketSink(EventSink):
+    """
+    Send each event as a JSON line to a local socket: a unix socket path or
+    a (host, port) TCP address. The sink stops sending if the peer is gone.
+    """
+
+    def __init__(self, address: Union[str, Tuple[str, int]]) -> None:
+        if isinstance(address, str):
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.connect(address)
+        self._connected = True
+
+    def handle(self, event: Event) -> None:
+        if not self._connected:
+            return
+        line = json.dumps(event.to_dict(), default=str) + "\n"
+        try:
+            self._socket.sendall(line.encode("utf-8"))
+        except OSError as e:
+            logger.warning("Event socket disconnected: {}".format(e))
+            self._connected = False
+
+    def close(self) -> None:
+        self._socket.close()
+
+
+class EventBus:
+    """Deliver the emitted events to the sinks from a background thread"""
+
+    def __init__(
+        self, sinks: Iterable[EventSink] = (), max_events: int = 100000
+    ) -> None:
+        self._sinks: List[EventSink] = []
+        self._queue: queue.Queue = queue.Queue(max_events)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        # Number of events lost because the queue was full
+        self.dropped = 0
+
+        for sink in sinks:
+            self.subscribe(sink)
+
+    @property
+    def active(self) -> bool:
+        """True if at least one sink receives the events"""
+        return bool(self._sinks)
+
+    def subscribe(self, sink: Union[EventSink, Callable[[Event], None]]) -> EventSink:
+        """Add a sink. A function is wrapped in a CallbackSink"""
+        if not isinstance(sink, EventSink):
+            sink = CallbackSink(sink)
+        with self._lock:
+            self._sinks = [*self._sinks, sink]
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._dispatch, name="event-bus", daemon=True
+                )
+                self._thread.start()
+        return sink
+
+    def unsubscribe(self, sink: EventSink) -> None:
+        """Deliver the pending events and remove the sink"""
+        self.flush()
+        with self._lock:
+            self._sinks = [s for s in self._sinks if s is not sink]
+        sink.close()
+
+    def emit(self, type: str, **data: Any) -> None:
+        if not self._sinks:
+            return
+        try:
+            self._queue.put_nowait(Event(type, data))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self) -> None:
+        """Wait until every emitted event was delivered"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Deliver the pending events, close every sink and stop the thread"""
+        for sink in list(self._sinks):
+            self.unsubscribe(sink)
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def _dispatch(self) -> None:
+        while True:
+            event = self._queue.get()
+            if event is None:
+                self._queue.task_done()
+                return
+            try:
+                for sink in self._sinks:
+                    try:
+                        sink.handle(event)
+                    except Exception:
+                        logger.exception("Event sink {} failed".format(sink))
+            finally:
+                self._queue.task_done()
+
+
+class OutputChunker:
+    """
+    Group the lines written by a build in chunks of at least max_size
+    characters, or written since max_delay seconds, to emit fewer events.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[str], None],
+        max_size: int = 16384,
+        max_delay: float = 0.5,
+    ) -> None:
+        self._callback = callback
+        self._max_size = max_size
+        self._max_delay = max_delay
+        self._buffer: List[str] = []
+        self._size = 0
+        self._first_write: Optional[float] = None
+
+    def write(self, text: str) -> None:
+        now = time.monotonic()
+        if self._first_write is None:
+            self._first_write = now
+        self._buffer.append(text)
+        self._size += len(text)
+        if self._size >= self._max_size or now - self._first_write >= self._max_delay:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._callback("".join(self._buffer))
+        self._buffer = []
+        self._size = 0
+        self._first_write = None
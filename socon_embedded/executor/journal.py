@@ -0,0 +1,92 @@
+"""
+Checkpoint journal of a registry run.
+
+Each finished build configuration is appended to the journal as a JSON
+line with its fingerprint and its result, so a run killed halfway can be
+resumed: the configurations with the same fingerprint are not built again.
+A line truncated by the interruption is ignored.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+
+from pathlib import Path
+from typing import IO, Dict, Optional, Union
+
+from socon_embedded.builder.result import BuildResult
+from socon_embedded.schema.apps import BuildConfig
+
+logger = logging.getLogger(__name__)
+
+# Name of the journal in the artifact directory of a registry
+JOURNAL_FILE = "journal.jsonl"
+
+
+def fingerprint(build_config: BuildConfig, **options) -> str:
+    """
+    Identify a build configuration and the options it is built with. The
+    fingerprint changes as soon as the configuration changes.
+    """
+    data = {
+        "app": build_config.app,
+        "builder": build_config.builder.name,
+        "config": build_config.get_buildinfo(),
+        "options": options,
+    }
+    content = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class BuildJournal:
+    """Record the finished build configurations of a run"""
+
+    def __init__(self, path: Union[str, os.PathLike]) -> None:
+        self.path = Path(path)
+        self._file: Optional[IO[str]] = None
+
+    def load(self) -> Dict[str, BuildResult]:
+        """Return the results of the journal by fingerprint"""
+        results = {}
+        if not self.path.is_file():
+            return results
+        with open(self.path, encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                    results[record["fingerprint"]] = BuildResult.from_dict(
+                        record["result"]
+                    )
+                except (ValueError, KeyError, TypeError):
+                    logger.warning(
+                        "Ignore invalid line {} of {}".format(number, self.path)
+                    )
+        return results
+
+    def open(self, resume: bool = False) -> BuildJournal:
+        """Start recording. A new run truncates the journal"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a" if resume else "w", encoding="utf-8")
+
+        # Terminate a line truncated by the interruption
+        if resume and self._file.tell():
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._file.write("\n")
+        return self
+
+    def record(self, fingerprint: str, result: BuildResult) -> None:
+        """Append a finished build configuration. The build output is not kept"""
+        data = result.to_dict()
+        data.pop("output")
+        line = json.dumps({"fingerprint": fingerprint, "result": data}, default=str)
+        self._file.write(line + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,330 @@
+"""
+Metrics of the registry runs in the Prometheus text format.
+
+BuildMetrics is an event sink: it keeps counters, gauges and histograms
+updated from the events of the executor, so it costs nothing to the builds
+themselves. The metrics can be written to a file for the textfile collector
+of the node exporter, or served over HTTP by a MetricsServer.
+"""
+from __future__ import annotations
+
+import math
+import os
+import tempfile
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from socon_embedded.executor.events import (
+    BUILD_FINISHED,
+    BUILD_STARTED,
+    CONFIG_EXPANDED,
+    OUTPUT_CHUNK,
+    TASK_FINISHED,
+    TASK_STARTED,
+    Event,
+    EventSink,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Buckets in seconds of the build and task durations
+BUILD_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+TASK_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    labels = ",".join(
+        f'{name}="{escape_label(value)}"' for name, value in zip(names, values)
+    )
+    return "{" + labels + "}"
+
+
+class Metric:
+    """A metric with a value per combination of labels"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterable[Tuple[str, Tuple[str, ...], Tuple[str, ...], float]]:
+        """Yield the (name, label names, label values, value) samples"""
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield self.name, self.labels, key, value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for name, names, values, value in self.samples():
+            lines.append(f"{name}{format_labels(names, values)} {format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = BUILD_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+        # Labels -> (count per bucket, sum, count)
+        self._histograms: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._histograms.get(
+                key, ([0] * len(self.buckets), 0.0, 0)
+            )
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._histograms[key] = (counts, total + value, count + 1)
+
+    def get(self, **labels: str) -> float:
+        """Number of observations"""
+        return self._histograms.get(self._key(labels), ([], 0.0, 0))[2]
+
+    def get_sum(self, **labels: str) -> float:
+        return self._histograms.get(self._key(labels), ([], 0.0, 0))[1]
+
+    def samples(self):
+        with self._lock:
+            histograms = sorted(
+                (key, (list(counts), total, count))
+                for key, (counts, total, count) in self._histograms.items()
+            )
+        names = self.labels + ("le",)
+        for key, (counts, total, count) in histograms:
+            cumulated = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulated += bucket_count
+                yield (
+                    f"{self.name}_bucket",
+                    names,
+                    key + (format_value(bound),),
+                    cumulated,
+                )
+            yield f"{self.name}_sum", self.labels, key, total
+            yield f"{self.name}_count", self.labels, key, count
+
+
+class MetricsRegistry:
+    """A collection of metrics rendered together"""
+
+    def __init__(self) -> None:
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = BUILD_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Union[str, os.PathLike]) -> Path:
+        """
+        Write the metrics to a file. The file is replaced atomically so the
+        textfile collector never reads a partial file.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.render())
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return path
+
+
+class BuildMetrics(EventSink):
+    """Metrics of the builds and tasks, updated from the executor events"""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None) -> None:
+        self.registry = registry if registry is not None else MetricsRegistry()
+        self.builds = self.registry.counter(
+            "socon_builds_total", "Builds by builder and status", ["builder", "status"]
+        )
+        self.build_duration = self.registry.histogram(
+            "socon_build_duration_seconds",
+            "Execution time of the builds",
+            ["builder"],
+            BUILD_BUCKETS,
+        )
+        self.output_bytes = self.registry.counter(
+            "socon_build_output_bytes_total", "Bytes of build log output", ["builder"]
+        )
+        self.queued = self.registry.gauge(
+            "socon_builds_queued", "Builds expanded but not finished yet"
+        )
+        self.running = self.registry.gauge(
+            "socon_builds_running", "Builds currently running"
+        )
+        self.tasks = self.registry.counter(
+            "socon_tasks_total", "Tasks by action and status", ["action", "status"]
+        )
+        self.task_duration = self.registry.histogram(
+            "socon_task_duration_seconds",
+            "Execution time of the tasks",
+            ["action"],
+            TASK_BUCKETS,
+        )
+
+        # Running build -> builder, running task -> start timestamp
+        self._builders: Dict[str, str] = {}
+        self._tasks: Dict[Tuple[str, str], float] = {}
+
+    def handle(self, event: Event) -> None:
+        data = event.data
+        if event.type == OUTPUT_CHUNK:
+            builder = self._builders.get(data["build"], "")
+            self.output_bytes.inc(len(data["text"].encode("utf-8")), builder=builder)
+        elif event.type == CONFIG_EXPANDED:
+            self.queued.inc(len(data["builds"]))
+        elif event.type == BUILD_STARTED:
+            self._builders[data["build"]] = data["builder"]
+            self.running.inc()
+        elif event.type == BUILD_FINISHED:
+            if self._builders.pop(data["build"], None) is not None:
+                self.running.dec()
+            self.queued.dec()
+            self.builds.inc(builder=data["builder"], status=data["status"])
+            if data["status"] != "SKIPPED":
+                self.build_duration.observe(data["duration"], builder=data["builder"])
+        elif event.type == TASK_STARTED:
+            self._tasks[(data["task"], data["action"])] = event.timestamp
+        elif event.type == TASK_FINISHED:
+            started = self._tasks.pop((data["task"], data["action"]), None)
+            status = "failed" if data["failed"] else "ok"
+            self.tasks.inc(action=data["action"], status=status)
+            if started is not None:
+                self.task_duration.observe(
+                    event.timestamp - started, action=data["action"]
+                )
+
+    def render(self) -> str:
+        return self.registry.render()
+
+
+class MetricsServer:
+    """Serve the metrics of a registry on http://host:port/metrics"""
+
+    def __init__(
+        self, registry: MetricsRegistry, port: int = 0, host: str = "127.0.0.1"
+    ) -> None:
+        metrics = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="metrics-server", daemon=True
+        )
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def start(self) -> MetricsServer:
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
@@ -0,0 +1,110 @@
+import os
+
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Union
+from xml.etree import ElementTree
+
+
+@dataclass
+class PlannedBuild:
+    """A build that would be executed by the registry executor"""
+
+    app: str
+    builder: str
+    project_file: str
+    case_name: str
+    artifact_path: str
+    variant_args: dict = field(default_factory=dict)
+    cmdline: list = field(default_factory=list)
+
+    # Duration of the same build in a previous report, if any
+    last_duration: Optional[float] = None
+
+
+@dataclass
+class BuildPlan:
+    """Every build that would be executed with an estimation of the duration"""
+
+    registry: str
+    builds: list[PlannedBuild] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.builds)
+
+    @property
+    def count_by_builder(self) -> Dict[str, int]:
+        return dict(Counter(build.builder for build in self.builds))
+
+    @property
+    def unknown_durations(self) -> int:
+        """Number of builds without a duration in the history"""
+        return sum(1 for build in self.builds if build.last_duration is None)
+
+    @property
+    def estimated_duration(self) -> Optional[float]:
+        """
+        Sum of the builds duration found in the history. Builds without history
+        are estimated with the average duration. None if there is no history.
+        """
+        durations = [
+            b.last_duration for b in self.builds if b.last_duration is not None
+        ]
+        if not durations:
+            return None
+        average = sum(durations) / len(durations)
+        return sum(durations) + average * self.unknown_durations
+
+    def to_dict(self) -> dict:
+        return {
+            "registry": self.registry,
+            "count": self.count,
+            "count_by_builder": self.count_by_builder,
+            "estimated_duration": self.estimated_duration,
+            "unknown_durations": self.unknown_durations,
+            "builds": [asdict(build) for build in self.builds],
+        }
+
+    def __str__(self) -> str:
+        output = []
+        for build in self.builds:
+            output.append(build.case_name)
+            output.append(f"  cmdline: {' '.join(str(arg) for arg in build.cmdline)}")
+            output.append(f"  artifact: {build.artifact_path}")
+        output.append("")
+        output.append(f"Builds: {self.count}")
+        for builder, count in self.count_by_builder.items():
+            output.append(f"  {builder}: {count}")
+        estimated_duration = self.estimated_duration
+        if estimated_duration is not None:
+            output.append(
+                f"Estimated duration: {estimated_duration:.1f}s "
+                f"({self.unknown_durations} build(s) without history)"
+            )
+        return "\n".join(output)
+
+
+def load_durations(junit_file: Union[str, os.PathLike]) -> Dict[str, float]:
+    """Return the duration of each non skipped testcase of a junit report"""
+    durations = {}
+    for _, element in ElementTree.iterparse(str(junit_file)):
+        if element.tag == "testcase" and element.find("skipped") is None:
+            try:
+                durations[element.get("name")] = float(element.get("time"))
+            except (TypeError, ValueError):
+                pass
+        element.clear()
+    return durations
+
+
+def load_failures(junit_file: Union[str, os.PathLike]) -> List[str]:
+    """Return the name of the failed testcases of a junit report"""
+    failures = []
+    for _, element in ElementTree.iterparse(str(junit_file)):
+        if element.tag == "testcase" and (
+            element.find("failure") is not None or element.find("error") is not None
+        ):
+            failures.append(element.get("name"))
+        element.clear()
+    return failures
@@ -0,0 +1,177 @@
+"""
+Progress of a registry run: completed builds, throughput, ETA and the
+slowest builds that are still running.
+
+The reporter is an event sink fed with the run_started, config_expanded,
+build_started and build_finished events of the executor. It is thread
+safe, so builds running in parallel can report to the same reporter.
+Drawing is throttled: an event only triggers a redraw if the previous one
+is older than the interval.
+"""
+import threading
+import time
+
+from typing import Callable, Dict, List, Optional
+
+from socon_embedded.executor.events import (
+    BUILD_FINISHED,
+    BUILD_STARTED,
+    CONFIG_EXPANDED,
+    RUN_STARTED,
+    Event,
+    EventSink,
+)
+
+from socon.utils.terminal import terminal
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m{seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m"
+
+
+class ProgressReporter(EventSink):
+    """Show the progress of the builds of a registry"""
+
+    def __init__(
+        self,
+        interval: float = 5,
+        slowest: int = 3,
+        write: Callable[[str], None] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.interval = interval
+        self.slowest = slowest
+        self._write = write or (lambda text: terminal.line(text, fg="cyan"))
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self.apps = 0
+        self.apps_queued = 0
+        self.queued = 0
+        self.passed = 0
+        self.failed = 0
+        self.skipped = 0
+
+        # Build name -> time it started running
+        self._running: Dict[str, float] = {}
+
+        self._started: Optional[float] = None
+        self._last_draw: Optional[float] = None
+
+    @property
+    def completed(self) -> int:
+        return self.passed + self.failed + self.skipped
+
+    def start(self, apps: int) -> None:
+        """Start a run of apps applications"""
+        with self._lock:
+            self.apps = apps
+            self._started = self._clock()
+            self._last_draw = self._started
+
+    def app_queued(self, builds: List[str]) -> None:
+        """The build configurations of an application are known"""
+        with self._lock:
+            self.apps_queued += 1
+            self.queued += len(builds)
+
+    def running(self, build: str) -> None:
+        with self._lock:
+            self._running[build] = self._clock()
+        self._draw()
+
+    def finished(self, build: str, status: str) -> None:
+        """A build finished with the PASS, FAIL or SKIPPED status"""
+        with self._lock:
+            self._running.pop(build, None)
+            if status == "SKIPPED":
+                self.skipped += 1
+            elif status == "FAIL":
+                self.failed += 1
+            else:
+                self.passed += 1
+        self._draw()
+
+    def handle(self, event: Event) -> None:
+        if event.type == RUN_STARTED:
+            self.start(event.data["apps"])
+        elif event.type == CONFIG_EXPANDED:
+            self.app_queued(event.data["builds"])
+        elif event.type == BUILD_STARTED:
+            self.running(event.data["build"])
+        elif event.type == BUILD_FINISHED:
+            self.finished(event.data["build"], event.data["status"])
+
+    def close(self) -> None:
+        """Draw the final state"""
+        self._draw(force=True)
+
+    def builds_per_minute(self, now: float) -> Optional[float]:
+        """Throughput of the builds that ran, skipped builds excluded"""
+        elapsed = now - self._started
+        built = self.passed + self.failed
+        if not built or elapsed <= 0:
+            return None
+        return built / elapsed * 60
+
+    def estimated_total(self) -> int:
+        """
+        Number of builds of the run. The builds of the applications that are
+        not expanded yet are extrapolated from the expanded ones.
+        """
+        if not self.apps_queued or self.apps_queued >= self.apps:
+            return self.queued
+        return round(self.queued / self.apps_queued * self.apps)
+
+    def eta(self, now: float) -> Optional[float]:
+        """Remaining time in seconds, based on the current throughput"""
+        rate = self.builds_per_minute(now)
+        if rate is None:
+            return None
+        remaining = self.estimated_total() - self.completed
+        return max(remaining, 0) / rate * 60
+
+    def render(self, now: Optional[float] = None) -> str:
+        now = now if now is not None else self._clock()
+        with self._lock:
+            total = self.estimated_total()
+            approximate = "~" if self.apps_queued < self.apps else ""
+            percent = self.completed * 100 // total if total else 100
+            parts = [f"Progress: {self.completed}/{approximate}{total} ({percent}%)"]
+            if self.failed:
+                parts.append(f"{self.failed} failed")
+            if self.skipped:
+                parts.append(f"{self.skipped} skipped")
+
+            rate = self.builds_per_minute(now)
+            if rate is not None:
+                parts.append(f"{rate:.1f} builds/min")
+            eta = self.eta(now)
+            if eta is not None:
+                parts.append(f"ETA {format_duration(eta)}")
+
+            running = sorted(self._running.items(), key=lambda item: item[1])
+            if running:
+                slowest = ", ".join(
+                    f"{build} ({format_duration(now - started)})"
+                    for build, started in running[: self.slowest]
+                )
+                parts.append(f"running: {slowest}")
+        return " | ".join(parts)
+
+    def _draw(self, force: bool = False) -> None:
+        now = self._clock()
+        with self._lock:
+            if self._started is None:
+                return
+            if not force and now - self._last_draw < self.interval:
+                return
+            self._last_draw = now
+        self._write(self.render(now))
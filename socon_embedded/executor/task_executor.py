@@ -1,11 +1,18 @@
+from __future__ import annotations
+
 import json
 import traceback
 
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import Optional
 from collections import OrderedDict
 
+from socon_embedded.action import ActionBase
+from socon_embedded.builder.environment import BuildEnvironment
+from socon_embedded.executor.events import TASK_FINISHED, TASK_STARTED, EventBus
 from socon_embedded.executor.task_result import TaskResult
 from socon_embedded.schema.task import Task
+from socon_embedded.utils.cancel import CancellationToken
 from socon_embedded.utils.converter import to_text
 
 from socon.utils.terminal import terminal
@@ -20,28 +27,188 @@ def task_timeout(signum, frame):
 
 
 class TaskPlayer:
-
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        variables: Optional[dict] = None,
+        max_workers: Optional[int] = None,
+        events: Optional[EventBus] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        environment: Optional[BuildEnvironment] = None,
+    ) -> None:
         self._played_tasks: list[TaskExecutor] = []
         self._terminal = terminal
 
+        # Once cancelled, no task is started anymore
+        self._cancel_token = cancel_token
+
+        # Bus receiving the task_started and task_finished events
+        self._events = events
+
+        # Variables available to the tasks (e.g: to render templates)
+        self._variables = variables or {}
+
+        # Environment of the processes started by the tasks
+        self._environment = environment
+
+        # Maximum number of parallel tasks running at the same time
+        self._max_workers = max_workers
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_token is not None and self._cancel_token.cancelled
+
     def run(self, tasks: list[Task]) -> None:
-        for task in tasks:
-            executor = TaskExecutor(task, {})
-            self._task_on_start(task)
-            result = executor.run()
-            tr = TaskResult(task, result)
-            if tr.is_failed():
-                self._task_on_failed(tr)
-                executor.cleanup()
-                for played_exec in self._played_tasks:
-                    played_exec.cleanup()
-                return
-            self._task_on_ok(tr)
-            self._played_tasks.append(executor)
+        if any(task.is_parallel for task in tasks):
+            self._run_parallel(tasks)
+            return
+
+        for batch in self._get_batches(tasks):
+            if self.cancelled:
+                break
+            executors = [
+                TaskExecutor(task, self._variables, self._events, self._environment)
+                for task in batch
+            ]
+            if len(executors) == 1:
+                # A single task is reported before it runs, as its retries
+                # are displayed while it runs
+                self._task_on_start(batch[0])
+                results = [executors[0].run()]
+            else:
+                results = TaskExecutor.run_batch(executors)
+
+            for executor, result in zip(executors, results):
+                if len(executors) > 1:
+                    self._task_on_start(executor._task)
+                tr = TaskResult(executor._task, result)
+                if tr.is_failed():
+                    self._task_on_failed(tr)
+                    # The tasks of the batch reported before are played tasks
+                    # and the ones after it did not run
+                    executor.cleanup()
+                    for played_exec in self._played_tasks:
+                        played_exec.cleanup()
+                    return
+                self._task_on_ok(tr)
+                self._played_tasks.append(executor)
         if len(self._played_tasks) != 0:
             self._terminal.line()
 
+    def _run_parallel(self, tasks: list[Task]) -> None:
+        """
+        Run the parallel tasks in a thread pool. A task that is not parallel
+        waits for every task declared before it and the tasks after it wait
+        for it. Results are reported in declaration order.
+        """
+        dependencies = self._get_dependencies(tasks)
+        executors = [
+            TaskExecutor(task, self._variables, self._events, self._environment)
+            for task in tasks
+        ]
+        results: list[Optional[TaskResult]] = [None] * len(tasks)
+
+        started = set()
+        done = set()
+        failed = False
+        reported = 0
+
+        with ThreadPoolExecutor(self._max_workers) as pool:
+            running = {}
+            while True:
+                # Start every task whose dependencies are done, unless a task
+                # failed or the player was cancelled. In that case we only
+                # wait for the running ones.
+                if not failed and not self.cancelled:
+                    for index, deps in enumerate(dependencies):
+                        if index not in started and deps <= done:
+                            started.add(index)
+                            running[pool.submit(executors[index].run)] = index
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    index = running.pop(future)
+                    results[index] = TaskResult(tasks[index], future.result())
+                    done.add(index)
+                    failed = failed or results[index].is_failed()
+
+                # Report the results in the declaration order
+                while reported < len(tasks) and results[reported] is not None:
+                    if results[reported].is_failed():
+                        break
+                    self._task_on_start(tasks[reported])
+                    self._task_on_ok(results[reported])
+                    self._played_tasks.append(executors[reported])
+                    reported += 1
+
+        if failed:
+            # Report the tasks finished before the first failure, then cleanup
+            # everything that ran like for the sequential tasks.
+            for index in range(reported, len(tasks)):
+                if results[index] is None:
+                    continue
+                self._task_on_start(tasks[index])
+                if results[index].is_failed():
+                    self._task_on_failed(results[index])
+                    break
+                self._task_on_ok(results[index])
+                self._played_tasks.append(executors[index])
+            for index in started:
+                if executors[index] not in self._played_tasks:
+                    executors[index].cleanup()
+            for played_exec in self._played_tasks:
+                played_exec.cleanup()
+            return
+
+        if len(self._played_tasks) != 0:
+            self._terminal.line()
+
+    @staticmethod
+    def _get_dependencies(tasks: list[Task]) -> list[set[int]]:
+        """Return the indexes of the tasks each task must wait for"""
+        dependencies = []
+        names = {}
+        barrier = None
+        for index, task in enumerate(tasks):
+            deps = {names[name] for name in task.depends_on}
+            if task.is_parallel:
+                if barrier is not None:
+                    deps.add(barrier)
+            else:
+                deps.update(range(index))
+                barrier = index
+            dependencies.append(deps)
+            names[task.name] = index
+        return dependencies
+
+    @staticmethod
+    def _get_batches(tasks: list[Task]) -> list[list[Task]]:
+        """
+        Group consecutive tasks using the same action when the action can run
+        them in batch and they do not depend on each other. Tasks with retries
+        are always run alone.
+        """
+        batches: list[list[Task]] = []
+        for task in tasks:
+            action_class = type(task.action)
+            batchable = (
+                isinstance(task.action, ActionBase)
+                and action_class.supports_batch()
+                and not task.retries
+            )
+            if (
+                batchable
+                and batches
+                and type(batches[-1][0].action) is action_class
+                and not batches[-1][0].retries
+                and task.action.can_batch_with([t.action for t in batches[-1]])
+            ):
+                batches[-1].append(task)
+            else:
+                batches.append([task])
+        return batches
+
     def cleanup(self) -> None:
         for executor in self._played_tasks:
             executor.cleanup()
@@ -79,28 +246,93 @@ class TaskPlayer:
 
 
 class TaskExecutor:
-
-    def __init__(self, task: Task, job_vars: dict = {}) -> None:
+    def __init__(
+        self,
+        task: Task,
+        job_vars: dict = {},
+        events: Optional[EventBus] = None,
+        environment: Optional[BuildEnvironment] = None,
+    ) -> None:
         self._task = task
         self._job_vars = job_vars
+        self._events = events
         self._terminal = terminal
 
+        # Every run of the task gets the environment of the project
+        if environment is not None:
+            self._task.action.environment = environment
+
     def run(self) -> dict:
+        self._emit_started()
         try:
             res = self._execute()
-            return res
         except Exception as e:
-            return dict(
+            res = dict(
+                failed=True,
+                msg=f"Unexpected failure during module execution: {e}",
+                exception=to_text(traceback.format_exc()),
+                stdout="",
+            )
+        self._emit_finished(res)
+        return res
+
+    @staticmethod
+    def run_batch(executors: list[TaskExecutor]) -> list[dict]:
+        """Run the tasks of several executors sharing the same action type"""
+        for executor in executors:
+            executor._emit_started()
+
+        actions = [executor._task.action for executor in executors]
+        tasks_vars = executors[0]._job_vars.copy()
+        try:
+            results = type(actions[0]).run_batch(actions, tasks_vars=tasks_vars)
+        except Exception as e:
+            failure = dict(
                 failed=True,
                 msg=f"Unexpected failure during module execution: {e}",
                 exception=to_text(traceback.format_exc()),
                 stdout="",
             )
+            results = [dict(failure) for _ in executors]
+
+        # The actions after a failed one are not run
+        results = list(results)
+        for _ in executors[len(results) :]:
+            results.append(
+                dict(failed=False, skipped=True, msg="A previous task failed")
+            )
+
+        for executor, result in zip(executors, results):
+            # set the failed property if it was missing.
+            if "failed" not in result:
+                result["failed"] = False
+            executor._emit_finished(result)
+        return results
+
+    def _get_action_name(self) -> str:
+        action_class = type(self._task.action)
+        return getattr(action_class, "name", action_class.__name__)
+
+    def _emit_started(self) -> None:
+        if self._events is not None:
+            self._events.emit(
+                TASK_STARTED, task=self._task.name, action=self._get_action_name()
+            )
+
+    def _emit_finished(self, result: dict) -> None:
+        if self._events is not None:
+            self._events.emit(
+                TASK_FINISHED,
+                task=self._task.name,
+                action=self._get_action_name(),
+                failed=bool(result.get("failed")),
+                changed=bool(result.get("changed")),
+            )
 
     def _execute(self, variables: Optional[dict] = None) -> dict:
         if variables is None:
             variables = self._job_vars
-            vars_copy = variables.copy()
+        vars_copy = variables.copy()
 
         retries = 1  # includes the default actual run + retries set by user/default
         if self._task.retries is not None:
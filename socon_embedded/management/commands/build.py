@@ -1,10 +1,10 @@
-import os
+import subprocess
 
 from argparse import ArgumentParser
 from collections.abc import MutableMapping
 from typing import Any, Dict, Optional, Tuple
 
-from socon_embedded.utils.loader import from_json_or_yaml, load_from_file
+from socon_embedded.exceptions import FilterError
 from socon_embedded.utils.converter import to_text
 from socon_embedded.utils.parser import parse_key_value
 from socon.conf import settings
@@ -22,6 +22,11 @@ class BuildCommand(Subcommand):
 class BuildCommandInterface(ProjectCommand, abstract=True):
     manager = "build_manager"
 
+    # Environment of the current process with the project
+    # BUILD_ENVIRONMENT_VARIABLE entries, set before handle_build is called.
+    # The builds, tasks and processes started by the subcommands use it.
+    environment = None
+
     def add_arguments(self, parser: ArgumentParser) -> None:
         parser.add_argument(
             "--app", help="The name of the application to build", action="append"
@@ -84,6 +89,23 @@ class BuildCommandInterface(ProjectCommand, abstract=True):
             "--artifact-dir",
             help=("Path to the artifact folder that will store " "the build artifacts"),
         )
+        parser.add_argument(
+            "--changed-files",
+            help=(
+                "Only build the applications using one of the changed files. "
+                "Files are separated by a space or given in a file prepended "
+                "with @. Example: --changed-files src/main.c, "
+                '--changed-files "@changes.txt"'
+            ),
+            action="append",
+        )
+        parser.add_argument(
+            "--since",
+            help=(
+                "Only build the applications using a file changed in the git "
+                "checkout since this revision. Example: --since origin/main"
+            ),
+        )
         self.add_build_arguments(parser)
 
     def add_build_arguments(self, parser: ArgumentParser) -> None:
@@ -110,6 +132,9 @@ class BuildCommandInterface(ProjectCommand, abstract=True):
         for var_config, value in variant_args.items():
             variant_args_filters.update({f"variant_args__{var_config}": value})
 
+        # Report the invalid lookups before loading the registry
+        self._check_filters(filters, excludes, variant_args_filters)
+
         # Create a context based on the extras vars and the base directory. This
         # will be mainly use to resolve any further jinja template file
         base_dir = config.getoption("base_dir")
@@ -126,15 +151,11 @@ class BuildCommandInterface(ProjectCommand, abstract=True):
             settings, "BUILD_ARTIFACT_PATH"
         )
 
-        # Load every variable that needs to be export in the project config
-        env_variables = project_config.get_setting(
-            "BUILD_ENVIRONMENT_VARIABLE", skip=True, default=[]
-        )
-        for env, value in env_variables:
-            if os.environ.get(env) is not None:
-                os.environ[env] += os.pathsep + value
-            else:
-                os.environ[env] = value
+        # The project variables are not exported to os.environ: running the
+        # command twice in one process would append them twice
+        from socon_embedded.builder.environment import get_project_environment
+
+        self.environment = get_project_environment(project_config)
 
         # Pass all the above to a method used by each subcommands
         self.handle_build(
@@ -167,9 +188,43 @@ class BuildCommandInterface(ProjectCommand, abstract=True):
             )
         )
 
+    @staticmethod
+    def get_changed_files(config: Config) -> Optional[list[str]]:
+        """
+        Return the files given with --changed-files and the ones changed since
+        the --since git revision. None if none of the options are used.
+        """
+        changed_files = config.getoption("changed_files")
+        since = config.getoption("since")
+        if changed_files is None and since is None:
+            return None
+
+        paths = []
+        for value in changed_files or []:
+            if value.startswith("@"):
+                with open(value[1:]) as f:
+                    paths.extend(line.strip() for line in f if line.strip())
+            else:
+                paths.extend(value.split())
+
+        if since is not None:
+            from socon_embedded.utils.vcs import get_changed_files
+
+            try:
+                paths.extend(str(path) for path in get_changed_files(since))
+            except FileNotFoundError:
+                raise CommandError("git is required to use the --since option")
+            except subprocess.CalledProcessError as e:
+                raise CommandError(
+                    f"Could not get the files changed since '{since}':\n{e.stderr}"
+                )
+        return paths
+
     @staticmethod
     def load_template_args(variables: list[Any] = tuple()) -> Dict[str, str]:
         """Load vars passed in command line arguments"""
+        from socon_embedded.utils.loader import from_json_or_yaml, load_from_file
+
         loaded_vars = {}
 
         for var_opt in variables:
@@ -201,6 +256,20 @@ class BuildCommandInterface(ProjectCommand, abstract=True):
 
         return loaded_vars
 
+    @staticmethod
+    def _check_filters(
+        filters: dict, excludes: dict, variant_args_filters: dict
+    ) -> None:
+        from socon_embedded.schema.apps import AppBuilder, AppConfig
+        from socon_embedded.utils.filters import compile_filters
+
+        try:
+            compile_filters(filters, AppConfig)
+            compile_filters(excludes, AppConfig)
+            compile_filters(variant_args_filters, AppBuilder)
+        except FilterError as e:
+            raise CommandError(str(e))
+
     @staticmethod
     def _create_filter(*filters: Tuple[str, Optional[dict]]) -> dict:
         output = {}
@@ -1,11 +1,13 @@
+import json
+
 from argparse import ArgumentParser
 from pathlib import Path
 
-from socon_embedded.executor.app_executor import AppRegistryExecutor
 from socon_embedded.management.commands.build import BuildCommandInterface
 
-from socon.core.management.base import Config
+from socon.core.management.base import CommandError, Config
 from socon.core.registry.config import ProjectConfig
+from socon.utils.terminal import terminal
 
 from socon_embedded.managers import get_builder_manager
 
@@ -20,6 +22,100 @@ class BuildFromFile(BuildCommandInterface):
             required=True,
             type=Path,
         )
+        parser.add_argument(
+            "--plan",
+            help=(
+                "Show the builds that would be executed and their estimated "
+                "duration without building anything"
+            ),
+            nargs="?",
+            const="text",
+            choices=["text", "json"],
+        )
+        parser.add_argument(
+            "--plan-history",
+            help=(
+                "Junit report used to estimate the builds duration. Default to "
+                "the report of the previous run in the artifact directory"
+            ),
+            type=Path,
+        )
+        parser.add_argument(
+            "--progress",
+            help=(
+                "Show the progress of the run, the throughput and an estimated "
+                "remaining time at most every SECONDS seconds (default: 5)"
+            ),
+            metavar="SECONDS",
+            nargs="?",
+            const=5.0,
+            type=float,
+        )
+        parser.add_argument(
+            "--resume",
+            help=(
+                "Do not build again the configurations the previous run "
+                "completed before being interrupted"
+            ),
+            action="store_true",
+        )
+        parser.add_argument(
+            "--rerun-failed",
+            help=(
+                "Only build the configurations that failed in a junit report "
+                "and update their result in the report"
+            ),
+            metavar="REPORT",
+            type=Path,
+        )
+        parser.add_argument(
+            "--compress-logs",
+            help="Save the build logs gzip compressed",
+            action="store_true",
+        )
+        parser.add_argument(
+            "--build-cache",
+            help=(
+                "Restore the artifacts of the unchanged build configurations "
+                "from a cache directory or a bazel-remote style HTTP cache URL, "
+                "and store the new ones. Only the configurations with inputs "
+                "are cached"
+            ),
+            metavar="LOCATION",
+        )
+        parser.add_argument(
+            "--build-cache-readonly",
+            help="Do not store the artifacts of the new builds in the build cache",
+            action="store_true",
+        )
+        parser.add_argument(
+            "--task-workers",
+            help=(
+                "Maximum number of parallel tasks running at the same time. "
+                "Default to the number of processors plus four, at most 32"
+            ),
+            metavar="N",
+            type=int,
+        )
+        parser.add_argument(
+            "--events-file",
+            help="Append the events of the run to a JSON lines file",
+            type=Path,
+        )
+        parser.add_argument(
+            "--metrics-file",
+            help=(
+                "Write the metrics of the run in the Prometheus text format, "
+                "e.g: for the textfile collector of the node exporter"
+            ),
+            type=Path,
+        )
+        parser.add_argument(
+            "--metrics-port",
+            help="Serve the metrics on http://127.0.0.1:PORT/metrics during the run",
+            metavar="PORT",
+            type=int,
+        )
 
     def handle_build(
         self,
@@ -33,27 +129,135 @@ class BuildFromFile(BuildCommandInterface):
         warning_as_error: bool = False,
         artifact_dir: str = None,
     ) -> str:
-        # Get all the registries that the user want to run
-        app_registry = config.getoption("file")
-
-        # Create the RegistryExecutor that will handle the execution of
-        # all registries
-        regexec = AppRegistryExecutor.from_file(
-            app_registry,
-            context=context,
-            project_config=project_config,
-            builder_manager=get_builder_manager(),
-        )
-
-        # Build the application using the selected registry
-        regexec.build(
-            filters=filters,
-            excludes=excludes,
-            variant_args_filters=variant_args_filters,
-            exit_on_error=exit_on_error,
-            warning_as_error=warning_as_error,
-            output_dir=artifact_dir,
-        )
-
-        # Make a report at the root of the artifact directory
-        regexec.create_report("results.xml", artifact_dir)
+        task_workers = config.getoption("task_workers")
+        if task_workers is not None and task_workers < 1:
+            raise CommandError("--task-workers must be greater than 0")
+
+        # Imported here to keep the command line startup fast
+        from socon_embedded.executor.app_executor import AppRegistryExecutor
+        from socon_embedded.executor.events import EventBus, JsonLinesSink
+
+        # Stream the events of the run to a file if requested
+        events = EventBus()
+        if config.getoption("events_file") is not None:
+            events.subscribe(JsonLinesSink(config.getoption("events_file")))
+
+        # Collect the metrics of the run if they are exported
+        metrics = server = None
+        metrics_file = config.getoption("metrics_file")
+        metrics_port = config.getoption("metrics_port")
+
+        # The events are flushed even if the build fails or is interrupted
+        try:
+            if metrics_file is not None or metrics_port is not None:
+                from socon_embedded.executor.metrics import BuildMetrics, MetricsServer
+
+                metrics = events.subscribe(BuildMetrics())
+                if metrics_port is not None:
+                    server = MetricsServer(metrics.registry, metrics_port).start()
+                    host, port = server.address
+                    terminal.line(
+                        f"Serving the metrics on http://{host}:{port}/metrics"
+                    )
+
+            # Share the artifacts of the builds between runs and runners
+            cache = None
+            if config.getoption("build_cache") is not None:
+                from socon_embedded.executor.cache import (
+                    BuildCache,
+                    create_cache_backend,
+                )
+
+                cache = BuildCache(
+                    create_cache_backend(config.getoption("build_cache")),
+                    upload=not config.getoption("build_cache_readonly"),
+                )
+
+            # Get all the registries that the user want to run
+            app_registry = config.getoption("file")
+
+            # Create the RegistryExecutor that will handle the execution of
+            # all registries
+            regexec = AppRegistryExecutor.from_file(
+                app_registry,
+                context=context,
+                project_config=project_config,
+                builder_manager=get_builder_manager(),
+                events=events,
+                cache=cache,
+                environment=self.environment,
+            )
+
+            # Only build the applications affected by the changes, if any
+            changed_files = self.get_changed_files(config)
+
+            # Only build the configurations that failed in a previous run
+            case_names = None
+            rerun_report = config.getoption("rerun_failed")
+            if rerun_report is not None:
+                from socon_embedded.executor.plan import load_failures
+
+                if not rerun_report.is_file():
+                    raise CommandError(f"Junit report '{rerun_report}' does not exist")
+                case_names = load_failures(rerun_report)
+                if not case_names:
+                    terminal.line(f"No failed build in '{rerun_report}'")
+                    return
+
+            # Only show what would be built
+            plan_format = config.getoption("plan")
+            if plan_format is not None:
+                plan = regexec.plan(
+                    filters=filters,
+                    excludes=excludes,
+                    variant_args_filters=variant_args_filters,
+                    warning_as_error=warning_as_error,
+                    output_dir=artifact_dir,
+                    history=config.getoption("plan_history"),
+                    changed_files=changed_files,
+                    case_names=case_names,
+                )
+                if plan_format == "json":
+                    terminal.line(json.dumps(plan.to_dict(), indent=2, default=str))
+                else:
+                    terminal.line(str(plan))
+                return
+
+            progress = None
+            if config.getoption("progress") is not None:
+                from socon_embedded.executor.progress import ProgressReporter
+
+                progress = ProgressReporter(config.getoption("progress"))
+
+            # Build the application using the selected registry
+            regexec.build(
+                filters=filters,
+                excludes=excludes,
+                variant_args_filters=variant_args_filters,
+                exit_on_error=exit_on_error,
+                warning_as_error=warning_as_error,
+                output_dir=artifact_dir,
+                changed_files=changed_files,
+                progress=progress,
+                resume=config.getoption("resume"),
+                case_names=case_names,
+                compress_logs=config.getoption("compress_logs"),
+                task_workers=task_workers,
+            )
+
+            # Make a report at the root of the artifact directory
+            regexec.create_report("results.xml", artifact_dir, previous=rerun_report)
+
+            if cache is not None:
+                terminal.line(
+                    f"Build cache: {cache.hits} hit(s), {cache.misses} miss(es), "
+                    f"{cache.uploads} upload(s)"
+                )
+        finally:
+            events.close()
+
+            # The metrics of a failed run are exported too
+            if metrics is not None and metrics_file is not None:
+                metrics.registry.write_textfile(metrics_file)
+            if server is not None:
+                server.close()
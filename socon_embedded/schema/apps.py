@@ -1,17 +1,19 @@
 from __future__ import annotations
 import itertools
 
-from typing import Dict, List, Optional, Union
-from socon_embedded.builder import BuildInfo
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple, Union
 
 from socon_embedded.exceptions import YamlFormatError, YamlParserError
 from socon_embedded.managers import get_builder_manager
 from socon_embedded.schema.task import Taskable
 from socon_embedded.schema.base import Base, Nameable, get_field_names
+from socon_embedded.utils.filters import Predicate, compile_filters
 
-from pydantic import BaseModel, field_validator, model_validator
+from pydantic import BaseModel, PrivateAttr, field_validator, model_validator
 
-from datalookup import Dataset
+if TYPE_CHECKING:
+    from socon_embedded.builder import BuildInfo
+    from socon_embedded.schema.index import RegistryIndex
 
 
 class AppRegistry(Base, Nameable, Taskable):
@@ -19,28 +21,44 @@ class AppRegistry(Base, Nameable, Taskable):
     vars: Optional[dict] = {}
     apps: List[AppConfig] = []
 
-    def filter(self, filters: dict = {}, excludes: dict = {}) -> AppRegistry:
+    _index: Optional[RegistryIndex] = PrivateAttr(default=None)
+
+    def get_index(self, refresh: bool = False) -> RegistryIndex:
         """
-        Filter using datalookup library, Return a new registry
-        with the filtered apps
+        Return the index of the build configurations of the registry. The
+        index is created once and reset when an application is added.
         """
-        if filters == {} and excludes == {}:
-            return self
+        if self._index is None or refresh is True:
+            from socon_embedded.schema.index import RegistryIndex
 
-        dataset = Dataset(self.model_dump()["apps"])
+            self._index = RegistryIndex(self)
+        return self._index
 
-        # Filter and excludes apps
-        apps = dataset.on_cascade().filter(**filters)
-        if excludes:
-            apps = apps.on_cascade().exclude(**excludes)
+    def filter(
+        self,
+        filters: Union[dict, Predicate] = {},
+        excludes: Union[dict, Predicate] = {},
+    ) -> AppRegistry:
+        """
+        Filter the applications with datalookup lookups. Return a new registry
+        with the filtered apps. The builders that do not match the filters
+        are removed from the applications.
+        """
+        filters = compile_filters(filters, AppConfig)
+        excludes = compile_filters(excludes, AppConfig)
+        if not filters and not excludes:
+            return self
 
-        # Re-create the AppConfig object for each filtered apps
         filtered_apps = []
-        for app in apps:
-            filtered_apps.append(AppConfig(**app.values()))
+        for app in self.apps:
+            app = filters.select(app)
+            if app is not None and not (excludes and excludes.matches(app)):
+                filtered_apps.append(app)
 
         # Return a new registry with the filtered apps
-        return AppRegistry(**self.model_dump(exclude="apps"), apps=filtered_apps)
+        registry = self.model_copy(update={"apps": filtered_apps})
+        registry._index = None
+        return registry
 
     def _get_app(self, name: str) -> Optional[AppConfig]:
         """Get an application from the registry"""
@@ -56,6 +74,7 @@ class AppRegistry(Base, Nameable, Taskable):
             self.apps.append(app)
         else:
             app.add_group(group)
+        self._index = None
         return app
 
     def add_vars(self, **variables):
@@ -68,6 +87,9 @@ class AppConfig(Base, Nameable, Taskable):
     group: Optional[Union[str, int, list]] = None
     variants: Optional[List[Variant]] = []
 
+    # Glob patterns of the source files used by every builder of the application
+    inputs: Optional[List[str]] = []
+
     @field_validator("group", mode="before")
     @classmethod
     def convert_group_to_list(cls, v: Union[str, int, list]):
@@ -75,6 +97,13 @@ class AppConfig(Base, Nameable, Taskable):
             return [v]
         return v
 
+    @field_validator("inputs", mode="before")
+    @classmethod
+    def convert_inputs_to_list(cls, v: Union[str, list]):
+        if isinstance(v, str):
+            return [v]
+        return v
+
     @model_validator(mode="after")
     def validate_builder_exist(self):
         # Find common builders and project builders if the project define
@@ -107,49 +136,58 @@ class AppConfig(Base, Nameable, Taskable):
 
     @staticmethod
     def _get_build_configs(
-        app: str, builder: AppBuilder, filters: dict = {}
+        app: str, builder: AppBuilder, filters: Union[dict, Predicate] = {}
     ) -> list[BuildConfig]:
         build_configs = []
 
         # If the user specified the configs entry, we need to create
         # multiple build configuration
         if builder.variant_args:
-            keys, values = zip(*builder.variant_args.items())
-            permutations_dicts = [
-                dict(zip(keys, v)) for v in itertools.product(*values)
-            ]
-            for variant in permutations_dicts:
-                config_builder = AppBuilder(
-                    **builder.model_dump(exclude="variant_args"), variant_args=variant
-                )
-                app_dataset = Dataset(config_builder.model_dump())
-                if len(app_dataset.filter(**filters)) != 0:
-                    build_configs.append(BuildConfig(app=app, builder=config_builder))
+            filters = compile_filters(filters, AppBuilder)
+            for variant in get_permutations(builder.variant_args):
+                build_config = create_build_config(app, builder, variant)
+                if not filters or filters.matches(build_config.builder):
+                    build_configs.append(build_config)
         else:
-            build_configs.append(BuildConfig(app=app, builder=builder))
+            build_configs.append(create_build_config(app, builder))
 
         return build_configs
 
-    def get_build_configs(self, filters: dict = {}) -> List[BuildConfig]:
-        build_configs = []
+    def iter_builders(
+        self,
+    ) -> Iterator[Tuple[str, AppBuilder, Optional[VariantBuilder]]]:
+        """
+        Yield the application name, the builder and the variant builder (None
+        for the application builders) of each builder configuration. The
+        variant builders are not merged with the builder they reference.
+        """
         builders_ref: Dict[str, AppBuilder] = {}
-
         for builder in self.builders:
             # Save the builder reference for the variant
             if builder.name not in builders_ref:
                 builders_ref[builder.name] = builder
-
-            # If the user specified the configs entry, we need to create
-            # multiple build configuration
-            build_configs.extend(self._get_build_configs(self.name, builder, filters))
+            yield self.name, builder, None
 
         for variant in self.variants:
             app = self.name + f".{variant.name}"
             for vbuilder in variant.builders:
                 for ref in vbuilder.ref:
-                    builder_ref = builders_ref[ref]
-                    builder = builder_ref.merge_variant_builder(vbuilder)
-                    build_configs.extend(self._get_build_configs(app, builder, filters))
+                    # The referenced builder may have been filtered out
+                    if ref in builders_ref:
+                        yield app, builders_ref[ref], vbuilder
+
+    def get_build_configs(
+        self, filters: Union[dict, Predicate] = {}
+    ) -> List[BuildConfig]:
+        filters = compile_filters(filters, AppBuilder)
+        build_configs = []
+        for app, builder, vbuilder in self.iter_builders():
+            if vbuilder is not None:
+                builder = builder.merge_variant_builder(vbuilder)
+
+            # If the user specified the configs entry, we need to create
+            # multiple build configuration
+            build_configs.extend(self._get_build_configs(app, builder, filters))
 
         return build_configs
 
@@ -181,43 +219,99 @@ class BuildConfig(Base, Taskable):
     app: str
     builder: AppBuilder
 
+    @property
+    def key(self) -> tuple:
+        """Identify a build configuration in a registry"""
+        return (self.app, self.builder.name, tuple(self.builder.variant_args.items()))
+
     def get_buildinfo(self) -> dict:
         return {
             "app": self.app,
             **self.builder.model_dump(
                 by_alias=True,
-                exclude=[*get_field_names(Taskable), *get_field_names(Nameable)],
+                exclude=[
+                    *get_field_names(Taskable),
+                    *get_field_names(Nameable),
+                    "inputs",
+                ],
             ),
         }
 
     def create_buildinfo(self) -> BuildInfo:
+        from socon_embedded.builder import BuildInfo
+
         build_info = self.get_buildinfo()
-        build_info.pop("raw_args")
+        for key in ["raw_args", "timeout", "stall_timeout"]:
+            build_info.pop(key)
         return BuildInfo(builder=self.builder.name, **build_info)
 
 
+def get_permutations(variant_args: dict) -> list[dict]:
+    """Return every combination of the variant args values"""
+    keys, values = zip(*variant_args.items())
+    return [dict(zip(keys, v)) for v in itertools.product(*values)]
+
+
+def create_build_config(
+    app: str, builder: AppBuilder, variant: Optional[dict] = None
+) -> BuildConfig:
+    """
+    Create the build configuration of a builder for one variant args
+    permutation. The builder is copied without validation: every field but
+    the variant args, e.g. the tasks and raw args, is shared with the other
+    permutations and must not be modified in place.
+    """
+    if variant is not None:
+        builder = builder.model_copy(update={"variant_args": variant})
+    return BuildConfig.model_construct(app=app, builder=builder)
+
+
 class Builder(Taskable):
-    variant_args: Optional[Dict[str, Union[str, list]]] = {}
+    # The values are checked once per builder: the build configurations of
+    # the permutations are created without validation
+    variant_args: Optional[Dict[str, Union[str, List[str]]]] = {}
     raw_args: Optional[list] = []
 
+    # Override the builder timeouts (in seconds) for this configuration
+    timeout: Optional[float] = None
+    stall_timeout: Optional[float] = None
+
 
 class AppBuilder(Base, Builder, Nameable):
     project_file: str
 
+    # Glob patterns of the source files used by this builder. The project
+    # file is always an input.
+    inputs: Optional[List[str]] = []
+
+    @field_validator("inputs", mode="before")
+    @classmethod
+    def convert_inputs_to_list(cls, v: Union[str, list]):
+        if isinstance(v, str):
+            return [v]
+        return v
+
     def merge_variant_builder(self, other: VariantBuilder) -> AppBuilder:
-        """Merge a builder with a variant builder"""
-        builder = self.model_copy(deep=True)
+        """
+        Merge a builder with a variant builder. The new builder shares the
+        values of both builders: they must not be modified in place.
+        """
+        # Merge all remaining fields. Timeouts not set by the variant are kept
+        update = {
+            key: getattr(other, key)
+            for key in get_field_names(Builder)
+            if key not in get_field_names(Taskable)
+        }
+        for key in ["timeout", "stall_timeout"]:
+            if update[key] is None:
+                update.pop(key)
+        builder = self.model_copy(update=update)
 
         # Merge tasks from other to the current builder
         builder.merge_tasks(other, other.keep_tasks, "tasks")
         builder.merge_tasks(other, other.keep_post_tasks, "post_tasks")
 
-        # Merge all remaining fields
-        builder_dict = builder.model_dump() | other.model_dump(
-            exclude=[*get_field_names(Taskable), *get_field_names(VariantBuilderField)]
-        )
-
-        return AppBuilder(**builder_dict)
+        return builder
 
 
 class VariantBuilderField(BaseModel):
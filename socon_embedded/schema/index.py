@@ -0,0 +1,295 @@
+"""
+Inverted index over the build configurations of an application registry.
+
+Every build configuration (application, builder, variant args permutation)
+of the registry is listed once, without creating the BuildConfig objects.
+Each configuration is then referenced by the value of the fields that are
+used to select applications:
+
+    name                    the application name
+    group                   each application group
+    builders__name          the builder name
+    variant_args__<key>     the value of each variant args key
+
+Exact and '__in' lookups on these fields, compiled by compile_filters, are
+evaluated as set operations. They follow the semantics of AppRegistry.filter:
+filters keep the configurations matching every lookup, excludes remove the
+applications matching every lookup. Queries using other lookups cannot be
+answered by the index.
+"""
+from __future__ import annotations
+
+import os
+
+from collections import defaultdict
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from socon_embedded.utils.filters import Lookup, Predicate, compile_filters
+from socon_embedded.utils.paths import PathTrie
+
+if TYPE_CHECKING:
+    from socon_embedded.schema.apps import (
+        AppBuilder,
+        AppConfig,
+        AppRegistry,
+        BuildConfig,
+        VariantBuilder,
+    )
+
+# Fields that identify an application rather than a build configuration
+APP_FIELDS = ["name", "group"]
+
+# Fields with a list of values. Only '__in' lookups are supported on them
+LIST_FIELDS = ["group"]
+
+VARIANT_ARGS_PREFIX = "variant_args__"
+
+
+class IndexEntry:
+    """A build configuration of the registry that is created on demand"""
+
+    __slots__ = ["app_config", "app", "builder", "vbuilder", "variant", "_index"]
+
+    def __init__(
+        self,
+        index: RegistryIndex,
+        app_config: AppConfig,
+        app: str,
+        builder: AppBuilder,
+        vbuilder: Optional[VariantBuilder] = None,
+        variant: Optional[dict] = None,
+    ) -> None:
+        self._index = index
+        self.app_config = app_config
+        self.app = app
+        self.builder = builder
+        self.vbuilder = vbuilder
+        self.variant = variant
+
+    @property
+    def key(self) -> tuple:
+        """Same key as BuildConfig.key"""
+        return (self.app, self.builder.name, tuple((self.variant or {}).items()))
+
+    @property
+    def case_name(self) -> str:
+        """Same name as BuildInfo.get_case_name"""
+        return " - ".join([self.app, self.builder.name, *(self.variant or {}).values()])
+
+    def get_build_config(self) -> BuildConfig:
+        from socon_embedded.schema.apps import create_build_config
+
+        builder = self._index._get_builder(self.builder, self.vbuilder)
+        return create_build_config(self.app, builder, self.variant)
+
+
+class RegistryIndex:
+    """Inverted index of the build configurations of an application registry"""
+
+    def __init__(self, registry: AppRegistry) -> None:
+        self.apps: List[AppConfig] = list(registry.apps)
+        self.entries: List[IndexEntry] = []
+
+        # id of the application config -> entries position
+        self._app_entries: Dict[int, List[int]] = defaultdict(list)
+
+        # lookup path -> value -> entries position
+        self._postings: Dict[str, Dict[Hashable, Set[int]]] = defaultdict(
+            lambda: defaultdict(set)
+        )
+
+        # Builders merged with a variant builder, created once
+        self._merged_builders: Dict[tuple, AppBuilder] = {}
+
+        # Inputs of the (app, builder name) configurations, created on demand
+        self._inputs: Optional[PathTrie[Tuple[str, str]]] = None
+        self._without_inputs: Set[Tuple[str, str]] = set()
+
+        # Junit case name -> entry, created on demand
+        self._case_names: Optional[Dict[str, IndexEntry]] = None
+
+        for app_config in registry.apps:
+            self._add_app(app_config)
+
+    def _add_app(self, app_config: AppConfig) -> None:
+        from socon_embedded.schema.apps import get_permutations
+
+        for app, builder, vbuilder in app_config.iter_builders():
+            source = vbuilder if vbuilder is not None else builder
+            variants = [None]
+            if source.variant_args:
+                variants = get_permutations(source.variant_args)
+
+            for variant in variants:
+                position = len(self.entries)
+                self.entries.append(
+                    IndexEntry(self, app_config, app, builder, vbuilder, variant)
+                )
+                self._app_entries[id(app_config)].append(position)
+                self._add_posting("name", app_config.name, position)
+                for group in app_config.group or []:
+                    self._add_posting("group", group, position)
+                self._add_posting("builders__name", builder.name, position)
+                for key, value in (variant or {}).items():
+                    self._add_posting(VARIANT_ARGS_PREFIX + key, value, position)
+
+    def _add_posting(self, path: str, value: Hashable, position: int) -> None:
+        try:
+            self._postings[path][value].add(position)
+        except TypeError:
+            # Unhashable values can not be looked up
+            pass
+
+    def _get_builder(
+        self, builder: AppBuilder, vbuilder: Optional[VariantBuilder]
+    ) -> AppBuilder:
+        if vbuilder is None:
+            return builder
+        key = (id(builder), id(vbuilder))
+        if key not in self._merged_builders:
+            self._merged_builders[key] = builder.merge_variant_builder(vbuilder)
+        return self._merged_builders[key]
+
+    def supports(self, lookup: Lookup, variant_args: bool = False) -> bool:
+        """
+        Check if the index can evaluate a lookup of the registry filters or,
+        if variant_args is True, of the variant args filters.
+        """
+        if variant_args is True:
+            if len(lookup.path) != 2 or lookup.path[0] != "variant_args":
+                return False
+        elif lookup.field not in APP_FIELDS and lookup.field != "builders__name":
+            return False
+
+        if lookup.operator == "in":
+            return isinstance(lookup.value, (frozenset, tuple))
+        if lookup.operator != "exact" or lookup.field in LIST_FIELDS:
+            return False
+        try:
+            hash(lookup.value)
+        except TypeError:
+            return False
+        return True
+
+    def _match(self, lookup: Lookup) -> Set[int]:
+        """Return the position of the entries matching a lookup"""
+        postings = self._postings.get(lookup.field, {})
+        values = lookup.value if lookup.operator == "in" else [lookup.value]
+        matches = set()
+        for item in values:
+            try:
+                matches |= postings.get(item, set())
+            except TypeError:
+                continue
+        return matches
+
+    def _match_all(self, predicate: Predicate, positions: Iterable[int]) -> Set[int]:
+        matches = set(positions)
+        for lookup in predicate.lookups:
+            matches &= self._match(lookup)
+        return matches
+
+    def _get_app_entries(self, positions: Iterable[int]) -> Set[int]:
+        """Return every entry of the applications of the given entries"""
+        apps = {id(self.entries[position].app_config) for position in positions}
+        return {position for app in apps for position in self._app_entries[app]}
+
+    def query(
+        self,
+        filters: Union[dict, Predicate] = {},
+        excludes: Union[dict, Predicate] = {},
+        variant_args_filters: Union[dict, Predicate] = {},
+    ) -> Optional[Tuple[List[AppConfig], List[IndexEntry]]]:
+        """
+        Return the selected applications and build configurations, in registry
+        order. Applications are selected with the filters and excludes only,
+        as AppRegistry.filter would. Return None if one of the lookups is not
+        supported by the index or if a variant args key is missing.
+        """
+        filters = compile_filters(filters)
+        excludes = compile_filters(excludes)
+        variant_args_filters = compile_filters(variant_args_filters)
+        for lookup in [*filters.lookups, *excludes.lookups]:
+            if not self.supports(lookup):
+                return None
+        for lookup in variant_args_filters.lookups:
+            if not self.supports(lookup, variant_args=True):
+                return None
+
+        # As the excludes apply to the filtered applications, an application
+        # is excluded if one of its selected configurations matches them
+        matches = self._match_all(filters, range(len(self.entries)))
+        if excludes:
+            matches -= self._get_app_entries(self._match_all(excludes, matches))
+
+        selected = {id(self.entries[position].app_config) for position in matches}
+        apps = []
+        for app_config in self.apps:
+            if id(app_config) in selected:
+                apps.append(app_config)
+            elif id(app_config) not in self._app_entries:
+                # Application without build configuration
+                if filters.matches(app_config) and not (
+                    excludes and excludes.matches(app_config)
+                ):
+                    apps.append(app_config)
+
+        # Configurations without variant args are never filtered by the
+        # variant args filters. The other ones must define every filtered key,
+        # datalookup raises a LookupError otherwise.
+        if variant_args_filters:
+            with_variant = {p for p in matches if self.entries[p].variant is not None}
+            for lookup in variant_args_filters.lookups:
+                defined = set().union(*self._postings.get(lookup.field, {}).values())
+                if not with_variant <= defined:
+                    return None
+            variant_matches = self._match_all(variant_args_filters, matches)
+            matches = {
+                position
+                for position in matches
+                if position in variant_matches or self.entries[position].variant is None
+            }
+
+        return apps, [self.entries[position] for position in sorted(matches)]
+
+    def get_case(self, name: str) -> Optional[IndexEntry]:
+        """Return the build configuration reported with this junit case name"""
+        if self._case_names is None:
+            self._case_names = {entry.case_name: entry for entry in self.entries}
+        return self._case_names.get(name)
+
+    def _create_inputs_trie(self) -> None:
+        self._inputs = PathTrie()
+        for entry in self.entries:
+            key = (entry.app, entry.builder.name)
+            inputs = [*(entry.app_config.inputs or []), *(entry.builder.inputs or [])]
+            if not inputs:
+                self._without_inputs.add(key)
+                continue
+            for pattern in [*inputs, entry.builder.project_file]:
+                self._inputs.insert(pattern, key)
+
+    def get_affected(
+        self, changed_files: Iterable[Union[str, os.PathLike]]
+    ) -> Set[Tuple[str, str]]:
+        """
+        Return the (app, builder name) configurations using one of the changed
+        files. Relative paths start at the current directory. Configurations
+        without inputs are always affected.
+        """
+        if self._inputs is None:
+            self._create_inputs_trie()
+        affected = set(self._without_inputs)
+        for path in changed_files:
+            affected |= self._inputs.match(path)
+        return affected
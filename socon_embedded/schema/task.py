@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List, Literal, Optional, Type, Any
+from typing import List, Literal, Optional, Type, Union, Any
 
 from socon.core.registry import projects
 
@@ -8,7 +8,7 @@ from socon_embedded.exceptions import ParserError
 from socon_embedded.managers import get_action_manager
 from socon_embedded.schema.base import Base, Nameable, get_field_names
 
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 
 class Task(Base, Nameable):
@@ -20,6 +20,23 @@ class Task(Base, Nameable):
     retries: Optional[int] = 0
     timeout: Optional[int] = None
 
+    # Let the task run concurrently with the other parallel tasks of the same
+    # list. A task with depends_on is parallel and starts once the named
+    # tasks, declared before it, are finished.
+    parallel: Optional[bool] = False
+    depends_on: Optional[List[str]] = []
+
+    @field_validator("depends_on", mode="before")
+    @classmethod
+    def convert_depends_on_to_list(cls, v: Union[str, list]):
+        if isinstance(v, str):
+            return [v]
+        return v
+
+    @property
+    def is_parallel(self) -> bool:
+        return bool(self.parallel or self.depends_on)
+
     @model_validator(mode="before")
     @classmethod
     def preprocess_action(cls, values):
@@ -102,14 +119,34 @@ class Taskable(BaseModel):
     tasks: List[Task] = Field(default_factory=list)
     post_tasks: List[Task] = Field(default_factory=list)
 
+    @field_validator("tasks", "post_tasks")
+    @classmethod
+    def validate_depends_on(cls, tasks: List[Task]):
+        """A task can only depend on tasks declared before it"""
+        names = set()
+        for task in tasks:
+            for name in task.depends_on:
+                if name not in names:
+                    raise ValueError(
+                        f"Task '{task.name}' depends on '{name}' which is not "
+                        "declared before it"
+                    )
+            names.add(task.name)
+        return tasks
+
     def merge_tasks(
         self, y: Type[Taskable], keep: bool, tasks_type: Literal["tasks", "post_tasks"]
     ) -> Type[Taskable]:
-        """Merge y tasks into x tasks"""
+        """
+        Merge y tasks into x tasks. The task lists are replaced, never
+        modified, as they may be shared with other schemas.
+        """
         if keep is False:
             setattr(self, tasks_type, getattr(y, tasks_type))
         else:
+            tasks = list(getattr(self, tasks_type))
             for task in getattr(y, tasks_type):
-                if task not in getattr(self, tasks_type):
-                    getattr(self, tasks_type).append(task)
+                if task not in tasks:
+                    tasks.append(task)
+            setattr(self, tasks_type, tasks)
         return self
@@ -0,0 +1,45 @@
+import threading
+
+from typing import Callable, Dict, Optional
+
+
+class CancellationToken:
+    """
+    Shared flag telling the running work to stop. The functions registered
+    on the token are called once, from the thread that cancels it, e.g. to
+    kill a running process.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._callbacks: Dict[int, Callable[[], None]] = {}
+        self._next_id = 0
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def cancel(self, reason: str = "Cancelled") -> None:
+        """Cancel the token. Cancelling it again does nothing"""
+        with self._lock:
+            if self.reason is not None:
+                return
+            self.reason = reason
+            callbacks, self._callbacks = list(self._callbacks.values()), {}
+        for callback in callbacks:
+            callback()
+
+    def register(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Call callback when the token is cancelled, immediately if it already
+        is. Return a function that unregisters the callback.
+        """
+        with self._lock:
+            if self.reason is None:
+                callback_id = self._next_id
+                self._next_id += 1
+                self._callbacks[callback_id] = callback
+                return lambda: self._callbacks.pop(callback_id, None)
+        callback()
+        return lambda: None
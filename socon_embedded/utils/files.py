@@ -0,0 +1,223 @@
+import errno
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Union
+
+# ioctl request used to clone a file on copy-on-write filesystems (btrfs, xfs)
+FICLONE = 0x40049409
+
+# Size of the chunks read when computing a file digest
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class CopyStats:
+    """Store what has been done by a copy"""
+
+    files_copied: int = 0
+    files_skipped: int = 0
+    bytes_copied: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return self.files_copied != 0
+
+    def add(self, copied_bytes: Optional[int]) -> None:
+        """Add a file result. None means the file was skipped"""
+        if copied_bytes is None:
+            self.files_skipped += 1
+        else:
+            self.files_copied += 1
+            self.bytes_copied += copied_bytes
+
+
+def file_digest(path: Union[str, os.PathLike]) -> str:
+    """Return the sha256 digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_same_file(
+    src: Union[str, os.PathLike],
+    dest: Union[str, os.PathLike],
+    checksum: bool = False,
+    src_stat: Optional[os.stat_result] = None,
+) -> bool:
+    """
+    Check if dest is already a copy of src. Files are compared on their size
+    and modification time or on their digest if checksum is True.
+    """
+    try:
+        dest_stat = os.stat(dest)
+    except FileNotFoundError:
+        return False
+    src_stat = src_stat or os.stat(src)
+    if src_stat.st_size != dest_stat.st_size:
+        return False
+    if checksum is True:
+        return file_digest(src) == file_digest(dest)
+    return src_stat.st_mtime_ns == dest_stat.st_mtime_ns
+
+
+def _fast_copy(fsrc, fdst, size: int) -> bool:
+    """
+    Copy the content of fsrc into fdst using a reflink or copy_file_range.
+    Return False if the platform or the filesystem cannot do it.
+    """
+    if sys.platform == "linux":
+        try:
+            import fcntl
+
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            return True
+        except (ImportError, OSError):
+            pass
+
+    if not hasattr(os, "copy_file_range"):
+        return False
+    try:
+        copied = 0
+        while copied < size:
+            sent = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - copied)
+            if sent == 0:
+                break
+            copied += sent
+    except OSError:
+        return False
+    return copied == size
+
+
+def copy_file(
+    src: Union[str, os.PathLike],
+    dest: Union[str, os.PathLike],
+    checksum: bool = False,
+) -> Optional[int]:
+    """
+    Copy a file with its metadata if dest is not already a copy of it.
+    Return the number of bytes copied or None if the file was skipped.
+    """
+    src_stat = os.stat(src)
+    if is_same_file(src, dest, checksum, src_stat):
+        return None
+
+    size = src_stat.st_size
+    with open(src, "rb") as fsrc, open(dest, "wb") as fdst:
+        if not _fast_copy(fsrc, fdst, size):
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+            shutil.copyfileobj(fsrc, fdst, CHUNK_SIZE)
+    shutil.copystat(src, dest)
+    return size
+
+
+def copy_tree(
+    src: Union[str, os.PathLike],
+    dest: Union[str, os.PathLike],
+    checksum: bool = False,
+    workers: Optional[int] = None,
+) -> CopyStats:
+    """
+    Copy a directory tree into dest. Files that are already up to date in dest
+    are skipped and the other ones are copied in parallel.
+    """
+    stats = CopyStats()
+    files = []
+    directories = []
+    for root, _, filenames in os.walk(src, followlinks=True):
+        dest_root = Path(dest, os.path.relpath(root, src))
+        dest_root.mkdir(parents=True, exist_ok=True)
+        directories.append((root, dest_root))
+        for filename in filenames:
+            files.append((Path(root, filename), Path(dest_root, filename)))
+
+    with ThreadPoolExecutor(workers) as pool:
+        futures = [pool.submit(copy_file, s, d, checksum) for s, d in files]
+        for future in futures:
+            stats.add(future.result())
+
+    # Apply the directory metadata once their content has been written
+    for root, dest_root in directories:
+        shutil.copystat(root, dest_root)
+
+    return stats
+
+
+def tree_size(path: Union[str, os.PathLike]) -> int:
+    """Return the size in bytes of a file or of every file in a directory"""
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(root, filename))
+        for root, _, filenames in os.walk(path)
+        for filename in filenames
+    )
+
+
+def move(
+    src: Union[str, os.PathLike],
+    dest: Union[str, os.PathLike],
+    workers: Optional[int] = None,
+) -> int:
+    """
+    Move a file or a directory. On the same filesystem, the move is an atomic
+    rename. Otherwise, the content is copied (in parallel for a directory)
+    and then removed from the source. Return the number of bytes moved.
+    """
+    size = tree_size(src)
+    try:
+        os.replace(src, dest)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        if os.path.isdir(src):
+            copy_tree(src, dest, workers=workers)
+            shutil.rmtree(src)
+        else:
+            copy_file(src, dest)
+            os.unlink(src)
+    return size
+
+
+@lru_cache(maxsize=None)
+def _get_umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def write_atomic(dest: Union[str, os.PathLike], content: bytes) -> Optional[int]:
+    """
+    Write the content into a temporary file next to dest and rename it as dest.
+    Nothing is written if dest already has the same content. Return the number
+    of bytes written or None if the file was already up to date.
+    """
+    dest = Path(dest)
+    try:
+        if dest.stat().st_size == len(content) and dest.read_bytes() == content:
+            return None
+        mode = dest.stat().st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~_get_umask()
+
+    fd, tmp = tempfile.mkstemp(dir=dest.parent, prefix=f".{dest.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.chmod(tmp, mode)
+        os.replace(tmp, dest)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return len(content)
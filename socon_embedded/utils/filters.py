@@ -0,0 +1,320 @@
+"""
+Compiled filter lookups.
+
+The --filter, --exclude and --variant-args options are lookups with the
+datalookup syntax: field names and an optional operator separated by '__',
+e.g. builders__name__in=['gcc']. They are compiled once into a Predicate:
+the lookup path is split and, given a schema, checked against its fields,
+the operator is bound and its value prepared ('__in' values become
+frozensets, regexes are compiled). The predicate is then evaluated on the
+schema objects directly, without dumping them to dictionaries.
+
+The semantics are the ones of datalookup on the dumped objects: the
+lookups on a list of objects match if one object matches all of them, and
+the lookups on a list of values use the array operators. Predicate.select
+also removes the objects of a list that do not match, as the on_cascade
+filters of datalookup do.
+"""
+from __future__ import annotations
+
+import inspect
+import re
+
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type, Union
+
+from pydantic import BaseModel
+
+from socon_embedded.exceptions import FilterError
+
+LOOKUP_SEP = "__"
+
+
+def _lower(value: Any) -> Any:
+    return value.lower() if isinstance(value, str) else value
+
+
+def _in_range(field: Any, value: range) -> bool:
+    # Same as 'field in value' without iterating the range for the floats
+    if isinstance(field, float) and not field.is_integer():
+        return False
+    return value.start <= field < value.stop
+
+
+# Operator -> function(field value, prepared filter value)
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "exact": lambda field, value: field == value,
+    "iexact": lambda field, value: _lower(field) == value,
+    "in": lambda field, value: field in value,
+    "contains": lambda field, value: value in field,
+    "icontains": lambda field, value: value in field.lower(),
+    "startswith": lambda field, value: field.startswith(value),
+    "istartswith": lambda field, value: field.lower().startswith(value),
+    "endswith": lambda field, value: field.endswith(value),
+    "iendswith": lambda field, value: field.lower().endswith(value),
+    "regex": lambda field, value: value.match(field) is not None,
+    "iregex": lambda field, value: value.match(field.lower()) is not None,
+    "gt": lambda field, value: field > value,
+    "gte": lambda field, value: field >= value,
+    "lt": lambda field, value: field < value,
+    "lte": lambda field, value: field <= value,
+    "range": _in_range,
+    "isnull": lambda field, value: (field is None) is value,
+}
+
+# Operators applied to the values of a list field. A string filter value is
+# a list of one value.
+ARRAY_OPERATORS: Dict[str, Callable[[list, Any], bool]] = {
+    "in": lambda field, value: any(item in value for item in field),
+    "contains": lambda field, value: all(item in field for item in value),
+    "contained_by": lambda field, value: all(item in value for item in field),
+    "overlap": lambda field, value: any(item in field for item in value),
+    "len": lambda field, value: len(field) == value,
+}
+
+STRING_OPERATORS = [
+    "iexact",
+    "icontains",
+    "startswith",
+    "istartswith",
+    "endswith",
+    "iendswith",
+]
+
+
+class Lookup:
+    """A single lookup, e.g: builders__name__in=['gcc']"""
+
+    __slots__ = (
+        "lookup",
+        "path",
+        "field",
+        "operator",
+        "value",
+        "_array_value",
+        "_test",
+    )
+
+    def __init__(self, lookup: str, value: Any) -> None:
+        names = lookup.split(LOOKUP_SEP)
+        operator = "exact"
+        if len(names) > 1 and (names[-1] in OPERATORS or names[-1] in ARRAY_OPERATORS):
+            operator = names.pop()
+        if not all(names):
+            raise FilterError(f"Invalid lookup '{lookup}'")
+
+        self.lookup = lookup
+        self.path: Tuple[str, ...] = tuple(names)
+        self.field = LOOKUP_SEP.join(names)
+        self.operator = operator
+        self.value = self._prepare(value)
+        self._array_value = (self.value,) if isinstance(self.value, str) else self.value
+        self._test = OPERATORS.get(operator)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {self.lookup}={self.value!r}>"
+
+    def _prepare(self, value: Any) -> Any:
+        """Check the filter value and convert it once for every evaluation"""
+        operator = self.operator
+        if operator in ["in", "contained_by", "overlap"]:
+            # A string value keeps the datalookup behavior: substring test
+            if isinstance(value, str):
+                return value
+            if not isinstance(value, Iterable) or isinstance(value, dict):
+                raise FilterError(
+                    f"'{self.lookup}' lookup requires a list, not {value!r}"
+                )
+            try:
+                return frozenset(value)
+            except TypeError:
+                return tuple(value)
+        if operator in ["regex", "iregex"]:
+            if not isinstance(value, str):
+                raise FilterError(f"'{self.lookup}' lookup requires a string")
+            try:
+                # The field is lowercased by iregex, not the regex
+                return re.compile(value)
+            except re.error as e:
+                raise FilterError(f"Invalid regex in '{self.lookup}' lookup: {e}")
+        if operator in STRING_OPERATORS:
+            if not isinstance(value, str):
+                raise FilterError(f"'{self.lookup}' lookup requires a string")
+            return value.lower() if operator.startswith("i") else value
+        if operator == "isnull" and not isinstance(value, bool):
+            raise FilterError(f"'{self.lookup}' lookup requires a boolean")
+        if operator == "len" and (
+            not isinstance(value, int) or isinstance(value, bool)
+        ):
+            raise FilterError(f"'{self.lookup}' lookup requires an integer")
+        if operator == "range":
+            if (
+                not isinstance(value, (list, tuple))
+                or len(value) != 2
+                or not all(isinstance(bound, int) for bound in value)
+            ):
+                raise FilterError(f"'{self.lookup}' lookup requires two integer bounds")
+            return range(value[0], value[1])
+        return value
+
+    def matches(self, field: Any) -> bool:
+        """Evaluate the lookup on the value of its field"""
+        try:
+            if isinstance(field, list) and self.operator != "isnull":
+                # As in datalookup, only the array operators match a list
+                test = ARRAY_OPERATORS.get(self.operator)
+                return test is not None and test(field, self._array_value)
+            if self._test is None:
+                return False
+            return self._test(field, self.value)
+        except (TypeError, AttributeError):
+            # Values that can not be compared, e.g: a string and an integer
+            return False
+
+
+def get_field(obj: Any, name: str, prefix: Tuple[str, ...] = ()) -> Any:
+    """Return the value of a field of a schema or of a dictionary"""
+    if isinstance(obj, dict):
+        if name in obj:
+            return obj[name]
+    elif isinstance(obj, BaseModel):
+        if name in type(obj).model_fields:
+            return getattr(obj, name)
+    raise FilterError(
+        "Cannot resolve '{}': '{}' field does not exist".format(
+            LOOKUP_SEP.join([*prefix, name]), name
+        )
+    )
+
+
+def _copy(obj: Any, update: dict) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_copy(update=update)
+    return {**obj, **update}
+
+
+class Predicate:
+    """
+    Lookups compiled once and evaluated on many objects. The lookups on the
+    fields of a related object (e.g: builders__name) are grouped in a
+    predicate of that object.
+    """
+
+    def __init__(self, lookups: Iterable[Lookup] = (), depth: int = 0) -> None:
+        self.lookups: List[Lookup] = list(lookups)
+        self._depth = depth
+        self._prefix: Tuple[str, ...] = ()
+
+        # Lookups on the fields of this object and predicates of the related ones
+        self._local: List[Tuple[str, Lookup]] = []
+        self._related: Dict[str, Predicate] = {}
+
+        related = defaultdict(list)
+        for lookup in self.lookups:
+            if len(lookup.path) == depth + 1:
+                self._local.append((lookup.path[depth], lookup))
+            else:
+                related[lookup.path[depth]].append(lookup)
+        for name, lookups in related.items():
+            predicate = Predicate(lookups, depth + 1)
+            predicate._prefix = lookups[0].path[: depth + 1]
+            self._related[name] = predicate
+
+    def __bool__(self) -> bool:
+        return bool(self.lookups)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {self.lookups!r}>"
+
+    def _matches_local(self, obj: Any) -> bool:
+        for name, lookup in self._local:
+            if not lookup.matches(get_field(obj, name, self._prefix)):
+                return False
+        return True
+
+    def matches(self, obj: Any) -> bool:
+        """Check if an object, a schema or a dictionary, matches every lookup"""
+        if not self._matches_local(obj):
+            return False
+        for name, predicate in self._related.items():
+            value = get_field(obj, name, self._prefix)
+            if isinstance(value, list):
+                if not any(predicate.matches(item) for item in value):
+                    return False
+            elif not predicate.matches(value):
+                return False
+        return True
+
+    def select(self, obj: Any) -> Optional[Any]:
+        """
+        Return the object without the related objects that do not match, or
+        None if the object does not match. The object is copied only if one
+        of its lists changes: the other fields are shared with the copy.
+        """
+        if not self._matches_local(obj):
+            return None
+        update = {}
+        for name, predicate in self._related.items():
+            value = get_field(obj, name, self._prefix)
+            if isinstance(value, list):
+                selected = [predicate.select(item) for item in value]
+                selected = [item for item in selected if item is not None]
+                if not selected:
+                    return None
+                if len(selected) != len(value) or any(
+                    a is not b for a, b in zip(selected, value)
+                ):
+                    update[name] = selected
+            else:
+                selected = predicate.select(value)
+                if selected is None:
+                    return None
+                if selected is not value:
+                    update[name] = selected
+        return _copy(obj, update) if update else obj
+
+
+def _get_model(annotation: Any) -> Optional[Type[BaseModel]]:
+    """Return the schema of a field annotation, e.g: List[AppBuilder]"""
+    if inspect.isclass(annotation) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in getattr(annotation, "__args__", ()):
+        model = _get_model(arg)
+        if model is not None:
+            return model
+    return None
+
+
+def check_lookup(model: Type[BaseModel], lookup: Lookup) -> None:
+    """
+    Check that the path of a lookup exists in a schema. The fields of a
+    dictionary, e.g: variant_args, are not known and are not checked.
+    """
+    current = model
+    for name in lookup.path:
+        if current is None:
+            return
+        field = current.model_fields.get(name)
+        if field is None:
+            raise FilterError(
+                f"Invalid lookup '{lookup.lookup}': '{name}' is not a field of "
+                f"{current.__name__}"
+            )
+        current = _get_model(field.annotation)
+
+
+def compile_filters(
+    filters: Union[dict, Predicate, None] = None,
+    model: Optional[Type[BaseModel]] = None,
+) -> Predicate:
+    """
+    Compile a dictionary of lookups. If model is given, the lookup paths are
+    checked against its fields. A compiled predicate is returned as is.
+    """
+    if isinstance(filters, Predicate):
+        return filters
+    lookups = [Lookup(lookup, value) for lookup, value in (filters or {}).items()]
+    if model is not None:
+        for lookup in lookups:
+            check_lookup(model, lookup)
+    return Predicate(lookups)
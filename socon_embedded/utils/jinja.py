@@ -3,13 +3,22 @@ import os
 from pathlib import Path
 from typing import Any, Dict, Union
 
-from jinja2 import Environment, FileSystemLoader
-
 
 def jinja_resolve(file: Union[str, os.PathLike], context: Dict[str, Any]) -> str:
     """Resolve a file with the given context"""
+    from jinja2 import Environment, FileSystemLoader
+
     file = Path(file).expanduser().resolve()
     template_loader = FileSystemLoader(file.parent)
     env = Environment(loader=template_loader)
     template = env.get_template(file.name)
     return template.render(**context)
+
+
+def jinja_render(content: str, context: Dict[str, Any]) -> str:
+    """Render a template string with the given context"""
+    if "{{" not in content and "{%" not in content:
+        return content
+    from jinja2 import Environment
+
+    return Environment().from_string(content).render(**context)
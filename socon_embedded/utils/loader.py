@@ -6,8 +6,6 @@ import os
 from pathlib import Path
 from typing import Union
 
-from yaml import YAMLError, safe_load
-
 from socon_embedded.exceptions import YamlParserError
 
 logger = logging.getLogger(__name__)
@@ -18,6 +16,8 @@ def from_json_or_yaml(data, show_content=True):
     Creates a python datastructure from the given data, which can be either
     a JSON or YAML string.
     """
+    from yaml import YAMLError, safe_load
+
     new_data = None
 
     try:
@@ -21,6 +21,9 @@ _ESCAPE_SEQUENCE_RE = re.compile(
     re.UNICODE | re.VERBOSE,
 )
 
+# A key=value item ends where the next key= starts
+_KEY_VALUE_RE = re.compile(r"(?:[^\s]+=.+?(?=\s+\w+=|$))", re.DOTALL)
+
 
 def _decode_escapes(s: str) -> str:
     def decode_match(match):
@@ -37,7 +40,10 @@ def parse_key_value(args: str) -> dict:
     if args is not None:
         splitted_args = split_args(args)
         for arg in splitted_args:
-            arg = _decode_escapes(arg).split("=")
+            # Most items have no escape sequence to decode
+            if "\\" in arg:
+                arg = _decode_escapes(arg)
+            arg = arg.split("=", 1)
             key, value = arg[0], arg[1]
 
             # unquote the value if necessary
@@ -69,4 +75,4 @@ def split_args(args: str) -> list:
 
     # the list of params parsed out of the arg string
     # this is going to be the result value when we are done
-    return [p for p in re.findall(r"(?:[^\s]+=.+?(?=\s+\w+=|$))", args, re.DOTALL)]
+    return _KEY_VALUE_RE.findall(args)
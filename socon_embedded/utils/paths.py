@@ -0,0 +1,142 @@
+import os
+import re
+
+from pathlib import PurePath
+from typing import (
+    Any,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+T = TypeVar("T")
+
+# Characters that start a glob pattern in a path part
+GLOB_CHARS = re.compile(r"[*?\[]")
+
+
+def glob_to_regex(pattern: str) -> re.Pattern:
+    """
+    Translate a '/' separated glob pattern into a regex. '*' and '?' do not
+    match a '/', '**' matches any number of directories. A pattern that
+    matches a directory also matches everything under it.
+    """
+    output = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            output.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            output.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            output.append("[^/]*")
+        elif c == "?":
+            output.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                output.append(re.escape(c))
+            else:
+                content = pattern[i + 1 : end]
+                if content.startswith("!"):
+                    content = "^" + content[1:]
+                output.append(f"[{content}]")
+                i = end
+        else:
+            output.append(re.escape(c))
+        i += 1
+    return re.compile("".join(output) + "(?:/.*)?", re.DOTALL)
+
+
+def split_path(path: Union[str, os.PathLike]) -> Tuple[str, ...]:
+    """Split an absolute, normalized path in its parts"""
+    return PurePath(os.path.abspath(path)).parts
+
+
+class _Node:
+    __slots__ = ["children", "values"]
+
+    def __init__(self) -> None:
+        self.children: Dict[str, _Node] = {}
+
+        # Pattern applied to the rest of the path (None matches anything)
+        self.values: List[Tuple[Optional[re.Pattern], Any]] = []
+
+
+class PathTrie(Generic[T]):
+    """
+    Map glob patterns to values. Patterns are stored in a trie under their
+    static prefix (the parts before the first glob character) so that only
+    the patterns sharing a prefix with a path are evaluated on it.
+    """
+
+    def __init__(self) -> None:
+        self._root = _Node()
+
+    def insert(self, pattern: Union[str, os.PathLike], value: T) -> None:
+        """Add a pattern. Relative patterns start at the current directory"""
+        parts = split_path(pattern)
+        node = self._root
+        for index, part in enumerate(parts):
+            if GLOB_CHARS.search(part):
+                regex = glob_to_regex("/".join(parts[index:]))
+                node.values.append((regex, value))
+                return
+            node = node.children.setdefault(part, _Node())
+        node.values.append((None, value))
+
+    def match(self, path: Union[str, os.PathLike]) -> Set[T]:
+        """Return the values of every pattern matching the path or a parent of it"""
+        parts = split_path(path)
+        matches = set()
+        node = self._root
+        for index in range(len(parts) + 1):
+            for regex, value in node.values:
+                if regex is None or regex.fullmatch("/".join(parts[index:])):
+                    matches.add(value)
+            if index == len(parts):
+                break
+            node = node.children.get(parts[index])
+            if node is None:
+                break
+        return matches
+
+
+def find_files(patterns: Iterable[Union[str, os.PathLike]]) -> List[str]:
+    """
+    Return the files matching glob patterns, sorted. A pattern matching a
+    directory matches every file under it. Relative patterns start at the
+    current directory.
+    """
+    trie: PathTrie[bool] = PathTrie()
+    roots = set()
+    for pattern in patterns:
+        trie.insert(pattern, True)
+        parts = split_path(pattern)
+        for index, part in enumerate(parts):
+            if GLOB_CHARS.search(part):
+                parts = parts[:index]
+                break
+        roots.add(os.path.join(*parts))
+
+    files = set()
+    for root in roots:
+        if os.path.isfile(root):
+            files.add(root)
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                if trie.match(path):
+                    files.add(path)
+    return sorted(files)
@@ -0,0 +1,33 @@
+import os
+import subprocess
+
+from pathlib import Path
+from typing import List, Union
+
+
+def _git(args: List[str], cwd: Union[str, os.PathLike] = None) -> str:
+    """Run a git command and return its output"""
+    return subprocess.run(
+        ["git", *args],
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    ).stdout
+
+
+def get_changed_files(since: str, cwd: Union[str, os.PathLike] = None) -> List[Path]:
+    """
+    Return the absolute path of the files changed in the git checkout since a
+    revision. Uncommitted and untracked files are included. Renamed files are
+    returned with their old and new path. Raise a CalledProcessError if git
+    fails and FileNotFoundError if git is not installed.
+    """
+    root = Path(_git(["rev-parse", "--show-toplevel"], cwd).strip())
+    changed = _git(["diff", "--name-only", "--no-renames", "-z", since, "--"], cwd)
+    untracked = _git(
+        ["ls-files", "--others", "--exclude-standard", "--full-name", "-z"], cwd
+    )
+    paths = dict.fromkeys(filter(None, (changed + untracked).split("\0")))
+    return [root / path for path in paths]
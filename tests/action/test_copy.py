@@ -1,11 +1,12 @@
 from pathlib import Path
 
+from socon_embedded.action.copy import CopyAction
+from socon_embedded.executor.task_executor import TaskExecutor
 from socon_embedded.schema.task import Task
 from tests.action import BaseTestTask
 
 
 class TestCopyTask(BaseTestTask):
-
     def test_copy_file_to_a_folder(self, tmpdir):
         temp_d_1 = tmpdir.mkdir("sub_1").join("hello.txt")
         temp_d_1.write("content")
@@ -46,3 +47,125 @@ class TestCopyTask(BaseTestTask):
         result = self.run_with_task_executor(task)
         assert result["failed"] is False
         assert temp_d_1.read() == "Simple content"
+
+    def test_copy_skip_unchanged_files(self, tmpdir):
+        source = tmpdir.mkdir("sub_1")
+        source.join("a.txt").write("a" * 10)
+        source.mkdir("nested").join("b.txt").write("b" * 5)
+        destination = Path(tmpdir, "sub_2")
+        task = Task(
+            **{
+                "name": "Copy folder to a folder",
+                "copy": {"src": str(source), "dest": str(destination)},
+            }
+        )
+        result = self.run_with_task_executor(task)
+        assert result["changed"] is True
+        assert result["files_copied"] == 2
+        assert result["bytes_copied"] == 15
+        assert Path(destination, "nested", "b.txt").read_text() == "b" * 5
+
+        # Nothing to copy the second time
+        result = self.run_with_task_executor(task)
+        assert result["changed"] is False
+        assert result["files_skipped"] == 2
+
+        # Only the modified file is copied
+        source.join("a.txt").write("c" * 3)
+        result = self.run_with_task_executor(task)
+        assert result["files_copied"] == 1
+        assert result["bytes_copied"] == 3
+        assert Path(destination, "a.txt").read_text() == "ccc"
+
+    def test_copy_with_checksum(self, tmpdir):
+        source = tmpdir.mkdir("sub_1").join("hello.txt")
+        source.write("content")
+        destination = tmpdir.mkdir("sub_2").join("hello.txt")
+        destination.write("content")
+        task = Task(
+            **{
+                "name": "Copy file with checksum",
+                "copy": {
+                    "src": str(source),
+                    "dest": str(destination),
+                    "checksum": True,
+                },
+            }
+        )
+        result = self.run_with_task_executor(task)
+        assert result["changed"] is False
+
+    def test_copy_content_is_atomic_and_incremental(self, tmpdir):
+        destination = tmpdir.mkdir("sub_1").join("hello.txt")
+        task = Task(
+            **{
+                "name": "Copy content to a file",
+                "copy": {"content": "Simple content", "dest": str(destination)},
+            }
+        )
+        result = self.run_with_task_executor(task)
+        assert result["changed"] is True
+        assert result["bytes_copied"] == 14
+
+        # The content is already there and no temporary file was left behind
+        result = self.run_with_task_executor(task)
+        assert result["changed"] is False
+        assert [p.basename for p in tmpdir.join("sub_1").listdir()] == ["hello.txt"]
+
+    def test_copy_templated_content(self, tmpdir):
+        destination = tmpdir.mkdir("sub_1").join("hello.txt")
+        task = Task(
+            **{
+                "name": "Copy templated content to a file",
+                "copy": {"content": "board={{ board }}", "dest": str(destination)},
+            }
+        )
+        result = TaskExecutor(task, {"board": "nrf52"}).run()
+        assert result["failed"] is False
+        assert destination.read() == "board=nrf52"
+
+    def test_copy_batch_same_source(self, tmpdir):
+        source = tmpdir.mkdir("sub_1").join("hello.txt")
+        source.write("content")
+        destinations = [tmpdir.mkdir(f"dest_{i}") for i in range(5)]
+        actions = [
+            Task(
+                **{"name": "Copy", "copy": {"src": str(source), "dest": str(dest)}}
+            ).action
+            for dest in destinations
+        ]
+        results = CopyAction.run_batch(actions)
+        assert [result["bytes_copied"] for result in results] == [7] * 5
+        assert all(dest.join("hello.txt").read() == "content" for dest in destinations)
+
+        # Second batch does not write anything
+        results = CopyAction.run_batch(actions)
+        assert [result["changed"] for result in results] == [False] * 5
+
+    def test_copy_batch_stops_at_the_first_failure(self, tmpdir):
+        actions = [
+            Task(**{"name": "Copy", "copy": {"content": "a", "dest": str(dest)}}).action
+            for dest in [
+                tmpdir.join("a.txt"),
+                tmpdir.join("missing", "b.txt"),
+                tmpdir.join("c.txt"),
+            ]
+        ]
+        results = CopyAction.run_batch(actions)
+        assert [result["failed"] for result in results] == [False, True]
+        assert not tmpdir.join("c.txt").exists()
+
+    def test_can_batch_with(self, tmpdir):
+        def action(src, dest):
+            task = {"name": "Copy", "copy": {"src": str(src), "dest": str(dest)}}
+            return Task(**task).action
+
+        src, dest = tmpdir.join("src"), tmpdir.join("dest")
+        tree = [action(src, dest)]
+        assert action(src, tmpdir.join("other")).can_batch_with(tree)
+
+        # Copies writing in the destination or the source of the tree, or
+        # reading its destination
+        assert not action(tmpdir.join("a.h"), dest.join("a.h")).can_batch_with(tree)
+        assert not action(tmpdir.join("a.h"), src).can_batch_with(tree)
+        assert not action(dest, tmpdir.join("out")).can_batch_with(tree)
@@ -0,0 +1,54 @@
+import errno
+import os
+
+from pathlib import Path
+from unittest import mock
+
+from socon_embedded.schema.task import Task
+from tests.action import BaseTestTask
+
+
+class TestMoveTask(BaseTestTask):
+    def _move_task(self, src, dest) -> Task:
+        return Task(**{"name": "Move", "move": {"src": str(src), "dest": str(dest)}})
+
+    def test_move_file_to_a_folder(self, tmpdir):
+        source = tmpdir.mkdir("sub_1").join("hello.txt")
+        source.write("content")
+        destination = tmpdir.mkdir("sub_2")
+        result = self.run_with_task_executor(self._move_task(source, destination))
+        assert result["failed"] is False
+        assert result["changed"] is True
+        assert result["bytes_moved"] == 7
+        assert Path(destination, "hello.txt").read_text() == "content"
+        assert Path(source).exists() is False
+
+    def test_move_folder_to_a_new_folder(self, tmpdir):
+        source = tmpdir.mkdir("sub_1")
+        source.mkdir("nested").join("content.txt").write("content")
+        destination = Path(tmpdir, "sub_2")
+        result = self.run_with_task_executor(self._move_task(source, destination))
+        assert result["failed"] is False
+        assert Path(destination, "nested", "content.txt").exists() is True
+        assert Path(source).exists() is False
+
+    def test_move_missing_source(self, tmpdir):
+        task = self._move_task(Path(tmpdir, "missing"), Path(tmpdir, "dest"))
+        result = self.run_with_task_executor(task)
+        assert result["failed"] is True
+
+    def test_move_across_devices(self, tmpdir):
+        source = tmpdir.mkdir("sub_1")
+        source.join("a.txt").write("a" * 10)
+        source.mkdir("nested").join("b.txt").write("b" * 5)
+        destination = Path(tmpdir, "sub_2")
+
+        cross_device = OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+        with mock.patch("os.replace", side_effect=cross_device):
+            task = self._move_task(source, destination)
+            result = self.run_with_task_executor(task)
+
+        assert result["failed"] is False
+        assert result["bytes_moved"] == 15
+        assert Path(destination, "nested", "b.txt").read_text() == "b" * 5
+        assert Path(source).exists() is False
@@ -0,0 +1,115 @@
+"""
+Minimal benchmark harness. The benchmarks only run with the --bench option:
+
+    pytest tests/benchmarks --bench --bench-json results.json
+
+Each benchmark records the duration of every round, the throughput (items
+processed per second, based on the median duration) and the peak memory
+allocated by Python during an extra traced round.
+"""
+import json
+import statistics
+import time
+import tracemalloc
+
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, List
+
+import pytest
+
+# Results of the benchmarks executed in this session
+RESULTS: List["BenchmarkResult"] = []
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    items: int
+    times: List[float] = field(default_factory=list)
+    peak_memory: int = 0
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.times)
+
+    @property
+    def throughput(self) -> float:
+        """Items per second"""
+        return self.items / self.median if self.median else float("inf")
+
+    def to_dict(self) -> dict:
+        return {
+            **asdict(self),
+            "median": self.median,
+            "min": min(self.times),
+            "throughput": self.throughput,
+        }
+
+
+class Benchmark:
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __call__(
+        self,
+        func: Callable,
+        *args: Any,
+        items: int = 1,
+        rounds: int = 5,
+        setup: Callable[[], None] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Run func once to warm up, then rounds times. setup is called before
+        each run, out of the measured time. Return the result of the last run.
+        """
+        result = BenchmarkResult(self.name, items)
+
+        def run() -> Any:
+            if setup is not None:
+                setup()
+            started = time.perf_counter()
+            value = func(*args, **kwargs)
+            return value, time.perf_counter() - started
+
+        run()
+        for _ in range(rounds):
+            value, duration = run()
+            result.times.append(duration)
+
+        # Trace the memory in a separate round as tracing slows down the code
+        tracemalloc.start()
+        try:
+            run()
+            _, result.peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        RESULTS.append(result)
+        return value
+
+
+@pytest.fixture
+def benchmark(request) -> Benchmark:
+    if not request.config.getoption("bench"):
+        pytest.skip("benchmarks only run with the --bench option")
+    return Benchmark(request.node.name)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not RESULTS:
+        return
+    terminalreporter.section("benchmarks")
+    terminalreporter.line(
+        f"{'name':<50} {'median (ms)':>12} {'items/s':>12} {'peak (KiB)':>12}"
+    )
+    for result in RESULTS:
+        terminalreporter.line(
+            f"{result.name:<50} {result.median * 1000:>12.2f} "
+            f"{result.throughput:>12.0f} {result.peak_memory / 1024:>12.0f}"
+        )
+
+    output = config.getoption("bench_json")
+    if output:
+        with open(output, "w") as f:
+            json.dump([result.to_dict() for result in RESULTS], f, indent=2)
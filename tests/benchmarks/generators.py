@@ -0,0 +1,98 @@
+"""Synthetic application registries used by the benchmarks"""
+import itertools
+
+from pathlib import Path
+from typing import Dict, Union
+
+import yaml
+
+# Builders of the test project used by the generated registries
+BUILDERS = ["echo", "noisy", "python"]
+
+
+def generate_tasks(count: int, dest: Union[str, Path], prefix: str) -> list[dict]:
+    """Create tasks writing a small templated file"""
+    return [
+        {
+            "name": f"{prefix} task {i}",
+            "copy": {
+                "content": "{{ app }} " + f"{prefix} {i}",
+                "dest": str(Path(dest, f"{prefix}_{i}.txt")),
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def generate_registry(
+    apps: int = 100,
+    builders: int = 2,
+    variant_matrix: Dict[str, int] = {"mode": 2, "cpu": 2},
+    variants: int = 0,
+    tasks: int = 0,
+    groups: int = 10,
+    dest: Union[str, Path] = ".",
+) -> dict:
+    """
+    Return the data of a registry with apps applications of builders
+    builders each. Every builder gets a variant args matrix (key: number of
+    values) and every application gets variants referencing its first
+    builder. tasks tasks are added to the registry, each application and
+    each builder.
+    """
+    if builders > len(BUILDERS):
+        raise ValueError(f"At most {len(BUILDERS)} builders per application")
+
+    variant_args = {
+        key: [f"{key}{i}" for i in range(count)]
+        for key, count in variant_matrix.items()
+    }
+    data = {
+        "name": "benchmark",
+        "tasks": generate_tasks(tasks, dest, "registry"),
+        "apps": [],
+    }
+    for i in range(apps):
+        app = {
+            "name": f"app{i}",
+            "group": [f"group{i % groups}", "all"],
+            "inputs": [f"src/app{i}/**"],
+            "tasks": generate_tasks(tasks, dest, f"app{i}"),
+            "builders": [
+                {
+                    "name": name,
+                    "project_file": f"src/app{i}/{name}.prj",
+                    "variant_args": variant_args,
+                    "tasks": generate_tasks(tasks, dest, f"app{i}_{name}"),
+                }
+                for name in BUILDERS[:builders]
+            ],
+            "variants": [
+                {
+                    "name": f"v{j}",
+                    "builders": [{"ref": BUILDERS[0], "raw_args": [f"-DV{j}"]}],
+                }
+                for j in range(variants)
+            ],
+        }
+        data["apps"].append(app)
+    return data
+
+
+def count_build_configs(data: dict) -> int:
+    """Number of build configurations of a generated registry"""
+    count = 0
+    for app in data["apps"]:
+        for builder in app["builders"]:
+            values = builder["variant_args"].values()
+            count += len(list(itertools.product(*values)))
+
+        # Variant builders do not define variant args
+        count += len(app["variants"])
+    return count
+
+
+def write_registry(data: dict, path: Union[str, Path]) -> Path:
+    path = Path(path)
+    path.write_text(yaml.safe_dump(data, sort_keys=False))
+    return path
@@ -0,0 +1,55 @@
+import os
+import shutil
+import sys
+
+from unittest import mock
+
+import pytest
+
+from socon_embedded.executor.task_executor import TaskPlayer
+from socon_embedded.schema.task import Task
+
+from projects.test_project.builder import EchoBuilder, NoisyBuilder
+
+from .generators import generate_tasks
+
+
+@mock.patch.dict(os.environ, {"SOCON_ACTIVE_PROJECT": "test_project"})
+class TestExecutionBenchmarks:
+    @pytest.mark.parametrize("count", [10, 100])
+    def test_task_player(self, benchmark, tmp_path, count):
+        tasks = [Task(**task) for task in generate_tasks(count, tmp_path, "bench")]
+
+        def setup():
+            shutil.rmtree(tmp_path)
+            tmp_path.mkdir()
+
+        benchmark(TaskPlayer({"app": "bench"}).run, tasks, items=count, setup=setup)
+
+    def test_execute_overhead(self, benchmark):
+        """Cost of spawning a build that writes nothing"""
+        builder = NoisyBuilder()
+        cmdline = [sys.executable, "-c", "pass"]
+        status_code, _ = benchmark(builder._execute, cmdline, rounds=10)
+        assert status_code == 0
+
+    def test_execute_shell(self, benchmark):
+        builder = EchoBuilder()
+        benchmark(builder._execute, ["echo", "build"], rounds=10)
+
+    @pytest.mark.parametrize("lines", [1000, 100000])
+    def test_execute_noisy_output(self, benchmark, lines):
+        """Lines of output read per second"""
+        builder = NoisyBuilder()
+        builder.lines = lines
+        cmdline = builder.get_cmdline("main.c")
+        _, output = benchmark(builder._execute, cmdline, items=lines, rounds=3)
+        assert output.count("\n") == lines
+
+    @pytest.mark.parametrize("lines", [1000, 100000])
+    def test_execute_noisy_output_with_timeout(self, benchmark, lines):
+        """Same as above, reading the output from a thread"""
+        builder = NoisyBuilder()
+        builder.lines = lines
+        cmdline = builder.get_cmdline("main.c")
+        benchmark(builder._execute, cmdline, timeout=60, items=lines, rounds=3)
@@ -0,0 +1,72 @@
+import os
+
+from unittest import mock
+
+import pytest
+
+from socon_embedded.schema.apps import AppRegistry
+
+from .generators import count_build_configs, generate_registry, write_registry
+
+SIZES = {
+    "small": {"apps": 50, "builders": 2, "variant_matrix": {"mode": 2, "cpu": 2}},
+    "large": {"apps": 500, "builders": 3, "variant_matrix": {"mode": 3, "cpu": 4}},
+}
+
+
+@pytest.fixture(params=list(SIZES))
+def registry_data(request, tmp_path) -> dict:
+    return generate_registry(**SIZES[request.param], variants=2, tasks=1, dest=tmp_path)
+
+
+@mock.patch.dict(os.environ, {"SOCON_ACTIVE_PROJECT": "test_project"})
+class TestRegistryBenchmarks:
+    def test_load(self, benchmark, registry_data, tmp_path):
+        path = write_registry(registry_data, tmp_path / "registry.yml")
+        registry = benchmark(AppRegistry.load, path, items=len(registry_data["apps"]))
+        assert len(registry.apps) == len(registry_data["apps"])
+
+    def test_load_with_context(self, benchmark, registry_data, tmp_path):
+        path = write_registry(registry_data, tmp_path / "registry.yml")
+        benchmark(
+            AppRegistry.load,
+            path,
+            {"app": "bench"},
+            items=len(registry_data["apps"]),
+        )
+
+    def test_filter(self, benchmark, registry_data):
+        registry = AppRegistry(**registry_data)
+        filtered = benchmark(
+            registry.filter,
+            {"group__in": ["group1"]},
+            {"name": "app1"},
+            items=len(registry.apps),
+        )
+        assert "app1" not in [app.name for app in filtered.apps]
+
+    def test_index_query(self, benchmark, registry_data):
+        registry = AppRegistry(**registry_data)
+        selection = benchmark(
+            lambda: registry.get_index(refresh=True).query(
+                {"group__in": ["group1"]},
+                {"name": "app1"},
+                {"variant_args__mode": "mode0"},
+            ),
+            items=count_build_configs(registry_data),
+        )
+        assert selection is not None
+
+    def test_get_build_configs(self, benchmark, registry_data):
+        registry = AppRegistry(**registry_data)
+
+        def expand():
+            return [
+                build_config
+                for app in registry.apps
+                for build_config in app.get_build_configs()
+            ]
+
+        items = count_build_configs(registry_data)
+        build_configs = benchmark(expand, items=items, rounds=3)
+        assert len(build_configs) == items
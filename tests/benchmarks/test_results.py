@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+from socon_embedded.builder import BuildInfo
+from socon_embedded.builder.result import BuildResult, Result, ResultTable, Status
+
+
+def generate_results(count: int) -> list[BuildResult]:
+    """Results of count builds of a 3 builders x 4 modes matrix"""
+    results = []
+    for i in range(count):
+        builder = ["gcc", "clang", "iar"][i % 3]
+        mode = ["debug", "release", "size", "speed"][i // 3 % 4]
+        status = Status.FAILURE if i % 50 == 0 else Status.PASS
+        result = BuildResult(Result(status, "No error(s) found"))
+        result.build_info = BuildInfo(
+            f"app{i // 12}", builder, f"src/app{i // 12}.prj", {"mode": mode}
+        )
+        result.execution_time = 1.0
+        results.append(result)
+    return results
+
+
+class TestResultsBenchmarks:
+    @pytest.mark.parametrize("count", [10000, 50000])
+    def test_create_table(self, benchmark, count):
+        results = generate_results(count)
+        table = benchmark(ResultTable, results, items=count, rounds=3)
+        assert len(table) == count
+
+    @pytest.mark.parametrize("count", [10000, 50000])
+    def test_failures_by_builder(self, benchmark, count):
+        table = ResultTable(generate_results(count))
+        failures = benchmark(table.count_by, "builder", "FAIL", items=count)
+        assert sum(failures.values()) == len(range(0, count, 50))
+
+    @pytest.mark.parametrize("count", [10000, 50000])
+    def test_serialize_table(self, benchmark, count):
+        table = ResultTable(generate_results(count))
+        benchmark(lambda: json.dumps(table.to_dict()), items=count, rounds=3)
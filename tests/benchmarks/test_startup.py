@@ -0,0 +1,21 @@
+from tests.commands import show_help
+
+# Time budget in seconds for importing every socon_embedded module
+SOCON_EMBEDDED_IMPORT_BUDGET = 0.25
+
+
+def get_import_time(stderr: str, prefix: str) -> float:
+    """Sum the -X importtime lines: "import time: self [us] | cumulative | name" """
+    total = 0
+    for line in stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip().startswith(prefix):
+            total += int(fields[0].split(":")[1])
+    return total / 1e6
+
+
+class TestStartupBenchmarks:
+    def test_help(self, benchmark):
+        _, stderr = benchmark(show_help, "-X", "importtime", rounds=3)
+        import_time = get_import_time(stderr, "socon_embedded")
+        assert import_time < SOCON_EMBEDDED_IMPORT_BUDGET
@@ -0,0 +1,150 @@
+import gzip
+import os
+import time
+
+from pathlib import Path
+
+import pytest
+
+from socon_embedded.builder.result import Status
+from socon_embedded.utils.cancel import CancellationToken
+
+from projects.test_project.builder import PythonBuilder
+
+
+def is_running(pid: int, timeout: float = 5) -> bool:
+    """Wait for a process killed by the builder to exit"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+class TestBuilderTimeout:
+    def _build(self, tmpdir, code: str, **kwargs):
+        builder = PythonBuilder()
+        return builder.build("app", code, output_file=Path(tmpdir, "app.log"), **kwargs)
+
+    def test_build_without_timeout(self, tmpdir):
+        result = self._build(tmpdir, "print('hello')")
+        assert result.result.status_code == Status.PASS
+        assert result.output == "hello\n"
+
+    def test_build_timeout_kills_the_build(self, tmpdir):
+        started = time.monotonic()
+        result = self._build(tmpdir, "import time; time.sleep(30)", timeout=0.5)
+        assert time.monotonic() - started < 10
+        assert result.is_fail is True
+        assert "timed out after 0.5s" in result.result.message
+
+    def test_build_stall_timeout(self, tmpdir):
+        code = "import time; print('start'); time.sleep(30)"
+        result = self._build(tmpdir, code, stall_timeout=0.5)
+        assert result.is_fail is True
+        assert "no output for 0.5s" in result.result.message
+        assert result.output == "start\n"
+        assert Path(tmpdir, "app.log").read_text() == "start\n"
+
+    @pytest.mark.skipif(os.name == "nt", reason="process groups are POSIX only")
+    def test_stall_timeout_kills_the_children_of_an_exited_build(self, tmpdir):
+        # The build exits but its child still holds the output
+        code = (
+            "import subprocess, sys\n"
+            "child = subprocess.Popen([sys.executable, '-c', 'import time; "
+            "time.sleep(30)'])\n"
+            "print(child.pid)"
+        )
+        result = self._build(tmpdir, code, stall_timeout=0.5)
+        assert "no output for 0.5s" in result.result.message
+        child = int(result.output.splitlines()[0])
+        assert not is_running(child), "The child process is still running"
+
+    def test_stall_timeout_reset_by_output(self, tmpdir):
+        code = "import time\nfor _ in range(4):\n    print('tick'); time.sleep(0.2)"
+        result = self._build(tmpdir, code, stall_timeout=1)
+        assert result.result.status_code == Status.PASS
+
+    def test_builder_class_timeout(self, tmpdir):
+        builder = PythonBuilder()
+        builder.timeout = 0.5
+        result = builder.build(
+            "app", "import time; time.sleep(30)", output_file=Path(tmpdir, "app.log")
+        )
+        assert result.is_fail is True
+
+
+class TestBuilderCancellation:
+    def _build(self, tmpdir, code: str, cancel_token: CancellationToken, **kwargs):
+        def cancel_on_output(text: str) -> None:
+            if text.startswith("started"):
+                cancel_token.cancel("Stopped by the test")
+
+        builder = PythonBuilder()
+        return builder.build(
+            "app",
+            code,
+            output_file=Path(tmpdir, "app.log"),
+            on_output=cancel_on_output,
+            cancel_token=cancel_token,
+            **kwargs,
+        )
+
+    def test_cancel_kills_the_build(self, tmpdir):
+        started = time.monotonic()
+        code = "import time; print('started'); time.sleep(30)"
+        result = self._build(tmpdir, code, CancellationToken())
+        assert time.monotonic() - started < 10
+        assert result.is_skipped is True
+        assert "Stopped by the test" in result.result.message
+        assert result.output == "started\n"
+
+    @pytest.mark.skipif(os.name == "nt", reason="process groups are POSIX only")
+    def test_cancel_kills_the_process_group(self, tmpdir):
+        code = (
+            "import subprocess, sys, time\n"
+            "child = subprocess.Popen([sys.executable, '-c', 'import time; "
+            "time.sleep(30)'])\n"
+            "print(child.pid); print('started'); time.sleep(30)"
+        )
+        result = self._build(tmpdir, code, CancellationToken())
+        child = int(result.output.splitlines()[0])
+        assert not is_running(child), "The child process is still running"
+
+    def test_cancelled_before_the_build(self, tmpdir):
+        token = CancellationToken()
+        token.cancel("Stopped before")
+        result = self._build(tmpdir, "print('hello')", token)
+        assert result.is_skipped is True
+        assert result.output == ""
+
+
+class TestBuilderFailureExcerpt:
+    def test_failure_excerpt(self, tmpdir):
+        code = (
+            "import sys\n"
+            "for i in range(100): print(f'step {i}')\n"
+            "print('main.c:1: error: broken')\n"
+            "sys.exit(1)"
+        )
+        output_file = Path(tmpdir, "app.log")
+        result = PythonBuilder().build("app", code, output_file=output_file)
+        assert result.is_fail is True
+        assert result.result.text.startswith("step 97\nstep 98\nstep 99\nmain.c:1:")
+        assert result.result.text.endswith(f"Full log: {output_file}")
+        assert "step 0" not in result.result.text
+
+    def test_passing_build_has_no_excerpt(self, tmpdir):
+        result = PythonBuilder().build(
+            "app", "print('error: ignored')", output_file=Path(tmpdir, "app.log")
+        )
+        assert result.result.text is None
+
+    def test_compressed_log(self, tmpdir):
+        output_file = Path(tmpdir, "app.log.gz")
+        PythonBuilder().build("app", "print('hello')", output_file=output_file)
+        with gzip.open(output_file, "rt") as f:
+            assert f.read() == "hello\n"
@@ -0,0 +1,59 @@
+import os
+
+from pathlib import Path
+from unittest import mock
+
+from socon_embedded.builder.environment import BuildEnvironment, join_paths
+
+from projects.test_project.builder import PythonBuilder
+
+
+class TestBuildEnvironment:
+    def test_join_paths_deduplicates(self):
+        a, b, c = "/a", "/b", "/c"
+        assert join_paths(os.pathsep.join([a, b, a]), b, c) == os.pathsep.join(
+            [a, b, c]
+        )
+
+    def test_layers_are_immutable(self):
+        base = BuildEnvironment({"PATH": "/bin", "FOO": "foo"})
+        project = base.extend([("PATH", "/opt/bin"), ("LIB", "/opt/lib")])
+        build = project.update({"FOO": "bar"})
+
+        assert dict(base) == {"PATH": "/bin", "FOO": "foo"}
+        assert project["PATH"] == os.pathsep.join(["/bin", "/opt/bin"])
+        assert project["LIB"] == "/opt/lib"
+        assert build["FOO"] == "bar"
+        assert project.update({}) is project
+
+    def test_extend_twice_does_not_duplicate_paths(self):
+        entries = [("PATH", "/opt/bin")]
+        env = BuildEnvironment({"PATH": "/bin"}).extend(entries).extend(entries)
+        assert env["PATH"] == os.pathsep.join(["/bin", "/opt/bin"])
+
+    def test_from_os_is_a_snapshot(self):
+        with mock.patch.dict(os.environ, {"SOCON_ENV_TEST": "1"}):
+            env = BuildEnvironment.from_os()
+        assert env["SOCON_ENV_TEST"] == "1"
+        assert "SOCON_ENV_TEST" not in os.environ
+
+    def test_builder_environment(self, tmpdir):
+        class EnvBuilder(PythonBuilder, abstract=True):
+            environment_variables = {"SOCON_BUILDER": "builder"}
+
+        builder = EnvBuilder()
+        builder.environment = builder.get_environment(
+            BuildEnvironment.from_os().extend([("SOCON_PROJECT", "project")])
+        )
+        code = (
+            "import os; print(os.environ['SOCON_PROJECT'], "
+            "os.environ['SOCON_BUILDER'], os.environ['SOCON_BUILD'])"
+        )
+        result = builder.build(
+            "app",
+            code,
+            output_file=Path(tmpdir, "app.log"),
+            env={"SOCON_BUILD": "build"},
+        )
+        assert result.output == "project builder build\n"
+        assert "SOCON_BUILD" not in builder.environment
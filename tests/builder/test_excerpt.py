@@ -0,0 +1,59 @@
+from socon_embedded.builder.excerpt import FailureExcerpt, extract_excerpt
+
+OUTPUT = """\
+compiling main.c
+compiling util.c
+main.c: In function 'main':
+main.c:12:5: error: 'x' undeclared
+   12 |     x = 1;
+      |     ^
+compiling other.c
+compiling more.c
+compiling again.c
+main.c:40:5: error: 'x' undeclared
+compiling last.c
+ld: undefined reference to `foo'
+collect2: linker returned 1 exit status
+"""
+
+
+class TestFailureExcerpt:
+    def test_error_blocks(self):
+        excerpt = extract_excerpt(OUTPUT, context=2)
+        assert excerpt == (
+            "compiling util.c\n"
+            "main.c: In function 'main':\n"
+            "main.c:12:5: error: 'x' undeclared\n"
+            "   12 |     x = 1;\n"
+            "      |     ^\n"
+            "...\n"
+            "main.c:40:5: error: 'x' undeclared\n"
+            "compiling last.c\n"
+            "ld: undefined reference to `foo'\n"
+            "collect2: linker returned 1 exit status\n"
+            "... 1 more error line(s) (1 duplicate(s))"
+        )
+
+    def test_max_blocks(self):
+        excerpt = FailureExcerpt(max_blocks=1, context=0)
+        excerpt.feed("error: first\nerror: second\nerror: third\n")
+        assert excerpt.text() == (
+            "error: first\n... 2 more error line(s) (0 duplicate(s))"
+        )
+
+    def test_errors_in_context_extend_the_block(self):
+        excerpt = FailureExcerpt(context=1)
+        excerpt.feed("a\nerror: one\nerror: two\nb\nc\n")
+        assert excerpt.blocks == [["a", "error: one", "error: two", "b"]]
+
+    def test_tail_without_error(self):
+        excerpt = FailureExcerpt(tail=2)
+        for i in range(1000):
+            excerpt.feed(f"line {i}\n")
+        assert excerpt.text() == "line 998\nline 999"
+        assert excerpt.lines == 1000
+
+    def test_long_lines_are_truncated(self):
+        excerpt = FailureExcerpt(max_line_length=10)
+        excerpt.feed("error: " + "x" * 100)
+        assert excerpt.text() == "error: xxx..."
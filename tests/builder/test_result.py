@@ -0,0 +1,97 @@
+import json
+import sys
+
+import pytest
+
+from socon_embedded.builder import BuildInfo
+from socon_embedded.builder.result import BuildResult, Result, ResultTable, Status
+
+
+def build_result(app, builder, mode, status=Status.PASS, text=None) -> BuildResult:
+    result = BuildResult(Result(status, f"status {status}", text))
+    result.build_info = BuildInfo(
+        app, builder, f"{app}.prj", {"mode": mode}, [builder, f"{app}.prj"]
+    )
+    result.execution_time = 2.5
+    return result
+
+
+RESULTS = [
+    build_result("foo", "gcc", "debug"),
+    build_result("foo", "gcc", "release", Status.FAILURE, "error: x"),
+    build_result("foo", "clang", "debug", Status.FAILURE),
+    build_result("bar", "gcc", "debug", 2),
+    build_result("bar", "clang", "debug", Status.SKIPPED),
+]
+
+
+class TestBuildResult:
+    @pytest.mark.skipif(sys.version_info < (3, 10), reason="slots need 3.10")
+    def test_slots(self):
+        result = RESULTS[0]
+        for value in (result, result.result, result.build_info):
+            assert not hasattr(value, "__dict__")
+
+    def test_build_info_is_mutable(self):
+        build_info = BuildInfo("foo", "gcc", "main.c", {"mode": "debug"})
+        build_info.cmdline = ["gcc", "main.c"]
+        assert build_info == BuildInfo(
+            "foo", "gcc", "main.c", {"mode": "debug"}, ["gcc", "main.c"]
+        )
+        with pytest.raises(TypeError):
+            hash(build_info)
+
+    def test_interned_strings(self):
+        first = BuildInfo("".join(["f", "oo"]), "gcc", "main.c", {"mode": "debug"})
+        second = BuildInfo("".join(["fo", "o"]), "gcc", "main.c", {"mode": "debug"})
+        assert first.app is second.app
+        assert first.variant_args["mode"] is second.variant_args["mode"]
+
+
+class TestResultTable:
+    def test_get(self):
+        table = ResultTable(RESULTS)
+        assert len(table) == 5
+        for row, result in enumerate(RESULTS):
+            loaded = table.get(row)
+            assert loaded.build_info == result.build_info
+            assert loaded.result == result.result
+            assert loaded.execution_time == 2.5
+
+    def test_strings_are_stored_once(self):
+        table = ResultTable(RESULTS)
+        assert table.app.values == ["foo", "bar"]
+        assert table.variant_args.values == [
+            (("mode", "debug"),),
+            (("mode", "release"),),
+        ]
+
+    def test_queries(self):
+        table = ResultTable(RESULTS)
+        assert table.where("FAIL") == [1, 2, 3]
+        assert table.where("SKIPPED") == [4]
+        assert table.where("PASS") == [0]
+        assert table.where("FAIL", builder="gcc") == [1, 3]
+        assert table.where(variant_args={"mode": "release"}) == [1]
+        assert table.where(builder="icc") == []
+        assert table.count_by("builder", "FAIL") == {"gcc": 2, "clang": 1}
+        assert table.count_by("app") == {"foo": 3, "bar": 2}
+        assert [table.get_status_message(row) for row in range(5)] == [
+            "PASS",
+            "FAIL",
+            "FAIL",
+            "FAIL",
+            "SKIPPED",
+        ]
+
+    def test_serialization(self):
+        table = ResultTable(RESULTS)
+        loaded = ResultTable.from_dict(json.loads(json.dumps(table.to_dict())))
+        assert loaded.where("FAIL", builder="gcc") == [1, 3]
+        for row, result in enumerate(RESULTS):
+            assert loaded.get(row).build_info == result.build_info
+            assert loaded.get(row).result == result.result
+
+        # The table can still grow after being loaded
+        loaded.append(RESULTS[0])
+        assert loaded.where(app="foo", variant_args={"mode": "debug"}) == [0, 2, 5]
@@ -0,0 +1,67 @@
+import os
+import sys
+
+from pathlib import Path
+from unittest import mock
+
+from socon_embedded.builder.environment import BuildEnvironment
+from socon_embedded.builder.toolchain import resolve_toolchain
+
+from projects.test_project.builder import EchoBuilder, PythonBuilder
+
+
+class TestToolchain:
+    def test_resolve_with_version(self):
+        toolchain = resolve_toolchain(sys.executable, version_args=["--version"])
+        assert toolchain.is_available is True
+        assert toolchain.path is not None
+        assert toolchain.version.startswith("Python")
+
+    def test_failing_version_probe(self):
+        toolchain = resolve_toolchain(sys.executable, version_args=["-c", "exit(3)"])
+        assert toolchain.is_available is False
+        assert "exited with status code 3" in toolchain.error
+
+    def test_resolve_in_environment_path(self, tmp_path):
+        env = BuildEnvironment({"PATH": str(tmp_path)})
+        assert resolve_toolchain("socon-missing-cc", env).is_available is False
+
+        executable = tmp_path / "socon-missing-cc"
+        executable.write_text("#!/bin/sh\n")
+        executable.chmod(0o755)
+        toolchain = resolve_toolchain("socon-missing-cc", env)
+        assert toolchain.path == os.path.join(str(tmp_path), "socon-missing-cc")
+
+    def test_missing_toolchain_fails_without_spawning(self, tmpdir):
+        class MissingBuilder(PythonBuilder, abstract=True):
+            def get_executable(self) -> str:
+                return "socon-missing-cc"
+
+        builder = MissingBuilder()
+        with mock.patch(
+            "socon_embedded.builder.toolchain.shutil.which", return_value=None
+        ) as which, mock.patch("subprocess.Popen") as popen:
+            for app in ["a", "b", "c"]:
+                result = builder.build(app, "", output_file=Path(tmpdir, f"{app}.log"))
+                assert result.is_fail is True
+                assert "'socon-missing-cc' not found" in result.result.message
+
+        which.assert_called_once()
+        popen.assert_not_called()
+
+    def test_new_environment_resolves_again(self, tmp_path):
+        class MissingBuilder(PythonBuilder, abstract=True):
+            def get_executable(self) -> str:
+                return "socon-missing-cc"
+
+        executable = tmp_path / "socon-missing-cc"
+        executable.write_text("#!/bin/sh\n")
+        executable.chmod(0o755)
+
+        builder = MissingBuilder()
+        assert builder.resolve_toolchain().is_available is False
+        builder.environment = BuildEnvironment({"PATH": str(tmp_path)})
+        assert builder.resolve_toolchain().is_available is True
+
+    def test_shell_builders_are_not_resolved(self):
+        assert EchoBuilder().resolve_toolchain() is None
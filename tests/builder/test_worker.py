@@ -0,0 +1,53 @@
+from pathlib import Path
+
+import pytest
+
+from projects.test_project.builder import PythonWorkerBuilder
+
+
+class TestPersistentWorker:
+    @pytest.fixture
+    def builder(self):
+        builder = PythonWorkerBuilder()
+        yield builder
+        builder.close()
+
+    def _build(self, builder, tmpdir, project_file="project", **kwargs):
+        return builder.build(
+            "app", project_file, output_file=Path(tmpdir, "app.log"), **kwargs
+        )
+
+    def _pid(self, result) -> str:
+        return result.output.splitlines()[0]
+
+    def test_worker_is_reused(self, builder, tmpdir):
+        first = self._build(builder, tmpdir, variant_args={"mode": "debug"})
+        second = self._build(builder, tmpdir, variant_args={"mode": "release"})
+        assert first.is_fail is False
+        assert first.output.splitlines()[1:] == ["project", "debug"]
+        assert self._pid(first) == self._pid(second)
+
+    def test_worker_status_code(self, builder, tmpdir):
+        result = self._build(builder, tmpdir, "fail")
+        assert result.is_fail is True
+
+    def test_worker_recycled_after_max_builds(self, builder, tmpdir):
+        results = [self._build(builder, tmpdir) for _ in range(4)]
+        pids = [self._pid(result) for result in results]
+        assert len(set(pids[:3])) == 1
+        assert pids[3] != pids[0]
+
+    def test_dead_worker_is_restarted(self, builder, tmpdir):
+        first = self._build(builder, tmpdir)
+        builder._worker.kill()
+        second = self._build(builder, tmpdir)
+        assert second.is_fail is False
+        assert self._pid(first) != self._pid(second)
+
+    def test_worker_timeout(self, builder, tmpdir):
+        result = self._build(builder, tmpdir, "sleep", timeout=0.5)
+        assert result.is_fail is True
+        assert "timed out" in result.result.message
+
+        # The worker was killed and is restarted for the next build
+        assert self._build(builder, tmpdir).is_fail is False
@@ -0,0 +1,46 @@
+import json
+import subprocess
+import sys
+
+from pathlib import Path
+
+TESTS_DIR = Path(__file__).resolve().parents[1]
+
+HELP_SCRIPT = """
+import contextlib, io, json, sys
+sys.path[:0] = {paths!r}
+
+from socon.conf import global_settings, settings
+
+settings.configure(
+    default_settings=global_settings,
+    INSTALLED_PLUGINS=("socon_embedded",),
+    INSTALLED_PROJECTS=("projects.test_project",),
+)
+
+import socon
+from socon.core.management import call_command
+
+socon.setup()
+with contextlib.redirect_stdout(io.StringIO()):
+    try:
+        call_command("build", "fromfile", "--help")
+    except SystemExit:
+        pass
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+def show_help(*python_options: str) -> tuple[list[str], str]:
+    """
+    Display the help of the fromfile command in a new interpreter. Return
+    the modules it imported and its standard error.
+    """
+    script = HELP_SCRIPT.format(paths=[str(TESTS_DIR), str(TESTS_DIR.parent)])
+    process = subprocess.run(
+        [sys.executable, *python_options, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(process.stdout.splitlines()[-1]), process.stderr
@@ -1,4 +1,15 @@
+import json
+import os
+import sys
+import threading
+
+from unittest import mock
+
+import pytest
+
 from socon.core.management import call_command
+from socon.core.management.base import CommandError
+from socon.utils.terminal import terminal
 
 
 class TestFromFileCommand:
@@ -14,3 +25,440 @@ class TestFromFileCommand:
             "--artifact-dir",
             tmp,
         )
+
+    def test_plan_from_file(self, tmpdir, datafix_dir, capsys, monkeypatch):
+        # The terminal keeps the stream it got at import time
+        monkeypatch.setattr(terminal, "_stream", sys.stdout)
+        tmp = tmpdir.mkdir("artifact")
+        args = [
+            "build",
+            "fromfile",
+            "--file",
+            f"{datafix_dir}/simple_app_config.yml",
+            "--project",
+            "test_project",
+            "--artifact-dir",
+            tmp,
+        ]
+
+        # Build once to get a history of the builds duration
+        call_command(*args)
+        capsys.readouterr()
+
+        call_command(*args, "--plan", "json", "--filter", "name=foo")
+        plan = json.loads(capsys.readouterr().out)
+        assert plan["count"] == 2
+        assert plan["count_by_builder"] == {"echo": 2}
+        assert plan["unknown_durations"] == 0
+        assert [build["case_name"] for build in plan["builds"]] == [
+            "foo - echo - release",
+            "foo - echo - debug",
+        ]
+        assert plan["builds"][0]["cmdline"] == ["echo", "Test"]
+
+    def test_plan_changed_files(self, tmpdir, datafix_dir, capsys, monkeypatch):
+        monkeypatch.setattr(terminal, "_stream", sys.stdout)
+        args = [
+            "build",
+            "fromfile",
+            "--file",
+            f"{datafix_dir}/inputs_app_config.yml",
+            "--project",
+            "test_project",
+            "--artifact-dir",
+            tmpdir,
+            "--plan",
+            "json",
+        ]
+
+        def planned_apps(*changed_files):
+            call_command(*args, "--changed-files", " ".join(changed_files))
+            plan = json.loads(capsys.readouterr().out)
+            return [build["app"] for build in plan["builds"]]
+
+        assert planned_apps("src/foo/main.c") == ["foo"]
+        assert planned_apps("src/foo/sub/main.c") == []
+        assert planned_apps("src/bar/sub/main.c", "src/common/a/b.h") == ["foo", "bar"]
+
+        changes = tmpdir.join("changes.txt")
+        changes.write("src/bar/main.c\nREADME.md\n")
+        call_command(*args, "--changed-files", f"@{changes}")
+        plan = json.loads(capsys.readouterr().out)
+        assert [build["app"] for build in plan["builds"]] == ["bar"]
+
+    def test_build_nothing_changed(self, tmpdir, datafix_dir, capsys, monkeypatch):
+        monkeypatch.setattr(terminal, "_stream", sys.stdout)
+        call_command(
+            "build",
+            "fromfile",
+            "--file",
+            f"{datafix_dir}/inputs_app_config.yml",
+            "--project",
+            "test_project",
+            "--artifact-dir",
+            tmpdir,
+            "--changed-files",
+            "README.md",
+        )
+        assert "No application is affected" in capsys.readouterr().out
+
+    def test_build_with_progress(self, tmpdir, datafix_dir, capsys, monkeypatch):
+        monkeypatch.setattr(terminal, "_stream", sys.stdout)
+        call_command(
+            "build",
+            "fromfile",
+            "--file",
+            f"{datafix_dir}/simple_app_config.yml",
+            "--project",
+            "test_project",
+            "--artifact-dir",
+            tmpdir,
+            "--progress",
+        )
+        assert "Progress: 4/4 (100%)" in capsys.readouterr().out
+
+    def test_build_with_events_file(self, tmpdir, datafix_dir):
+        events_file = tmpdir.join("events.jsonl")
+        call_command(
+            "build",
+            "fromfile",
+            "--file",
+            f"{datafix_dir}/simple_app_config.yml",
+            "--project",
+            "test_project",
+            "--artifact-dir",
+            tmpdir,
+            "--events-file",
+            str(events_file),
+        )
+        events = [json.loads(line) for line in events_file.readlines()]
+        types = [event["type"] for event in events]
+        assert types[:3] == ["registry_loaded", "run_started", "config_expanded"]
+        assert types[-2:] == ["run_finished", "report_written"]
+        assert types.count("build_started") == 4
+        assert types.count("build_finished") == 4
+        assert "output_chunk" in types
+
+        timestamps = [event["timestamp"] for event in events]
+        assert timestamps == sorted(timestamps)
+
+        finished = [event for event in events if event["type"] == "build_finished"]
+        assert {event["status"] for event in finished} == {"PASS"}
+        assert events[-1]["tests"] == 4
+
+    def test_events_and_metrics_on_failure(self, tmpdir, datafix_dir):
+        from socon_embedded.executor.app_executor import AppRegistryExecutor
+
+        threads = set(threading.enumerate())
+        events_file = tmpdir.join("events.jsonl")
+        metrics_file = tmpdir.join("socon.prom")
+        with mock.patch.object(
+            AppRegistryExecutor, "build", side_effect=RuntimeError("Build error")
+        ):
+            with pytest.raises(RuntimeError, match="Build error"):
+                call_command(
+                    "build",
+                    "fromfile",
+                    "--file",
+                    f"{datafix_dir}/simple_app_config.yml",
+                    "--project",
+                    "test_project",
+                    "--artifact-dir",
+                    tmpdir,
+                    "--events-file",
+                    str(events_file),
+                    "--metrics-file",
+                    str(metrics_file),
+                    "--metrics-port",
+                    "0",
+                )
+        events = [json.loads(line) for line in events_file.readlines()]
+        assert [event["type"] for event in events] == ["registry_loaded"]
+        assert "# TYPE socon_builds_total counter" in metrics_file.read()
+
+        # The event bus and the metrics server are stopped
+        assert set(threading.enumerate()) <= threads
+
+    def test_build_with_metrics_file(self, tmpdir, datafix_dir):
+        metrics_file = tmpdir.join("socon.prom")
+        call_command(
+            "build",
+            "fromfile",
+            "--file",
+            f"{datafix_dir}/simple_app_config.yml",
+            "--project",
+            "test_project",
+            "--artifact-dir",
+            tmpdir,
+            "--metrics-file",
+            str(metrics_file),
+        )
+        metrics = metrics_file.read()
+        assert 'socon_builds_total{builder="echo",status="PASS"} 4' in metrics
+        assert 'socon_build_duration_seconds_count{builder="echo"} 4' in metrics
+        assert "socon_builds_queued 0" in metrics
+
+    def test_task_workers(self, tmpdir, datafix_dir, monkeypatch):
+        from concurrent.futures import ThreadPoolExecutor
+
+        from socon_embedded.executor import task_executor
+
+        monkeypatch.chdir(tmpdir)
+        args = [
+            "build",
+            "fromfile",
+            "--file",
+            f"{datafix_dir}/parallel_tasks_app_config.yml",
+            "--project",
+            "test_project",
+            "--artifact-dir",
+            tmpdir,
+            "--task-workers",
+        ]
+        with mock.patch.object(
+            task_executor, "ThreadPoolExecutor", wraps=ThreadPoolExecutor
+        ) as pool:
+            call_command(*args, "1")
+        pool.assert_called_once_with(1)
+        assert tmpdir.join("second.txt").read() == "second"
+
+        with pytest.raises(CommandError, match="must be greater than 0"):
+            call_command(*args, "0")
+
+    def test_project_environment(self, tmpdir, datafix_dir, monkeypatch):
+        monkeypatch.chdir(tmpdir)
+        monkeypatch.delenv("SOCON_PROJECT_VARIABLE", raising=False)
+        call_command(
+            "build",
+            "fromfile",
+            "--file",
+            f"{datafix_dir}/env_task_app_config.yml",
+            "--project",
+            "test_project",
+            "--artifact-dir",
+            tmpdir.join("artifact"),
+        )
+        # The tasks and the builds see the project variables, which are not
+        # exported to the environment of the command
+        assert tmpdir.join("env.txt").read() == "project\n"
+        log = tmpdir.join(
+            "artifact", "Config file with an environment task", "python", "foo"
+        )
+        assert log.join("foo.log").read() == "project\n"
+        assert "SOCON_PROJECT_VARIABLE" not in os.environ
+
+    def test_resume(self, tmpdir, datafix_dir):
+        args = [
+            "build",
+            "fromfile",
+            "--file",
+            f"{datafix_dir}/simple_app_config.yml",
+            "--project",
+            "test_project",
+            "--artifact-dir",
+            tmpdir,
+        ]
+        call_command(*args)
+
+        # Simulate a run interrupted while writing the third configuration
+        journal = tmpdir.join("Simple config file", "journal.jsonl")
+        lines = journal.readlines()
+        assert len(lines) == 4
+        journal.write("".join(lines[:2]) + lines[2][:10])
+
+        events_file = tmpdir.join("events.jsonl")
+        call_command(*args, "--resume", "--events-file", str(events_file))
+        events = [json.loads(line) for line in events_file.readlines()]
+        started = [e["build"] for e in events if e["type"] == "build_started"]
+        assert started == ["bar - echo - release", "bar - echo - debug"]
+
+        report = [e for e in events if e["type"] == "report_written"][0]
+        assert report["tests"] == 4
+        assert len(journal.readlines()) == 5
+
+    def test_resume_two_builders(self, tmpdir, datafix_dir):
+        args = [
+            "build",
+            "fromfile",
+            "--file",
+            f"{datafix_dir}/two_builders_app_config.yml",
+            "--project",
+            "test_project",
+            "--artifact-dir",
+            tmpdir,
+        ]
+        call_command(*args)
+
+        # Each builder keeps its own result
+        events_file = tmpdir.join("events.jsonl")
+        call_command(*args, "--resume", "--events-file", str(events_file))
+        events = [json.loads(line) for line in events_file.readlines()]
+        finished = [e["build"] for e in events if e["type"] == "build_finished"]
+        assert finished == ["foo - echo", "foo - python"]
+        assert not [e for e in events if e["type"] == "build_started"]
+
+    def test_rerun_failed(self, tmpdir, datafix_dir):
+        previous = tmpdir.join("previous.xml")
+        previous.write(
+            '<testsuites><testsuite name="Simple config file">'
+            '<testcase name="foo - echo - release" time="1"/>'
+            '<testcase name="bar - echo - debug" time="1"><failure/></testcase>'
+            '<testcase name="removed - echo" time="1"><failure/></testcase>'
+            "</testsuite></testsuites>"
+        )
+        events_file = tmpdir.join("events.jsonl")
+        call_command(
+            "build",
+            "fromfile",
+            "--file",
+            f"{datafix_dir}/simple_app_config.yml",
+            "--project",
+            "test_project",
+            "--artifact-dir",
+            tmpdir,
+            "--rerun-failed",
+            str(previous),
+            "--events-file",
+            str(events_file),
+        )
+        events = [json.loads(line) for line in events_file.readlines()]
+        started = [e["build"] for e in events if e["type"] == "build_started"]
+        assert started == ["bar - echo - debug"]
+
+        # The rebuilt case replaces the failure, the other ones are kept
+        report = tmpdir.join("Simple config file", "results.xml").read()
+        assert report.count("<testcase") == 3
+        assert report.count("<failure") == 1
+        assert report.index("foo - echo - release") < report.index("bar - echo")
+
+    def test_exit_on_error_cancels_the_run(self, tmpdir, datafix_dir):
+        call_command(
+            "build",
+            "fromfile",
+            "--file",
+            f"{datafix_dir}/fail_fast_app_config.yml",
+            "--project",
+            "test_project",
+            "--artifact-dir",
+            tmpdir,
+            "--extras-vars",
+            f"dest={tmpdir}",
+            "--exit-on-error",
+        )
+
+        # No task is started after the failure
+        assert not tmpdir.join("broken.txt").exists()
+        assert not tmpdir.join("never.txt").exists()
+
+        # The remaining configurations are still in the report
+        report = tmpdir.join("Fail fast", "results.xml").read()
+        assert report.count("<testcase") == 3
+        assert report.count("<failure") == 1
+        assert report.count("<skipped") == 2
+
+    def test_failure_excerpt_in_report(self, tmpdir, datafix_dir):
+        call_command(
+            "build",
+            "fromfile",
+            "--file",
+            f"{datafix_dir}/fail_fast_app_config.yml",
+            "--project",
+            "test_project",
+            "--artifact-dir",
+            tmpdir,
+            "--extras-vars",
+            f"dest={tmpdir}",
+            "--app",
+            "broken",
+            "--compress-logs",
+        )
+        report = tmpdir.join("Fail fast", "results.xml").read()
+        assert '<failure message="Error(s) found while building">' in report
+        assert "Full log:" in report
+        assert tmpdir.join("Fail fast", "python", "broken", "broken.log.gz").exists()
+
+    def test_invalid_filter(self, tmpdir, datafix_dir):
+        with pytest.raises(CommandError, match="'title' is not a field"):
+            call_command(
+                "build",
+                "fromfile",
+                "--file",
+                f"{datafix_dir}/simple_app_config.yml",
+                "--project",
+                "test_project",
+                "--artifact-dir",
+                tmpdir,
+                "--filter",
+                "builders__title=echo",
+            )
+
+    def test_build_cache(self, tmpdir, datafix_dir, capsys, monkeypatch):
+        from socon_embedded.executor.cache import CacheServer, LocalCacheBackend
+
+        monkeypatch.setattr(terminal, "_stream", sys.stdout)
+        monkeypatch.chdir(tmpdir)
+        tmpdir.join("src", "foo", "main.c").write("int main() {}", ensure=True)
+        tmpdir.join("src", "bar", "main.c").write("int main() {}", ensure=True)
+
+        server = CacheServer(LocalCacheBackend(tmpdir.join("cache"))).start()
+        args = [
+            "build",
+            "fromfile",
+            "--file",
+            f"{datafix_dir}/inputs_app_config.yml",
+            "--project",
+            "test_project",
+            "--artifact-dir",
+            tmpdir.join("artifact"),
+            "--build-cache",
+            server.url,
+        ]
+        try:
+            call_command(*args)
+            assert "0 hit(s), 2 miss(es), 2 upload(s)" in capsys.readouterr().out
+
+            # The artifacts are restored instead of being built
+            log = tmpdir.join("artifact", "Config file with inputs", "echo", "foo")
+            log.remove()
+            call_command(*args)
+            out = capsys.readouterr().out
+            assert "Restored from the build cache" in out
+            assert "2 hit(s), 0 miss(es), 0 upload(s)" in out
+            assert log.join("foo.log").exists()
+
+            # Only the configuration using the changed file is built again
+            tmpdir.join("src", "foo", "main.c").write("int main() { return 1; }")
+            call_command(*args)
+            assert "1 hit(s), 1 miss(es), 1 upload(s)" in capsys.readouterr().out
+        finally:
+            server.close()
+
+    def test_build_cache_two_builders(self, tmpdir, datafix_dir, capsys, monkeypatch):
+        monkeypatch.setattr(terminal, "_stream", sys.stdout)
+        monkeypatch.chdir(tmpdir)
+        tmpdir.join("src", "main.c").write("int main() {}", ensure=True)
+
+        args = [
+            "build",
+            "fromfile",
+            "--file",
+            f"{datafix_dir}/inputs_two_builders_app_config.yml",
+            "--project",
+            "test_project",
+            "--artifact-dir",
+            tmpdir.join("artifact"),
+            "--build-cache",
+            tmpdir.join("cache"),
+        ]
+        call_command(*args)
+        assert "0 hit(s), 2 miss(es), 2 upload(s)" in capsys.readouterr().out
+
+        # Each builder restores its own artifacts
+        artifact = tmpdir.join("artifact", "Two builders with inputs")
+        artifact.remove()
+        call_command(*args)
+        assert "2 hit(s), 0 miss(es), 0 upload(s)" in capsys.readouterr().out
+        echo_log = artifact.join("echo", "foo", "foo.log").read()
+        python_log = artifact.join("python", "foo", "foo.log").read()
+        assert "foo" not in echo_log
+        assert "foo" in python_log
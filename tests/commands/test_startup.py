@@ -0,0 +1,30 @@
+import pytest
+
+from tests.commands import show_help
+
+# Modules that must not be imported to display the help of a command
+HEAVY_MODULES = [
+    "datalookup",
+    "jinja2",
+    "junitparser",
+    "pydantic",
+    "yaml",
+    "socon_embedded.builder",
+    "socon_embedded.executor.app_executor",
+    "socon_embedded.schema.apps",
+]
+
+
+@pytest.fixture(scope="module")
+def modules():
+    """Modules imported to display the help of the fromfile command"""
+    return show_help()[0]
+
+
+class TestStartup:
+    @pytest.mark.parametrize("module", HEAVY_MODULES)
+    def test_help_does_not_import_heavy_modules(self, modules, module):
+        assert module not in modules
+
+    def test_help_imports_the_command(self, modules):
+        assert "socon_embedded.management.commands.subcommands.from_file" in modules
@@ -13,3 +13,16 @@ def pytest_configure(config):
     )
 
     socon.setup()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmarks")
+    group.addoption(
+        "--bench",
+        action="store_true",
+        help="Run the benchmarks of tests/benchmarks",
+    )
+    group.addoption(
+        "--bench-json",
+        help="Save the benchmark results in a JSON file",
+    )
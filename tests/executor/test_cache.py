@@ -0,0 +1,197 @@
+import hashlib
+import os
+import urllib.error
+import urllib.request
+
+from unittest import mock
+
+import pytest
+
+from socon_embedded.builder import BuildInfo
+from socon_embedded.builder.toolchain import Toolchain
+from socon_embedded.builder.result import BuildResult, Result, Status
+from socon_embedded.executor.cache import (
+    AC,
+    CAS,
+    BuildCache,
+    CacheServer,
+    HttpCacheBackend,
+    LocalCacheBackend,
+    create_cache_backend,
+)
+from socon_embedded.schema.apps import AppBuilder, BuildConfig
+
+
+def build_result(status: int = Status.PASS) -> BuildResult:
+    result = BuildResult(Result(status, "message"), output="output")
+    result.build_info = BuildInfo("foo", "echo", "main.c", {"mode": "debug"})
+    result.execution_time = 12.0
+    return result
+
+
+def build_config(builder: str = "echo") -> BuildConfig:
+    builder = AppBuilder(name=builder, project_file="main.c")
+    return BuildConfig(app="foo", builder=builder)
+
+
+def digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = CacheServer(LocalCacheBackend(tmp_path / "server")).start()
+    yield server
+    server.close()
+
+
+class TestCacheBackends:
+    def test_local_backend(self, tmp_path):
+        backend = LocalCacheBackend(tmp_path)
+        key = digest(b"content")
+        assert backend.get(CAS, key) is None
+        assert not backend.contains(CAS, key)
+
+        backend.put(CAS, key, b"content")
+        assert backend.get(CAS, key) == b"content"
+        assert backend.contains(CAS, key)
+        assert (tmp_path / CAS / key[:2] / key).is_file()
+
+    def test_http_backend(self, server):
+        backend = HttpCacheBackend(server.url)
+        key = digest(b"content")
+        assert backend.get(AC, key) is None
+        assert not backend.contains(AC, key)
+
+        backend.put(AC, key, b"result")
+        backend.put(CAS, key, b"content")
+        assert backend.get(AC, key) == b"result"
+        assert backend.contains(CAS, key)
+
+    def test_server_checks_the_content(self, server):
+        backend = HttpCacheBackend(server.url)
+        with pytest.raises(urllib.error.HTTPError) as e:
+            backend.put(CAS, digest(b"content"), b"other content")
+        assert e.value.code == 400
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(f"{server.url}/ac/../key")
+        assert e.value.code == 400
+
+    def test_create_cache_backend(self, tmp_path):
+        assert isinstance(create_cache_backend(tmp_path), LocalCacheBackend)
+        backend = create_cache_backend("http://localhost:8080/cache/")
+        assert isinstance(backend, HttpCacheBackend)
+        assert backend.url == "http://localhost:8080/cache"
+
+
+@mock.patch.dict(os.environ, {"SOCON_ACTIVE_PROJECT": "test_project"})
+class TestBuildCache:
+    def test_get_key(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        cache = BuildCache(LocalCacheBackend("cache"))
+        source = tmp_path / "src" / "main.c"
+        source.parent.mkdir()
+        source.write_text("int main() {}")
+
+        # Configurations without inputs are not cached
+        assert cache.get_key(build_config(), []) is None
+
+        key = cache.get_key(build_config(), ["src"], warning_as_error=False)
+        assert key == cache.get_key(build_config(), ["src"], warning_as_error=False)
+        assert key != cache.get_key(build_config(), ["src"], warning_as_error=True)
+
+        # The digests of the inputs are computed once per run
+        source.write_text("int main() { return 1; }")
+        assert key == cache.get_key(build_config(), ["src"], warning_as_error=False)
+        other_run = BuildCache(LocalCacheBackend("cache"))
+        assert key != other_run.get_key(build_config(), ["src"], warning_as_error=False)
+
+    def test_key_of_the_builder(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        cache = BuildCache(LocalCacheBackend("cache"))
+        (tmp_path / "main.c").write_text("int main() {}")
+
+        # The same application and inputs built by two builders
+        key = cache.get_key(build_config("echo"), ["main.c"])
+        assert key != cache.get_key(build_config("python"), ["main.c"])
+
+        # The same builder with two toolchains
+        gcc = Toolchain("gcc", path="/usr/bin/gcc", version="gcc 12.2.0")
+        key = cache.get_key(build_config(), ["main.c"], toolchain=gcc)
+        assert key != cache.get_key(build_config(), ["main.c"])
+        assert key != cache.get_key(
+            build_config(),
+            ["main.c"],
+            toolchain=Toolchain("gcc", path="/usr/bin/gcc", version="gcc 13.1.0"),
+        )
+        assert key != cache.get_key(
+            build_config(),
+            ["main.c"],
+            toolchain=Toolchain("gcc", path="/opt/bin/gcc", version="gcc 12.2.0"),
+        )
+
+    def test_store_and_fetch(self, tmp_path):
+        cache = BuildCache(LocalCacheBackend(tmp_path / "cache"))
+        artifact = tmp_path / "artifact"
+        (artifact / "bin").mkdir(parents=True)
+        (artifact / "foo.log").write_text("build log")
+        (artifact / "bin" / "foo.elf").write_bytes(b"\x7fELF")
+
+        key = digest(b"key")
+        assert cache.fetch(key, tmp_path / "restored") is None
+        cache.store(key, build_result(), artifact)
+        assert cache.uploads == 1
+
+        result = cache.fetch(key, tmp_path / "restored")
+        assert result.result == Result(Status.PASS, "message")
+        assert result.output is None
+        assert result.execution_time < 12.0
+        assert (tmp_path / "restored" / "foo.log").read_text() == "build log"
+        assert (tmp_path / "restored" / "bin" / "foo.elf").read_bytes() == b"\x7fELF"
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_failures_are_not_stored(self, tmp_path):
+        backend = LocalCacheBackend(tmp_path / "cache")
+        cache = BuildCache(backend)
+        key = digest(b"key")
+        cache.store(key, build_result(Status.FAILURE), tmp_path)
+        cache.store(key, build_result(Status.SKIPPED), tmp_path)
+        assert not backend.contains(AC, key)
+
+        BuildCache(backend, upload=False).store(key, build_result(), tmp_path)
+        assert not backend.contains(AC, key)
+
+    def test_missing_file_is_a_miss(self, tmp_path):
+        backend = LocalCacheBackend(tmp_path / "cache")
+        cache = BuildCache(backend)
+        artifact = tmp_path / "artifact"
+        artifact.mkdir()
+        (artifact / "foo.log").write_text("build log")
+        key = digest(b"key")
+        cache.store(key, build_result(), artifact)
+
+        os.unlink(backend._get_path(CAS, digest(b"build log")))
+        assert cache.fetch(key, tmp_path / "restored") is None
+        assert not (tmp_path / "restored" / "foo.log").exists()
+
+    def test_invalid_entry(self, tmp_path):
+        backend = LocalCacheBackend(tmp_path / "cache")
+        key = digest(b"key")
+        backend.put(CAS, digest(b"x"), b"x")
+        backend.put(
+            AC,
+            key,
+            b'{"result": {"result": {}}, "files": {"../evil": "%s"}}'
+            % digest(b"x").encode(),
+        )
+        assert BuildCache(backend).fetch(key, tmp_path / "artifact") is None
+        assert not (tmp_path / "evil").exists()
+
+    def test_unreachable_cache(self, tmp_path, server):
+        url = server.url
+        server.close()
+        cache = BuildCache(HttpCacheBackend(url, timeout=1))
+        key = digest(b"key")
+        assert cache.fetch(key, tmp_path) is None
+        cache.store(key, build_result(), tmp_path)
+        assert cache.uploads == 0
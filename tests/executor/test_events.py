@@ -0,0 +1,164 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+
+import pytest
+
+from socon_embedded.executor.events import (
+    CallbackSink,
+    Event,
+    EventBus,
+    EventSink,
+    JsonLinesSink,
+    OutputChunker,
+    SocketSink,
+)
+
+
+class TestEventBus:
+    def test_no_sink(self):
+        bus = EventBus()
+        assert not bus.active
+        bus.emit("build_started", build="foo")
+        assert bus._queue.qsize() == 0
+        bus.close()
+
+    def test_delivery_order(self):
+        events = []
+        bus = EventBus([CallbackSink(events.append)])
+        assert bus.active
+        for i in range(100):
+            bus.emit("output_chunk", build="foo", text=str(i))
+        bus.flush()
+        assert [event.data["text"] for event in events] == [str(i) for i in range(100)]
+        timestamps = [event.timestamp for event in events]
+        assert timestamps == sorted(timestamps)
+        bus.close()
+
+    def test_subscribe_function_and_types(self):
+        everything = []
+        builds = []
+        bus = EventBus()
+        bus.subscribe(everything.append)
+        bus.subscribe(CallbackSink(builds.append, types=["build_finished"]))
+        bus.emit("build_started", build="foo")
+        bus.emit("build_finished", build="foo", status="PASS", duration=1.0)
+        bus.flush()
+        assert [event.type for event in everything] == [
+            "build_started",
+            "build_finished",
+        ]
+        assert [event.data for event in builds] == [
+            {"build": "foo", "status": "PASS", "duration": 1.0}
+        ]
+        bus.close()
+
+    def test_unsubscribe_closes_the_sink(self):
+        class Sink(EventSink):
+            def __init__(self) -> None:
+                self.events = []
+                self.closed = False
+
+            def handle(self, event: Event) -> None:
+                self.events.append(event)
+
+            def close(self) -> None:
+                self.closed = True
+
+        sink = Sink()
+        bus = EventBus([sink])
+        bus.emit("run_started", registry="reg", apps=1)
+        bus.unsubscribe(sink)
+        assert sink.closed
+        assert len(sink.events) == 1
+        assert not bus.active
+        bus.close()
+
+    def test_failing_sink_does_not_stop_the_bus(self):
+        def fail(event):
+            raise RuntimeError("broken sink")
+
+        events = []
+        bus = EventBus([CallbackSink(fail), CallbackSink(events.append)])
+        bus.emit("run_started", registry="reg", apps=1)
+        bus.emit("run_finished", registry="reg", builds=0, failures=0)
+        bus.flush()
+        assert len(events) == 2
+        bus.close()
+
+    def test_dropped_events(self):
+        release = threading.Event()
+        bus = EventBus([CallbackSink(lambda event: release.wait())], max_events=2)
+        for i in range(10):
+            bus.emit("output_chunk", build="foo", text=str(i))
+        release.set()
+        bus.flush()
+        # One event is being handled, two are queued
+        assert bus.dropped >= 7
+        bus.close()
+
+
+class TestSinks:
+    def test_json_lines(self, tmpdir):
+        path = tmpdir.join("events.jsonl")
+        bus = EventBus([JsonLinesSink(path)])
+        bus.emit("build_started", build="foo", variant_args={"mode": "debug"})
+        bus.close()
+
+        lines = path.readlines()
+        assert len(lines) == 1
+        event = json.loads(lines[0])
+        assert event["type"] == "build_started"
+        assert event["variant_args"] == {"mode": "debug"}
+        assert isinstance(event["timestamp"], float)
+
+    @pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="no unix socket")
+    def test_socket(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            address = os.path.join(tmp, "events.sock")
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(address)
+            server.listen(1)
+            received = []
+
+            def serve():
+                connection, _ = server.accept()
+                with connection, connection.makefile("r") as stream:
+                    received.extend(json.loads(line) for line in stream)
+
+            thread = threading.Thread(target=serve)
+            thread.start()
+
+            bus = EventBus([SocketSink(address)])
+            bus.emit("run_started", registry="reg", apps=2)
+            bus.emit("run_finished", registry="reg", builds=2, failures=0)
+            bus.close()
+            thread.join()
+            server.close()
+
+        assert [event["type"] for event in received] == [
+            "run_started",
+            "run_finished",
+        ]
+
+
+class TestOutputChunker:
+    def test_size(self):
+        chunks = []
+        chunker = OutputChunker(chunks.append, max_size=10, max_delay=60)
+        for _ in range(5):
+            chunker.write("line\n")
+        assert chunks == ["line\nline\n", "line\nline\n"]
+        chunker.flush()
+        assert chunks[-1] == "line\n"
+        chunker.flush()
+        assert len(chunks) == 3
+
+    def test_delay(self):
+        chunks = []
+        chunker = OutputChunker(chunks.append, max_delay=0)
+        chunker.write("a\n")
+        chunker.write("b\n")
+        assert chunks == ["a\n", "b\n"]
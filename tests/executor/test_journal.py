@@ -0,0 +1,82 @@
+from socon_embedded.builder import BuildInfo
+from socon_embedded.builder.result import BuildResult, Result, Status
+from socon_embedded.executor.journal import BuildJournal, fingerprint
+from socon_embedded.schema.apps import AppBuilder, BuildConfig
+
+
+def build_result(app: str, status: int = Status.PASS) -> BuildResult:
+    result = BuildResult(Result(status, "message", "text"), output="output")
+    result.build_info = BuildInfo(app, "echo", "main.c", {"mode": "debug"})
+    result.execution_time = 1.5
+    return result
+
+
+class TestBuildJournal:
+    def test_result_to_dict(self):
+        result = build_result("foo", Status.FAILURE)
+        loaded = BuildResult.from_dict(result.to_dict())
+        assert loaded.result == result.result
+        assert loaded.output == "output"
+        assert loaded.build_info == result.build_info
+        assert loaded.execution_time == 1.5
+        assert loaded.is_fail
+
+    def test_record_and_load(self, tmp_path):
+        journal = BuildJournal(tmp_path / "journal.jsonl").open()
+        journal.record("a", build_result("foo"))
+        journal.record("b", build_result("bar", Status.FAILURE))
+        journal.close()
+
+        results = BuildJournal(tmp_path / "journal.jsonl").load()
+        assert list(results) == ["a", "b"]
+        assert results["b"].is_fail
+        assert results["a"].build_info.app == "foo"
+
+        # The build output is not kept in the journal
+        assert results["a"].output is None
+
+    def test_truncated_line(self, tmp_path):
+        path = tmp_path / "journal.jsonl"
+        journal = BuildJournal(path).open()
+        journal.record("a", build_result("foo"))
+        journal.record("b", build_result("bar"))
+        journal.close()
+        path.write_text(path.read_text()[:-20])
+
+        assert list(BuildJournal(path).load()) == ["a"]
+
+    def test_open_truncates_unless_resume(self, tmp_path):
+        path = tmp_path / "journal.jsonl"
+        journal = BuildJournal(path).open()
+        journal.record("a", build_result("foo"))
+        journal.close()
+
+        journal.open(resume=True)
+        journal.record("b", build_result("bar"))
+        journal.close()
+        assert list(journal.load()) == ["a", "b"]
+
+        journal.open()
+        journal.close()
+        assert journal.load() == {}
+
+    def test_missing_journal(self, tmp_path):
+        assert BuildJournal(tmp_path / "journal.jsonl").load() == {}
+
+    def test_fingerprint(self):
+        def config(**kwargs) -> BuildConfig:
+            builder = AppBuilder(name="echo", project_file="main.c", **kwargs)
+            return BuildConfig(app="foo", builder=builder)
+
+        assert fingerprint(config()) == fingerprint(config())
+        assert fingerprint(config()) != fingerprint(config(raw_args=["-O2"]))
+        assert fingerprint(config()) != fingerprint(config(), warning_as_error=True)
+
+        # Builders of the same application with the same project file
+        python = BuildConfig(
+            app="foo", builder=AppBuilder(name="python", project_file="main.c")
+        )
+        assert fingerprint(config()) != fingerprint(python)
+        assert fingerprint(config()) != fingerprint(
+            BuildConfig(app="bar", builder=config().builder)
+        )
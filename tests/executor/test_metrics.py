@@ -0,0 +1,106 @@
+import urllib.request
+
+from socon_embedded.executor.events import Event
+from socon_embedded.executor.metrics import (
+    BuildMetrics,
+    Counter,
+    Histogram,
+    MetricsRegistry,
+    MetricsServer,
+)
+
+
+class TestMetrics:
+    def test_counter(self):
+        counter = Counter("builds_total", "Builds", ["status"])
+        counter.inc(status="PASS")
+        counter.inc(2, status="PASS")
+        counter.inc(status="FAIL")
+        assert counter.get(status="PASS") == 3
+        assert counter.render() == [
+            "# HELP builds_total Builds",
+            "# TYPE builds_total counter",
+            'builds_total{status="FAIL"} 1',
+            'builds_total{status="PASS"} 3',
+        ]
+
+    def test_histogram(self):
+        histogram = Histogram("duration_seconds", "Duration", buckets=(1, 10))
+        for value in (0.5, 2, 20):
+            histogram.observe(value)
+        assert histogram.render()[2:] == [
+            'duration_seconds_bucket{le="1"} 1',
+            'duration_seconds_bucket{le="10"} 2',
+            'duration_seconds_bucket{le="+Inf"} 3',
+            "duration_seconds_sum 22.5",
+            "duration_seconds_count 3",
+        ]
+
+    def test_label_escaping(self):
+        counter = Counter("c", "C", ["name"])
+        counter.inc(name='a "b"\n')
+        assert counter.render()[-1] == 'c{name="a \\"b\\"\\n"} 1'
+
+    def test_write_textfile(self, tmpdir):
+        registry = MetricsRegistry()
+        registry.gauge("queued", "Queued builds").set(3)
+        path = registry.write_textfile(tmpdir.join("metrics", "socon.prom"))
+        assert path.read_text() == (
+            "# HELP queued Queued builds\n# TYPE queued gauge\nqueued 3\n"
+        )
+        assert [p.name for p in path.parent.iterdir()] == ["socon.prom"]
+
+
+class TestBuildMetrics:
+    def test_events(self):
+        metrics = BuildMetrics()
+        events = [
+            Event("config_expanded", {"app": "foo", "builds": ["a", "b"]}, 0),
+            Event("task_started", {"task": "t", "action": "copy"}, 0),
+            Event(
+                "task_finished",
+                {"task": "t", "action": "copy", "failed": False, "changed": True},
+                0.25,
+            ),
+            Event("build_started", {"build": "a", "builder": "echo"}, 1),
+            Event("output_chunk", {"build": "a", "text": "héllo\n"}, 2),
+        ]
+        for event in events:
+            metrics.handle(event)
+        assert metrics.running.get() == 1
+        assert metrics.queued.get() == 2
+
+        for event in [
+            Event(
+                "build_finished",
+                {"build": "a", "builder": "echo", "status": "FAIL", "duration": 3},
+            ),
+            Event(
+                "build_finished",
+                {"build": "b", "builder": "echo", "status": "SKIPPED", "duration": 0},
+            ),
+        ]:
+            metrics.handle(event)
+
+        assert metrics.running.get() == 0
+        assert metrics.queued.get() == 0
+        assert metrics.builds.get(builder="echo", status="FAIL") == 1
+        assert metrics.builds.get(builder="echo", status="SKIPPED") == 1
+        assert metrics.build_duration.get(builder="echo") == 1
+        assert metrics.output_bytes.get(builder="echo") == 7
+        assert metrics.tasks.get(action="copy", status="ok") == 1
+        assert metrics.task_duration.get_sum(action="copy") == 0.25
+        assert 'socon_builds_total{builder="echo",status="FAIL"} 1' in metrics.render()
+
+    def test_server(self):
+        metrics = BuildMetrics()
+        metrics.builds.inc(builder="echo", status="PASS")
+        server = MetricsServer(metrics.registry).start()
+        try:
+            host, port = server.address
+            with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+                assert response.headers["Content-Type"].startswith("text/plain")
+                body = response.read().decode()
+        finally:
+            server.close()
+        assert 'socon_builds_total{builder="echo",status="PASS"} 1' in body
@@ -0,0 +1,88 @@
+from socon_embedded.executor.events import Event
+from socon_embedded.executor.progress import ProgressReporter, format_duration
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestProgressReporter:
+    def _reporter(self, interval: float = 10):
+        clock = FakeClock()
+        lines = []
+        reporter = ProgressReporter(interval, write=lines.append, clock=clock)
+        return reporter, clock, lines
+
+    def test_format_duration(self):
+        assert format_duration(5.5) == "5s"
+        assert format_duration(125) == "2m05s"
+        assert format_duration(7260) == "2h01m"
+
+    def test_progress_and_eta(self):
+        reporter, clock, _ = self._reporter()
+        reporter.start(apps=2)
+        reporter.app_queued(["a1", "a2"])
+        assert reporter.render() == "Progress: 0/~4 (0%)"
+
+        reporter.running("a1")
+        clock.now = 30
+        reporter.finished("a1", "PASS")
+        reporter.running("a2")
+        clock.now = 60
+        reporter.finished("a2", "FAIL")
+        reporter.app_queued(["b1", "b2", "b3", "b4"])
+        reporter.running("b1")
+        clock.now = 75
+
+        # 2 builds in 75s, 4 remaining
+        assert reporter.render() == (
+            "Progress: 2/6 (33%) | 1 failed | 1.6 builds/min | ETA 2m30s"
+            " | running: b1 (15s)"
+        )
+
+    def test_skipped_builds_do_not_count_in_throughput(self):
+        reporter, clock, _ = self._reporter()
+        reporter.start(apps=1)
+        reporter.app_queued(["a", "b"])
+        clock.now = 10
+        reporter.finished("a", "SKIPPED")
+        assert reporter.builds_per_minute(clock.now) is None
+        assert "1 skipped" in reporter.render()
+
+    def test_slowest_running_builds(self):
+        reporter, clock, _ = self._reporter()
+        reporter.slowest = 2
+        reporter.start(apps=1)
+        reporter.app_queued(["a", "b", "c"])
+        for build in ["a", "b", "c"]:
+            reporter.running(build)
+            clock.now += 10
+        assert reporter.render().endswith("running: a (30s), b (20s)")
+
+    def test_throttled_draw(self):
+        reporter, clock, lines = self._reporter(interval=10)
+        reporter.start(apps=1)
+        reporter.app_queued([str(i) for i in range(100)])
+        for i in range(100):
+            reporter.running(str(i))
+            clock.now += 0.5
+            reporter.finished(str(i), "PASS")
+        assert len(lines) == 5
+        reporter.close()
+        assert lines[-1].startswith("Progress: 100/100 (100%)")
+
+    def test_handle_events(self):
+        reporter, clock, _ = self._reporter()
+        reporter.handle(Event("run_started", {"registry": "reg", "apps": 1}))
+        reporter.handle(Event("config_expanded", {"app": "a", "builds": ["a1"]}))
+        reporter.handle(Event("build_started", {"build": "a1"}))
+        clock.now = 60
+        assert reporter.render() == "Progress: 0/1 (0%) | running: a1 (1m00s)"
+        reporter.handle(Event("build_finished", {"build": "a1", "status": "FAIL"}))
+        assert reporter.render() == (
+            "Progress: 1/1 (100%) | 1 failed | 1.0 builds/min | ETA 0s"
+        )
@@ -1,6 +1,189 @@
+import threading
+import time
+
+import pytest
+
+from pathlib import Path
+from unittest import mock
+
+from pydantic import ValidationError
+
+from socon_embedded.action.copy import CopyAction
+from socon_embedded.executor.task_executor import TaskExecutor, TaskPlayer
+from socon_embedded.schema.apps import AppConfig
+from socon_embedded.schema.task import Task
+
+
 class TestTaskExecutor:
     pass
 
 
 class TestTaskPlayer:
-    pass
+    def _copy_task(self, name: str, dest: Path, **kwargs) -> Task:
+        return Task(
+            **{"name": name, "copy": {"content": name, "dest": str(dest)}, **kwargs}
+        )
+
+    def test_batch_consecutive_tasks(self, tmpdir):
+        tasks = [
+            self._copy_task(f"copy {i}", Path(tmpdir, f"{i}.txt")) for i in range(3)
+        ]
+        with mock.patch.object(
+            CopyAction, "run_batch", wraps=CopyAction.run_batch
+        ) as run_batch:
+            TaskPlayer().run(tasks)
+        assert run_batch.call_count == 1
+        assert len(run_batch.call_args.args[0]) == 3
+        assert [Path(tmpdir, f"{i}.txt").read_text() for i in range(3)] == [
+            "copy 0",
+            "copy 1",
+            "copy 2",
+        ]
+
+    def test_tasks_with_retries_are_not_batched(self, tmpdir):
+        tasks = [
+            self._copy_task("copy 0", Path(tmpdir, "0.txt")),
+            self._copy_task("copy 1", Path(tmpdir, "1.txt"), retries=1),
+            self._copy_task("copy 2", Path(tmpdir, "2.txt")),
+        ]
+        batches = TaskPlayer._get_batches(tasks)
+        assert [len(batch) for batch in batches] == [1, 1, 1]
+
+    def test_batch_failure_cleanup_and_stop(self, tmpdir):
+        tasks = [
+            self._copy_task("copy 0", Path(tmpdir, "0.txt")),
+            self._copy_task("copy 1", Path(tmpdir, "missing", "1.txt")),
+            self._copy_task("copy 2", Path(tmpdir, "2.txt")),
+            Task(**{"name": "custom", "call_command": {"cmd": "unknown"}}),
+        ]
+        player = TaskPlayer()
+        with mock.patch.object(CopyAction, "cleanup", autospec=True) as cleanup:
+            player.run(tasks)
+        # The tasks that ran are cleaned once, the ones after the failure
+        # never ran
+        cleaned = [call.args[0] for call in cleanup.call_args_list]
+        assert cleaned == [tasks[1].action, tasks[0].action]
+        assert len(player._played_tasks) == 1
+        assert not Path(tmpdir, "2.txt").exists()
+
+    def test_dependent_copies_are_not_batched(self, tmpdir):
+        source = Path(tmpdir, "src")
+        source.mkdir()
+        Path(source, "main.c").write_text("int main() {}")
+        Path(source, "config.h").write_text("default")
+        Path(tmpdir, "config.h").write_text("overlay")
+        dest = Path(tmpdir, "dest")
+        tasks = [
+            Task(**{"name": "tree", "copy": {"src": str(source), "dest": str(dest)}}),
+            self._copy_task("other", Path(tmpdir, "other.txt")),
+            Task(
+                **{
+                    "name": "overlay",
+                    "copy": {
+                        "src": str(Path(tmpdir, "config.h")),
+                        "dest": str(Path(dest, "config.h")),
+                    },
+                }
+            ),
+        ]
+        assert [len(batch) for batch in TaskPlayer._get_batches(tasks)] == [2, 1]
+
+        TaskPlayer().run(tasks)
+        assert Path(dest, "config.h").read_text() == "overlay"
+        assert Path(dest, "main.c").read_text() == "int main() {}"
+
+    def test_header_before_single_task(self):
+        tasks = [Task(**{"name": "custom", "call_command": {"cmd": "unknown"}})]
+        player = TaskPlayer()
+        calls = []
+
+        def run(*args):
+            calls.append("run")
+            return {}
+
+        with mock.patch.object(
+            player, "_task_on_start", side_effect=lambda task: calls.append(task.name)
+        ), mock.patch.object(TaskExecutor, "run", run):
+            player.run(tasks)
+        assert calls == ["custom", "run"]
+
+
+class TestParallelTasks:
+    def _task(self, name: str, dest: Path, **kwargs) -> dict:
+        return {"name": name, "copy": {"content": name, "dest": str(dest)}, **kwargs}
+
+    def test_dependencies(self):
+        tasks = [
+            Task(**self._task("a", "a", parallel=True)),
+            Task(**self._task("b", "b", parallel=True)),
+            Task(**self._task("c", "c", depends_on="a")),
+            Task(**self._task("d", "d")),
+            Task(**self._task("e", "e", parallel=True)),
+        ]
+        assert TaskPlayer._get_dependencies(tasks) == [
+            set(),
+            set(),
+            {0},
+            {0, 1, 2},
+            {3},
+        ]
+
+    def test_depends_on_must_be_declared_before(self):
+        msg = "Task 'a' depends on 'b' which is not declared before it"
+        with pytest.raises(ValidationError, match=msg):
+            AppConfig(
+                name="foo",
+                tasks=[self._task("a", "a", depends_on="b"), self._task("b", "b")],
+            )
+
+    def test_run_parallel_tasks(self, tmpdir):
+        tasks = [
+            Task(**self._task(f"t{i}", Path(tmpdir, f"{i}.txt"), parallel=True))
+            for i in range(5)
+        ]
+        player = TaskPlayer(max_workers=3)
+        with mock.patch.object(player, "_task_on_start") as on_start:
+            player.run(tasks)
+        assert [call.args[0].name for call in on_start.call_args_list] == [
+            "t0",
+            "t1",
+            "t2",
+            "t3",
+            "t4",
+        ]
+        assert len(player._played_tasks) == 5
+        assert Path(tmpdir, "4.txt").read_text() == "t4"
+
+    def test_max_workers(self):
+        tasks = [
+            Task(**self._task(f"t{i}", f"{i}.txt", parallel=True)) for i in range(6)
+        ]
+        lock = threading.Lock()
+        running = []
+        peak = 0
+
+        def run(executor):
+            nonlocal peak
+            with lock:
+                running.append(executor)
+                peak = max(peak, len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(executor)
+            return {"failed": False}
+
+        with mock.patch.object(TaskExecutor, "run", run):
+            TaskPlayer(max_workers=2).run(tasks)
+        assert peak == 2
+
+    def test_parallel_failure_stops_dependent_tasks(self, tmpdir):
+        tasks = [
+            Task(**self._task("ok", Path(tmpdir, "ok.txt"), parallel=True)),
+            Task(**self._task("ko", Path(tmpdir, "no", "ko.txt"), parallel=True)),
+            Task(**self._task("after", Path(tmpdir, "after.txt"), depends_on="ko")),
+        ]
+        player = TaskPlayer()
+        with mock.patch.object(CopyAction, "cleanup") as cleanup:
+            player.run(tasks)
+        assert cleanup.call_count == 2
+        assert Path(tmpdir, "after.txt").exists() is False
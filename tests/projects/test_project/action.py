@@ -1,3 +1,8 @@
+import subprocess
+import sys
+
+from pathlib import Path
+
 from socon_embedded.action import ActionBase
 from pydantic import BaseModel
 
@@ -14,3 +19,27 @@ class CustomAction(ActionBase):
         result = super().run(tasks_vars)
         result["discoverd"] = True
         return result
+
+
+class EnvSchema(BaseModel):
+    variable: str
+    dest: str
+
+
+class EnvAction(ActionBase):
+    """Write the value of a variable in the environment of a subprocess"""
+
+    name = "print_env"
+    schema = EnvSchema
+
+    def run(self, tasks_vars=None):
+        result = super().run(tasks_vars)
+        code = f"import os; print(os.environ.get({self.args.variable!r}, ''))"
+        process = subprocess.run(
+            [sys.executable, "-c", code],
+            env=self.get_environment(),
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        Path(self.args.dest).write_text(process.stdout)
+        return result
@@ -1,3 +1,7 @@
+import sys
+
+from pathlib import Path
+
 from socon_embedded.builder import Builder
 
 
@@ -10,3 +14,57 @@ class EchoBuilder(Builder):
 
     def get_main_args(self, project_file, **variant_args) -> list[str]:
         return [project_file]
+
+
+class PythonBuilder(Builder):
+    """Run the python code given as project file"""
+
+    name = "python"
+
+    def get_executable(self) -> str:
+        return sys.executable
+
+    def get_main_args(self, project_file, **variant_args) -> list[str]:
+        return ["-u", "-c", project_file]
+
+
+class PythonWorkerBuilder(Builder):
+    """Send the builds to a persistent python worker"""
+
+    name = "python_worker"
+    persistent_worker = True
+    worker_max_builds = 3
+
+    def get_executable(self) -> str:
+        return sys.executable
+
+    def get_worker_command(self) -> list[str]:
+        worker = Path(__file__).with_name("worker.py")
+        return [self.executable, "-u", str(worker)]
+
+    def get_main_args(self, project_file, **variant_args) -> list[str]:
+        return [project_file, *variant_args.values()]
+
+
+# Fake compiler writing one warning per line, like a verbose toolchain
+NOISY_COMPILER = """
+import sys
+project_file, lines = sys.argv[1], int(sys.argv[2])
+for i in range(lines):
+    print(f"{project_file}:{i}: warning: unused variable 'x{i}' [-Wunused]")
+"""
+
+
+class NoisyBuilder(Builder):
+    """Compile nothing but write as much output as a real compiler"""
+
+    name = "noisy"
+
+    # Number of output lines of each build
+    lines = 100
+
+    def get_executable(self) -> str:
+        return sys.executable
+
+    def get_main_args(self, project_file, **variant_args) -> list[str]:
+        return ["-c", NOISY_COMPILER, project_file, str(self.lines)]
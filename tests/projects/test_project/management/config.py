@@ -1 +1,4 @@
 """Simple configuration file"""
+
+# Variables appended to the environment of the builds and tasks
+BUILD_ENVIRONMENT_VARIABLE = [("SOCON_PROJECT_VARIABLE", "project")]
@@ -0,0 +1,25 @@
+"""Persistent worker used by the PythonWorkerBuilder"""
+import os
+import sys
+
+from pathlib import Path
+
+# The worker is started as a script. Make socon_embedded importable
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from socon_embedded.builder.worker import serve  # noqa: E402
+
+
+def build(args: list[str], env: dict, write) -> int:
+    write(f"pid={os.getpid()}\n")
+    for arg in args:
+        write(f"{arg}\n")
+    if "sleep" in args:
+        import time
+
+        time.sleep(30)
+    return 1 if "fail" in args else 0
+
+
+if __name__ == "__main__":
+    serve(build)
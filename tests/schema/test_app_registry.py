@@ -1,10 +1,16 @@
+import os
+
 from typing import Any
+from unittest import mock
+
+import pytest
+
+from pydantic import ValidationError
 
 from socon_embedded.schema.apps import AppConfig, AppRegistry
 
 
 class TestSchemaCreation:
-
     def _validate(self, obj: Any):
         AppRegistry.model_validate(obj)
 
@@ -54,3 +60,88 @@ class TestSchemaCreation:
 
         # Vaidate the global model
         self._validate(registry)
+
+
+@mock.patch.dict(os.environ, {"SOCON_ACTIVE_PROJECT": "test_project"})
+class TestBuildConfigs:
+    def test_variant_keeps_builder_timeouts(self):
+        app = AppConfig(
+            name="foo",
+            builders=[{"name": "echo", "project_file": "a", "timeout": 10}],
+            variants=[{"name": "v", "builders": [{"ref": "echo", "stall_timeout": 2}]}],
+        )
+        configs = app.get_build_configs()
+        assert [config.builder.timeout for config in configs] == [10, 10]
+        assert [config.builder.stall_timeout for config in configs] == [None, 2]
+
+        # Timeouts are given to the builder but not to the build info
+        assert configs[1].get_buildinfo()["stall_timeout"] == 2
+        configs[1].create_buildinfo()
+
+    def test_variant_merges_tasks(self):
+        task = {"name": "t", "action": "shell", "args": {"cmd": "echo"}}
+        other = {"name": "u", "action": "shell", "args": {"cmd": "echo"}}
+        app = AppConfig(
+            name="foo",
+            builders=[{"name": "echo", "project_file": "a", "tasks": [task]}],
+            variants=[
+                {
+                    "name": "keep",
+                    "builders": [
+                        {"ref": "echo", "keep_tasks": True, "tasks": [task, other]}
+                    ],
+                },
+                {"name": "replace", "builders": [{"ref": "echo", "tasks": [other]}]},
+            ],
+        )
+        builder = app.builders[0]
+        configs = app.get_build_configs()
+        assert [[t.name for t in c.builder.tasks] for c in configs] == [
+            ["t"],
+            ["t", "u"],
+            ["u"],
+        ]
+
+        # The merge does not modify the builder of the application
+        assert [t.name for t in builder.tasks] == ["t"]
+
+    def test_permutations_share_the_builder_values(self):
+        app = AppConfig(
+            name="foo",
+            builders=[
+                {
+                    "name": "echo",
+                    "project_file": "a",
+                    "raw_args": ["-v"],
+                    "variant_args": {"mode": ["debug", "release"]},
+                    "tasks": [{"name": "t", "action": "shell", "args": {"cmd": "ls"}}],
+                }
+            ],
+        )
+        builder = app.builders[0]
+        configs = app.get_build_configs()
+        assert [c.builder.variant_args for c in configs] == [
+            {"mode": "debug"},
+            {"mode": "release"},
+        ]
+        for config in configs:
+            assert config.builder is not builder
+            assert config.builder.tasks is builder.tasks
+            assert config.builder.raw_args is builder.raw_args
+        assert builder.variant_args == {"mode": ["debug", "release"]}
+
+    @pytest.mark.parametrize(
+        "builder, variant",
+        [
+            ({"variant_args": {"opt": [0, 1]}}, {}),
+            ({}, {"variant_args": {"opt": ["0", 1]}}),
+        ],
+    )
+    def test_variant_args_values_are_strings(self, builder, variant):
+        # The permutations are not validated when the build configs are created
+        with pytest.raises(ValidationError, match="variant_args.opt"):
+            AppConfig(
+                name="foo",
+                builders=[{"name": "echo", "project_file": "a", **builder}],
+                variants=[{"name": "v", "builders": [{"ref": "echo", **variant}]}],
+            )
@@ -0,0 +1,178 @@
+import os
+
+from unittest import mock
+
+import pytest
+
+from socon_embedded.schema.apps import AppRegistry
+
+
+def create_registry() -> AppRegistry:
+    return AppRegistry(
+        name="reg",
+        apps=[
+            {
+                "name": "foo",
+                "group": ["board", "release"],
+                "builders": [
+                    {
+                        "name": "echo",
+                        "project_file": "foo",
+                        "variant_args": {"mode": ["debug", "release"], "cpu": ["m0"]},
+                    },
+                    {"name": "python", "project_file": "foo.py"},
+                ],
+                "variants": [
+                    {
+                        "name": "v2",
+                        "builders": [
+                            {"ref": "echo", "variant_args": {"mode": ["debug"]}}
+                        ],
+                    }
+                ],
+            },
+            {
+                "name": "bar",
+                "group": "board",
+                "builders": [
+                    {
+                        "name": "echo",
+                        "project_file": "bar",
+                        "variant_args": {"mode": ["debug", "size"]},
+                    }
+                ],
+            },
+            {"name": "baz", "group": "lib"},
+        ],
+    )
+
+
+def datalookup_select(registry: AppRegistry, filters, excludes, variant_args_filters):
+    reg = registry.filter(filters, excludes)
+    keys = [
+        config.key
+        for app in reg.apps
+        for config in app.get_build_configs(variant_args_filters)
+    ]
+    return [app.name for app in reg.apps], keys
+
+
+def index_select(registry: AppRegistry, filters, excludes, variant_args_filters):
+    apps, entries = registry.get_index().query(filters, excludes, variant_args_filters)
+    keys = [entry.get_build_config().key for entry in entries]
+    assert keys == [entry.key for entry in entries]
+    return [app.name for app in apps], keys
+
+
+@mock.patch.dict(os.environ, {"SOCON_ACTIVE_PROJECT": "test_project"})
+class TestRegistryIndex:
+    @pytest.mark.parametrize(
+        "filters, excludes, variant_args_filters",
+        [
+            ({}, {}, {}),
+            ({"name": "foo"}, {}, {}),
+            ({"name__in": ["foo", "baz"]}, {}, {}),
+            ({"group__in": ["board"]}, {}, {}),
+            ({"group__in": ["lib"]}, {}, {}),
+            ({}, {"group__in": ["release"]}, {}),
+            ({}, {"name": "baz"}, {}),
+            ({}, {}, {"variant_args__mode": "debug"}),
+            ({}, {}, {"variant_args__mode__in": ["release", "size"]}),
+            ({"name": "bar"}, {}, {"variant_args__mode": "size"}),
+            ({"name": "missing"}, {}, {}),
+        ],
+    )
+    def test_same_selection_as_datalookup(
+        self, filters, excludes, variant_args_filters
+    ):
+        registry = create_registry()
+        assert index_select(
+            registry, filters, excludes, variant_args_filters
+        ) == datalookup_select(registry, filters, excludes, variant_args_filters)
+
+    @pytest.mark.parametrize(
+        "filters, excludes",
+        [
+            ({"builders__name": "python"}, {}),
+            ({"builders__name__in": ["echo"]}, {"name": "bar"}),
+            ({}, {"name": "foo", "builders__name": "echo"}),
+            ({}, {"name": "foo", "builders__name": "missing"}),
+            ({"builders__name": "echo"}, {"builders__name": "python"}),
+            ({"builders__name": "python"}, {"builders__name": "echo"}),
+            ({"builders__name": "echo"}, {"builders__name": "echo"}),
+        ],
+    )
+    def test_builder_lookups(self, filters, excludes):
+        registry = create_registry()
+
+        # datalookup can not evaluate the builders of an application without
+        # builders. The index does not select it.
+        apps, _ = index_select(registry, filters, excludes, {})
+        assert "baz" not in apps or excludes
+
+        # datalookup also keeps the variants referencing a filtered out builder,
+        # which is invalid. Compare on a registry without them.
+        registry.apps = [app for app in registry.apps if app.builders]
+        for app in registry.apps:
+            app.variants = []
+        registry.get_index(refresh=True)
+        assert index_select(registry, filters, excludes, {}) == datalookup_select(
+            registry, filters, excludes, {}
+        )
+
+    @pytest.mark.parametrize(
+        "filters, excludes, variant_args_filters",
+        [
+            ({"group__in": ["board"]}, {}, {"variant_args__cpu": "m0"}),
+            ({"name__contains": "fo"}, {}, {}),
+            ({"group": "board"}, {}, {}),
+            ({}, {"builders__project_file": "foo"}, {}),
+            ({"variant_args__mode": "debug"}, {}, {}),
+            ({}, {}, {"project_file": "foo"}),
+            ({"name__in": "foo"}, {}, {}),
+        ],
+    )
+    def test_unsupported_lookups(self, filters, excludes, variant_args_filters):
+        index = create_registry().get_index()
+        assert index.query(filters, excludes, variant_args_filters) is None
+
+    def test_index_is_cached(self):
+        registry = create_registry()
+        index = registry.get_index()
+        assert registry.get_index() is index
+        assert len(index.entries) == 6
+
+        # Adding an application resets the index
+        registry.add_application("qux")
+        assert registry.get_index() is not index
+        apps, _ = registry.get_index().query({"name": "qux"})
+        assert [app.name for app in apps] == ["qux"]
+
+    def test_affected_configurations(self):
+        registry = create_registry()
+        registry.apps[0].inputs = ["src/foo/**"]
+        registry.apps[0].builders[1].inputs = ["scripts/*.py"]
+
+        index = registry.get_index()
+
+        # bar does not declare any input, it is always affected
+        assert index.get_affected([]) == {("bar", "echo")}
+        assert index.get_affected(["src/foo/main.c"]) == {
+            ("foo", "echo"),
+            ("foo", "python"),
+            ("foo.v2", "echo"),
+            ("bar", "echo"),
+        }
+        assert index.get_affected(["scripts/gen.py", "foo.py"]) == {
+            ("foo", "python"),
+            ("bar", "echo"),
+        }
+
+    def test_case_names(self):
+        index = create_registry().get_index()
+        for entry in index.entries:
+            case_name = entry.get_build_config().create_buildinfo().get_case_name()
+            assert entry.case_name == case_name
+            assert index.get_case(case_name) is entry
+        assert index.get_case("foo.v2 - echo - debug").variant == {"mode": "debug"}
+        assert index.get_case("qux - echo") is None
@@ -0,0 +1,24 @@
+from socon_embedded.utils.cancel import CancellationToken
+
+
+class TestCancellationToken:
+    def test_cancel(self):
+        calls = []
+        token = CancellationToken()
+        token.register(lambda: calls.append("first"))
+        unregister = token.register(lambda: calls.append("removed"))
+        unregister()
+        assert not token.cancelled
+
+        token.cancel("failure")
+        token.cancel("ignored")
+        assert token.cancelled
+        assert token.reason == "failure"
+        assert calls == ["first"]
+
+    def test_register_after_cancel(self):
+        calls = []
+        token = CancellationToken()
+        token.cancel()
+        token.register(lambda: calls.append("called"))
+        assert calls == ["called"]
@@ -0,0 +1,238 @@
+import os
+
+from unittest import mock
+
+import pytest
+
+from datalookup import Dataset
+
+from socon_embedded.exceptions import FilterError
+from socon_embedded.schema.apps import AppBuilder, AppConfig, AppRegistry
+from socon_embedded.utils.filters import (
+    ARRAY_OPERATORS,
+    OPERATORS,
+    Lookup,
+    compile_filters,
+)
+
+# Flat objects with a value of each type. Every list has at least one value:
+# datalookup takes an empty list for a list of objects.
+VALUES = [
+    {"name": "foo", "size": 1, "ratio": 0.5, "timeout": None, "group": ["board"]},
+    {"name": "bar", "size": 5, "ratio": 2.0, "timeout": 10, "group": ["lib", "os"]},
+    {"name": "Baz", "size": 10, "ratio": 7.5, "timeout": 3, "group": ["board", "os"]},
+]
+
+# Lookups on a value field for every operator
+VALUE_LOOKUPS = [
+    ("name", "foo"),
+    ("size", 5),
+    ("name__exact", "Baz"),
+    ("name__exact", "baz"),
+    ("name__iexact", "BAZ"),
+    ("name__in", ["foo", "Baz"]),
+    ("name__in", "foobar"),
+    ("size__in", [1, 10]),
+    ("name__contains", "a"),
+    ("name__contains", "A"),
+    ("name__icontains", "A"),
+    ("name__startswith", "b"),
+    ("name__istartswith", "B"),
+    ("name__endswith", "z"),
+    ("name__iendswith", "Z"),
+    ("name__regex", "^[fb]"),
+    ("name__regex", "a"),
+    ("name__iregex", "^b"),
+    ("name__iregex", "^B"),
+    ("size__gt", 1),
+    ("size__gte", 5),
+    ("size__lt", 10),
+    ("size__lte", 5),
+    ("name__gt", "bar"),
+    ("ratio__gte", 2),
+    ("size__range", [1, 10]),
+    ("size__range", [5, 11]),
+    ("ratio__range", [0, 10]),
+    ("timeout__isnull", True),
+    ("timeout__isnull", False),
+]
+
+# Lookups on a list field for every array operator, and the other operators
+# which never match a list
+ARRAY_LOOKUPS = [
+    ("group__in", ["board"]),
+    ("group__in", "board"),
+    ("group__in", "boards"),
+    ("group__contains", "os"),
+    ("group__contains", ["board", "os"]),
+    ("group__contained_by", ["board", "os"]),
+    ("group__contained_by", "board"),
+    ("group__overlap", ["board", "os"]),
+    ("group__overlap", "os"),
+    ("group__overlap", "lib_os"),
+    ("group__len", 1),
+    ("group__len", 2),
+    ("group", ["board"]),
+    ("group__exact", "board"),
+    ("group__isnull", False),
+]
+
+
+def create_registry() -> AppRegistry:
+    return AppRegistry(
+        name="reg",
+        apps=[
+            {
+                "name": "foo",
+                "group": ["board", "release"],
+                "builders": [
+                    {
+                        "name": "echo",
+                        "project_file": "foo",
+                        "variant_args": {"mode": ["debug", "release"]},
+                    },
+                    {"name": "python", "project_file": "foo.py", "timeout": 10},
+                ],
+            },
+            {
+                "name": "bar",
+                "group": "board",
+                "builders": [
+                    {"name": "echo", "project_file": "bar", "raw_args": ["-v"]}
+                ],
+            },
+            {
+                "name": "Baz",
+                "group": ["lib"],
+                "builders": [{"name": "python", "project_file": "baz.py"}],
+            },
+        ],
+    )
+
+
+def datalookup_filter(registry: AppRegistry, filters: dict, excludes: dict) -> list:
+    apps = Dataset(registry.model_dump()["apps"]).on_cascade().filter(**filters)
+    if excludes:
+        apps = apps.on_cascade().exclude(**excludes)
+    return [
+        (app["name"], [builder["name"] for builder in app["builders"]])
+        for app in apps.values()
+    ]
+
+
+class TestLookupsParity:
+    @pytest.mark.parametrize("lookup, value", VALUE_LOOKUPS + ARRAY_LOOKUPS)
+    def test_same_result_as_datalookup(self, lookup, value):
+        predicate = compile_filters({lookup: value})
+        names = [obj["name"] for obj in VALUES if predicate.matches(obj)]
+        expected = Dataset(VALUES).filter(**{lookup: value}).values()
+        assert names == [obj["name"] for obj in expected]
+
+    def test_every_operator_is_compared(self):
+        value_operators = {Lookup(*lookup).operator for lookup in VALUE_LOOKUPS}
+        array_operators = {Lookup(*lookup).operator for lookup in ARRAY_LOOKUPS}
+        assert value_operators == set(OPERATORS)
+        assert array_operators >= set(ARRAY_OPERATORS)
+
+
+@mock.patch.dict(os.environ, {"SOCON_ACTIVE_PROJECT": "test_project"})
+class TestCompiledFilters:
+    @pytest.mark.parametrize(
+        "filters, excludes",
+        [
+            ({"name": "foo"}, {}),
+            ({"name__in": ["foo", "Baz"]}, {}),
+            ({"name__iexact": "baz"}, {}),
+            ({"name__icontains": "A"}, {}),
+            ({"name__startswith": "b"}, {}),
+            ({"name__regex": "^[fb]"}, {}),
+            ({"group__in": ["board"]}, {}),
+            ({"group__contains": "board"}, {}),
+            ({"group__overlap": ["lib", "release"]}, {}),
+            ({"group__len": 2}, {}),
+            ({"builders__name": "python"}, {}),
+            ({"builders__name__in": ["echo"]}, {"name": "bar"}),
+            ({"builders__timeout__isnull": True}, {}),
+            ({"builders__name": "echo", "builders__project_file": "foo"}, {}),
+            ({}, {"group__in": ["lib"]}),
+            ({"builders__name": "echo"}, {"builders__name": "python"}),
+        ],
+    )
+    def test_same_selection_as_datalookup(self, filters, excludes):
+        registry = create_registry()
+        apps = [
+            (app.name, [builder.name for builder in app.builders])
+            for app in registry.filter(filters, excludes).apps
+        ]
+        assert apps == datalookup_filter(registry, filters, excludes)
+
+    @pytest.mark.parametrize(
+        "filters, expected",
+        [
+            ({"builders__timeout__gte": 5}, [("foo", ["python"])]),
+            ({"builders__raw_args__contains": "-v"}, [("bar", ["echo"])]),
+            (
+                {"builders__raw_args__len": 0},
+                [("foo", ["echo", "python"]), ("Baz", ["python"])],
+            ),
+        ],
+    )
+    def test_lookups_on_missing_values(self, filters, expected):
+        # datalookup raises an exception if one builder has no value to compare
+        registry = create_registry()
+        apps = [
+            (app.name, [builder.name for builder in app.builders])
+            for app in registry.filter(filters).apps
+        ]
+        assert apps == expected
+
+    def test_missing_field(self):
+        registry = create_registry()
+        with pytest.raises(FilterError, match="'mode' field does not exist"):
+            registry.filter({"builders__variant_args__mode": "debug"})
+
+    def test_select_shares_the_unchanged_objects(self):
+        registry = create_registry()
+        foo, bar, _ = registry.apps
+        reg = registry.filter({"builders__name": "echo"})
+
+        # bar is kept as is, foo is copied without its python builder
+        assert reg.apps[1] is bar
+        assert reg.apps[0] is not foo
+        assert reg.apps[0].builders == [foo.builders[0]]
+        assert reg.apps[0].builders[0] is foo.builders[0]
+        assert len(foo.builders) == 2
+
+    def test_in_values_are_compiled_once(self):
+        lookup = Lookup("builders__name__in", ["echo", "python"])
+        assert lookup.path == ("builders", "name")
+        assert lookup.field == "builders__name"
+        assert lookup.operator == "in"
+        assert lookup.value == frozenset(["echo", "python"])
+
+    @pytest.mark.parametrize(
+        "filters, model",
+        [
+            ({"names": "foo"}, AppConfig),
+            ({"builders__title": "echo"}, AppConfig),
+            ({"name__in": 1}, AppConfig),
+            ({"name__regex": "["}, AppConfig),
+            ({"group__len": "2"}, AppConfig),
+            ({"builders__timeout__isnull": "yes"}, AppConfig),
+            ({"name__": "foo"}, AppConfig),
+            ({"project": "foo"}, AppBuilder),
+        ],
+    )
+    def test_invalid_lookups(self, filters, model):
+        with pytest.raises(FilterError):
+            compile_filters(filters, model)
+
+    def test_variant_args_filters(self):
+        app = create_registry().apps[0]
+        configs = app.get_build_configs({"variant_args__mode__in": ["release"]})
+        # Builders without variant args are not filtered
+        assert [config.builder.name for config in configs] == ["echo", "python"]
+        assert configs[0].builder.variant_args == {"mode": "release"}
+
+        with pytest.raises(FilterError):
+            app.get_build_configs({"variant_args__cpu": "m0"})
@@ -0,0 +1,86 @@
+import os
+import subprocess
+
+import pytest
+
+from socon_embedded.utils.paths import PathTrie, find_files, glob_to_regex
+from socon_embedded.utils.vcs import get_changed_files
+
+
+GLOB_DATA = (
+    ("*.c", "main.c", True),
+    ("*.c", "sub/main.c", False),
+    ("**/*.c", "main.c", True),
+    ("**/*.c", "a/b/main.c", True),
+    ("src/**", "src/a/b.h", True),
+    ("src/?.c", "src/a.c", True),
+    ("src/?.c", "src/ab.c", False),
+    ("src/[ab].c", "src/b.c", True),
+    ("src/[!ab].c", "src/b.c", False),
+    ("src/*", "src/sub/main.c", True),
+    ("src/*.c", "src/main.h", False),
+)
+
+
+class TestPaths:
+    @pytest.mark.parametrize("pattern, path, match", GLOB_DATA)
+    def test_glob_to_regex(self, pattern, path, match):
+        assert bool(glob_to_regex(pattern).fullmatch(path)) is match
+
+    def test_path_trie(self, tmp_path):
+        trie = PathTrie()
+        trie.insert(tmp_path / "src" / "foo" / "*.c", "foo")
+        trie.insert(tmp_path / "src" / "common", "common")
+        trie.insert(tmp_path / "**" / "CMakeLists.txt", "cmake")
+        trie.insert("relative/file.c", "relative")
+
+        assert trie.match(tmp_path / "src" / "foo" / "main.c") == {"foo"}
+        assert trie.match(tmp_path / "src" / "foo" / "main.h") == set()
+        assert trie.match(tmp_path / "src" / "common" / "a" / "b.h") == {"common"}
+        assert trie.match(tmp_path / "src" / "common") == {"common"}
+        assert trie.match(tmp_path / "src" / "CMakeLists.txt") == {"cmake"}
+        assert trie.match(tmp_path / "src" / "comm") == set()
+        assert trie.match("relative/./file.c") == {"relative"}
+
+    def test_find_files(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        for name in ["main.c", "src/a.c", "src/a.h", "src/sub/b.c", "lib/c.c"]:
+            (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+            (tmp_path / name).write_text(name)
+
+        def relative(files):
+            return [os.path.relpath(path) for path in files]
+
+        assert relative(find_files(["src/*.c", "main.c"])) == ["main.c", "src/a.c"]
+        assert relative(find_files(["src/**/*.c"])) == ["src/a.c", "src/sub/b.c"]
+        assert relative(find_files(["lib", "missing"])) == ["lib/c.c"]
+        assert find_files([tmp_path / "src" / "sub"]) == [
+            str(tmp_path / "src" / "sub" / "b.c")
+        ]
+
+    def test_git_changed_files(self, tmp_path):
+        def git(*args):
+            subprocess.run(
+                ["git", *args], cwd=tmp_path, check=True, capture_output=True
+            )
+
+        git("init", "-q")
+        git("config", "user.email", "test@example.com")
+        git("config", "user.name", "test")
+        (tmp_path / "a.c").write_text("a")
+        (tmp_path / "b.c").write_text("b")
+        git("add", "-A")
+        git("commit", "-q", "-m", "init")
+
+        (tmp_path / "a.c").write_text("changed")
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "new.c").write_text("new")
+        git("mv", "b.c", "c.c")
+
+        changed = get_changed_files("HEAD", cwd=tmp_path / "sub")
+        assert sorted(changed) == sorted(
+            [tmp_path / name for name in ["a.c", "b.c", "c.c", "sub/new.c"]]
+        )
+
+        with pytest.raises(subprocess.CalledProcessError):
+            get_changed_files("unknown-revision", cwd=tmp_path)
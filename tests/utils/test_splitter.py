@@ -33,6 +33,11 @@ SPLIT_DATA = (
     ),
     ('a="café eñyei"', ['a="café eñyei"'], {"a": "café eñyei"}),
     ("a=café b=eñyei", ["a=café", "b=eñyei"], {"a": "café", "b": "eñyei"}),
+    (
+        'a="b=c=d" e=f=g',
+        ['a="b=c=d"', "e=f=g"],
+        {"a": "b=c=d", "e": "f=g"},
+    ),
 )
 
 # Data for each tests. First input for both the data